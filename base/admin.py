@@ -1,3 +1,175 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
 
-# Register your models here.
+from base.models import RequestProfile
+
+
+# Paramètres GET de la pagination par curseur (clé primaire de la dernière / première ligne affichée)
+AFTER_VAR = 'apres'
+BEFORE_VAR = 'avant'
+
+
+def estimated_count(queryset):
+    """Nombre de lignes de la table d'après les statistiques du SGBD, None si indisponible."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [connection.ops.quote_name(table)])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples vaut -1 tant que la table n'a pas été analysée
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Sans filtre, au-delà de ADMIN_ESTIMATED_COUNT_THRESHOLD lignes, le total vient
+    des statistiques du SGBD au lieu d'un COUNT(*) qui parcourt toute la table.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000):
+                self.estimated = True
+                return estimate
+        return super().count
+
+
+class FastChangeList(ChangeList):
+    """
+    Liste triée par clé primaire décroissante (tri par défaut de FastModelAdmin) :
+    les pages suivantes se lisent par curseur (« pk < dernière pk affichée »)
+    au lieu d'un OFFSET qui relit toutes les lignes précédentes. Un tri sur une
+    autre colonne revient à la pagination classique.
+    """
+    keyset = False
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(AFTER_VAR, None)
+        params.pop(BEFORE_VAR, None)
+        return params
+
+    def get_results(self, request):
+        self.keyset = (
+            self.model_admin.keyset_pagination
+            and ORDER_VAR not in self.params
+            and list(self.model_admin.get_ordering(request)) == ['-pk']
+        )
+        if not self.keyset:
+            return super().get_results(request)
+
+        try:
+            after = int(self.params[AFTER_VAR]) if AFTER_VAR in self.params else None
+            before = int(self.params[BEFORE_VAR]) if BEFORE_VAR in self.params else None
+        except ValueError as e:
+            raise IncorrectLookupParameters(e)
+        per_page = self.list_per_page
+        if before is not None:
+            rows = list(self.queryset.filter(pk__gt=before).order_by('pk')[:per_page + 1])
+            self.has_previous, self.has_next = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            queryset = self.queryset.filter(pk__lt=after) if after is not None else self.queryset
+            rows = list(queryset[:per_page + 1])
+            self.has_previous, self.has_next = after is not None, len(rows) > per_page
+            rows = rows[:per_page]
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = self.has_previous or self.has_next
+        self.first_url = self.get_query_string(remove=[AFTER_VAR, BEFORE_VAR])
+        self.previous_url = rows and self.get_query_string({BEFORE_VAR: rows[0].pk}, [AFTER_VAR])
+        self.next_url = rows and self.get_query_string({AFTER_VAR: rows[-1].pk}, [BEFORE_VAR])
+
+
+class FastModelAdmin(admin.ModelAdmin):
+    """
+    Base des ModelAdmin des grosses tables : tri par pk décroissante et
+    pagination par curseur, total estimé sans filtre, pas de second COUNT(*)
+    pour le total non filtré. Les sous-classes ne filtrent que sur des colonnes
+    indexées ou booléennes, utilisent date_hierarchy, list_select_related et
+    autocomplete_fields / raw_id_fields pour les clés étrangères.
+    """
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    keyset_pagination = True
+    change_list_template = 'admin/base/fast_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return FastChangeList
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'date_add',
+        'method',
+        'path',
+        'view_name',
+        'status_code',
+        'duree_ms',
+        'cpu_ms',
+        'sql_count',
+        'sql_ms',
+        'template_ms',
+        'declencheur',
+        'user',
+    )
+    list_filter = ('declencheur', 'method', 'status_code', 'date_add')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'date_add'
+    list_select_related = ('user',)
+    exclude = ('rapport',)
+    readonly_fields = (
+        'method', 'path', 'view_name', 'status_code', 'user', 'declencheur', 'duree_ms', 'cpu_ms',
+        'sql_count', 'sql_ms', 'template_ms', 'date_add', 'fonctions', 'requetes_sql',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Fonctions (temps cumulé)')
+    def fonctions(self, obj):
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+            ((f['cumtime_ms'], f['tottime_ms'], f['ncalls'], f['function']) for f in obj.data['functions']),
+        )
+        return format_html(
+            '<table><thead><tr><th>cumul ms</th><th>propre ms</th><th>appels</th><th>fonction</th></tr></thead>'
+            '<tbody>{}</tbody></table>', rows)
+
+    @admin.display(description='Requêtes SQL')
+    def requetes_sql(self, obj):
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+            ((q['ms'], q['alias'], q['sql']) for q in obj.data['queries']),
+        )
+        return format_html('<table><thead><tr><th>ms</th><th>base</th><th>requête</th></tr></thead><tbody>{}</tbody></table>', rows)
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,46 @@
+"""
+Adresse IP du client.
+
+Derrière un ou plusieurs proxys (nginx, répartiteur de charge), REMOTE_ADDR
+est celle du dernier proxy : tous les visiteurs partageraient la même
+adresse. Chaque proxy ajoute l'adresse de son interlocuteur à la fin de
+X-Forwarded-For ; avec TRUSTED_PROXY_COUNT proxys de confiance devant
+l'application, le client est donc la N-ième entrée en partant de la droite.
+Les entrées plus à gauche sont fournies par le client et ne sont jamais lues.
+
+Sans proxy déclaré (TRUSTED_PROXY_COUNT = 0), seule REMOTE_ADDR compte.
+"""
+
+import ipaddress
+import logging
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def nombre_proxys():
+    return getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+
+
+def valide(adresse):
+    try:
+        return str(ipaddress.ip_address(adresse.strip()))
+    except ValueError:
+        return None
+
+
+def ip_client(request):
+    """Adresse du client d'après REMOTE_ADDR et les proxys de confiance, ou None."""
+    remote = request.META.get('REMOTE_ADDR') or None
+    proxys = nombre_proxys()
+    if not proxys:
+        return remote
+    entrees = [e for e in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if e.strip()]
+    if len(entrees) < proxys:
+        # Requête arrivée sans passer par tous les proxys déclarés : REMOTE_ADDR
+        # reste la seule adresse qui ne vient pas du client
+        logger.warning("X-Forwarded-For incomplet (%d/%d entrées), REMOTE_ADDR retenue", len(entrees), proxys)
+        return remote
+    return valide(entrees[-proxys]) or remote
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .profiling import installer_enregistreur
+
+        connection_created.connect(installer_enregistreur, dispatch_uid='base.enregistreur_sql')
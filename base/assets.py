@@ -0,0 +1,121 @@
+"""
+Assemblage des bundles CSS/JS déclarés dans ASSET_BUNDLES.
+
+Un bundle est la concaténation minifiée de fichiers statiques, écrite dans
+ASSET_BUNDLES_DIR (un des STATICFILES_DIRS). collectstatic lui applique
+ensuite, comme aux autres fichiers, le nom haché, le manifeste et la
+précompression gzip/Brotli (base.storage.StorefrontStaticFilesStorage).
+
+Côté CSS, les @import locaux sont insérés à leur place, les url() relatives
+sont réécrites par rapport à l'emplacement du bundle et les @import distants
+remontés en tête de fichier (après un unique @charset), seul endroit où ils
+restent valides.
+"""
+
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+CSS_IMPORT = re.compile(r'@import\s+(?:url\()?\s*([\'"]?)([^\'")\s;]+)\1\s*\)?\s*([^;]*);')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_CHARSET = re.compile(r'@charset\s*[\'"][^\'"]*[\'"]\s*;', re.I)
+
+
+class BundleError(Exception):
+    pass
+
+
+def bundles():
+    return getattr(settings, 'ASSET_BUNDLES', {})
+
+
+def output_dir():
+    return str(getattr(settings, 'ASSET_BUNDLES_DIR', settings.STATICFILES_DIRS[0]))
+
+
+def read_static(path):
+    absolute = finders.find(path)
+    if not absolute:
+        raise BundleError("Fichier statique introuvable : %s" % path)
+    with open(absolute, encoding='utf-8-sig') as fichier:
+        return fichier.read()
+
+
+def is_local(url):
+    return not (url.startswith(('data:', '#', '/')) or '//' in url)
+
+
+def rebase_css(css, source, bundle):
+    """Réécrit les url() relatives de `source` pour qu'elles restent valides depuis `bundle`."""
+    source_dir, bundle_dir = posixpath.dirname(source), posixpath.dirname(bundle)
+
+    def rewrite(match):
+        quote, url = match.groups()
+        if not is_local(url):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(source_dir, path))
+        return 'url(%s%s%s%s)' % (quote, posixpath.relpath(target, bundle_dir or '.'), suffix, quote)
+
+    return CSS_URL.sub(rewrite, css)
+
+
+def inline_css(source, bundle, remote_imports, seen):
+    """Contenu de `source` avec ses @import locaux insérés et ses url() rebasées."""
+    if source in seen:
+        return ''
+    seen.add(source)
+    css = CSS_COMMENT.sub(lambda match: match.group(0) if match.group(0).startswith('/*!') else '', read_static(source))
+
+    def expand(match):
+        url, media = match.group(2), match.group(3).strip()
+        if not is_local(url):
+            remote_imports.append(match.group(0))
+            return ''
+        imported = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        content = inline_css(imported, bundle, remote_imports, seen)
+        return '@media %s {\n%s\n}' % (media, content) if media else content
+
+    css = CSS_IMPORT.sub(expand, CSS_CHARSET.sub('', css))
+    return rebase_css(css, source, bundle)
+
+
+def build_css(name, sources, minify=True):
+    remote_imports, seen, parts = [], set(), []
+    for source in sources:
+        parts.append(inline_css(source, name, remote_imports, seen))
+    # @charset puis @import : les seules règles admises avant tout le reste
+    css = '@charset "UTF-8";\n' + '\n'.join(dict.fromkeys(remote_imports)) + '\n' + '\n'.join(parts)
+    if minify:
+        import rcssmin
+
+        css = rcssmin.cssmin(css, keep_bang_comments=True)
+    return css
+
+
+def build_js(name, sources, minify=True):
+    # Le « ; » protège la jonction de deux fichiers sans point-virgule final
+    js = '\n;\n'.join(read_static(source) for source in sources)
+    if minify:
+        import rjsmin
+
+        js = rjsmin.jsmin(js, keep_bang_comments=True)
+    return js
+
+
+def build(name, minify=True):
+    sources = bundles()[name]
+    if name.endswith('.css'):
+        return build_css(name, sources, minify)
+    if name.endswith('.js'):
+        return build_js(name, sources, minify)
+    raise BundleError("Type de bundle inconnu : %s" % name)
+
+
+def bundle_path(name):
+    return os.path.join(output_dir(), *name.split('/'))
@@ -0,0 +1,101 @@
+"""Mesure de latence et de débit pour les outils de charge."""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.test import AsyncClient, Client
+
+
+def percentile(values, p):
+    """Percentile au rang le plus proche (p entre 0 et 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Résumé d'une série de latences (secondes) mesurées sur `elapsed` secondes."""
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': count / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+class QueryCounter:
+    """Compte les requêtes SQL émises par le thread courant, tous alias confondus."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+def run_threaded(make_request, total, concurrency):
+    """
+    Exécute `total` requêtes POST JSON via le gestionnaire WSGI, sur
+    `concurrency` threads. `make_request(i)` retourne (chemin, données).
+    """
+    local = threading.local()
+    latencies, errors = [], []
+
+    def one(i):
+        if not hasattr(local, 'client'):
+            local.client = Client(raise_request_exception=False)
+        path, payload = make_request(i)
+        start = time.perf_counter()
+        response = local.client.post(path, data=json.dumps(payload), content_type='application/json')
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors.append(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, time.perf_counter() - start, len(errors))
+
+
+def run_async(make_request, total, concurrency):
+    """Même charge que run_threaded, via le gestionnaire ASGI et asyncio."""
+    latencies, errors = [], []
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        clients = [AsyncClient(raise_request_exception=False) for _ in range(concurrency)]
+
+        async def one(i):
+            path, payload = make_request(i)
+            async with semaphore:
+                start = time.perf_counter()
+                response = await clients[i % concurrency].post(path, data=json.dumps(payload), content_type='application/json')
+                latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(i)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    return summarize(latencies, elapsed, len(errors))
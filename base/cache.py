@@ -0,0 +1,296 @@
+"""
+Backends de cache instrumentés (succès / échecs exportés dans base.metrics),
+cache à deux niveaux et recalcul unique des valeurs expirées (memoiser).
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    """
+    Compte les lectures réussies et manquées. L'étiquette vient de
+    OPTIONS['METRICS_LABEL'] (« default » sinon).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        label = params.get('OPTIONS', {}).get('METRICS_LABEL', 'default')
+        self._hits = metrics.CACHE_REQUESTS.labels(label, 'hit')
+        self._misses = metrics.CACHE_REQUESTS.labels(label, 'miss')
+        # get_many de BaseCache passe par get (déjà compté) ; seul un get_many natif est compté ici
+        mro = type(self).__mro__
+        backend = next(klass for klass in mro[mro.index(InstrumentedCacheMixin) + 1:] if 'get_many' in vars(klass))
+        self._count_many = backend is not BaseCache
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            self._misses.inc()
+            return default
+        self._hits.inc()
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        if self._count_many:
+            self._hits.inc(len(found))
+            self._misses.inc(len(keys) - len(found))
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedFileBasedCache(InstrumentedCacheMixin, FileBasedCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class LRU:
+    """
+    Dictionnaire borné à `max_entries` entrées expirantes, la moins récemment
+    lue évincée en premier. Les valeurs sont gardées sérialisées, comme dans
+    LocMemCache : modifier un objet lu ne modifie pas le cache.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expire_at = entry
+            if expire_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+        return True, pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TwoTierCache(BaseCache):
+    """
+    L1 : LRU en mémoire du processus (OPTIONS['L1_MAX_ENTRIES'] entrées,
+    gardées au plus OPTIONS['L1_TIMEOUT'] secondes) devant L2, le cache
+    partagé entre les workers désigné par OPTIONS['L2'] (alias de CACHES).
+
+    Les lectures servies par L1 ne coûtent aucun aller-retour ; en contrepartie
+    une écriture faite par un autre processus n'y est visible qu'après
+    L1_TIMEOUT secondes. Les opérations atomiques (add, incr, decr) passent
+    directement par L2 et retirent la clé de L1.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'partage')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1 = LRU(options.get('L1_MAX_ENTRIES', 1000))
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.l1_timeout if timeout is None else min(self.l1_timeout, timeout)
+
+    def get(self, key, default=None, version=None):
+        cle = self.make_and_validate_key(key, version=version)
+        found, value = self.l1.get(cle)
+        if found:
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self.l1.set(cle, value, self.l1_timeout)
+        return value
+
+    def relire(self, key, default=None, version=None):
+        """Lecture dans L2 sans passer par L1, qui est rafraîchi."""
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.get(key, default, version)
+
+    def get_many(self, keys, version=None):
+        found, absentes = {}, []
+        for key in keys:
+            present, value = self.l1.get(self.make_and_validate_key(key, version=version))
+            if present:
+                found[key] = value
+            else:
+                absentes.append(key)
+        if absentes:
+            partage = self.l2.get_many(absentes, version=version)
+            for key, value in partage.items():
+                self.l1.set(self.make_and_validate_key(key, version=version), value, self.l1_timeout)
+            found.update(partage)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        cle = self.make_and_validate_key(key, version=version)
+        l1_timeout = self._l1_timeout(timeout)
+        if l1_timeout > 0:
+            self.l1.set(cle, value, l1_timeout)
+        else:
+            self.l1.delete(cle)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        echecs = self.l2.set_many(data, timeout, version=version)
+        l1_timeout = self._l1_timeout(timeout)
+        for key, value in data.items():
+            cle = self.make_and_validate_key(key, version=version)
+            if l1_timeout > 0 and key not in echecs:
+                self.l1.set(cle, value, l1_timeout)
+            else:
+                self.l1.delete(cle)
+        return echecs
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.decr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        return self.l1.get(self.make_and_validate_key(key, version=version))[0] or self.l2.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.l1.delete(self.make_and_validate_key(key, version=version))
+        self.l2.delete_many(keys, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+
+class InstrumentedTwoTierCache(InstrumentedCacheMixin, TwoTierCache):
+    pass
+
+
+# Recalcul unique
+
+VERROU_TIMEOUT = 30
+ATTENTE_MAX = 5
+ATTENTE_PAS = 0.05
+
+
+def _calculer(backend, key, fonction, timeout, stale):
+    valeur = fonction()
+    backend.set(key, (valeur, time.time() + timeout), timeout + stale)
+    return valeur
+
+
+def memoiser(key, fonction, timeout, stale=None, using='default'):
+    """
+    Valeur de `fonction()` mise en cache `timeout` secondes sous `key`.
+
+    - Un seul worker recalcule une valeur absente (verrou add() dans le cache
+      partagé) ; les autres attendent son résultat jusqu'à ATTENTE_MAX secondes.
+    - Pendant `stale` secondes après expiration (timeout par défaut), la valeur
+      périmée est servie à tous pendant qu'un seul worker la recalcule ; si le
+      recalcul échoue, la valeur périmée reste servie.
+
+    `fonction()` peut retourner None : la valeur est gardée comme les autres.
+    """
+    backend = caches[using]
+    stale = timeout if stale is None else stale
+    verrou = '%s:recalcul' % key
+    entree = backend.get(key)
+
+    if entree is not None:
+        valeur, frais_jusqu_a = entree
+        if frais_jusqu_a > time.time():
+            return valeur
+        # L1 peut être en retard sur un recalcul fait par un autre worker
+        entree = getattr(backend, 'relire', backend.get)(key)
+        if entree is not None:
+            valeur, frais_jusqu_a = entree
+            if frais_jusqu_a > time.time():
+                return valeur
+        if not backend.add(verrou, 1, VERROU_TIMEOUT):
+            return valeur
+        try:
+            return _calculer(backend, key, fonction, timeout, stale)
+        except Exception:
+            logger.warning("Recalcul de %s impossible, valeur périmée servie", key, exc_info=True)
+            return valeur
+        finally:
+            backend.delete(verrou)
+
+    limite = time.monotonic() + ATTENTE_MAX
+    while True:
+        if backend.add(verrou, 1, VERROU_TIMEOUT):
+            try:
+                return _calculer(backend, key, fonction, timeout, stale)
+            finally:
+                backend.delete(verrou)
+        time.sleep(ATTENTE_PAS)
+        entree = backend.get(key)
+        if entree is not None:
+            return entree[0]
+        if time.monotonic() > limite:
+            # Le worker qui calcule est trop lent ou a disparu sans libérer le verrou
+            return fonction()
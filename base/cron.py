@@ -0,0 +1,13 @@
+from django_cron import CronJobBase, Schedule
+from base.models import RequestProfile
+
+
+class PurgeRequestProfilesCronJob(CronJobBase):
+    RUN_EVERY_MINS = 60 * 24  # Tous les jours
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'base.purge_request_profiles'
+
+    def do(self):
+        count = RequestProfile.purge()
+        print(f"{count} profils de requêtes supprimés.")
@@ -0,0 +1,123 @@
+"""
+Réponses d'export CSV / XLSX à mémoire constante.
+
+Les lignes arrivent d'un itérateur (typiquement QuerySet.iterator(chunk_size=…)) :
+le CSV est produit ligne à ligne dans une StreamingHttpResponse, le XLSX est
+écrit par openpyxl en mode write_only dans un fichier temporaire puis servi
+par FileResponse. Dans les deux cas, seul un lot de lignes est en mémoire.
+
+Sous ASGI, Django 4.2 lit un itérateur synchrone d'un seul tenant
+(sync_to_async(list)) avant d'envoyer le premier octet : pour une requête
+ASGI, le flux est donc fourni en itérateur asynchrone (FluxAsynchrone).
+"""
+
+import csv
+import datetime
+import itertools
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+
+FORMATS = ('csv', 'xlsx')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+LIGNES_PAR_BLOC = 500
+OCTETS_PAR_BLOC = 64 * 1024
+
+
+class FluxAsynchrone:
+    """
+    Itérateur asynchrone sur un itérateur synchrone, lu par blocs de `taille`
+    éléments dans le thread du code synchrone de la requête (sync_to_async
+    thread_sensitive, celui qui détient le curseur de QuerySet.iterator()).
+    """
+
+    def __init__(self, iterateur, taille=LIGNES_PAR_BLOC):
+        self.iterateur = iter(iterateur)
+        self.taille = taille
+
+    def bloc(self):
+        return list(itertools.islice(self.iterateur, self.taille))
+
+    async def __aiter__(self):
+        while True:
+            bloc = await sync_to_async(self.bloc)()
+            if not bloc:
+                return
+            yield bloc[0][:0].join(bloc)
+
+    def close(self):
+        # Appelé par la réponse, y compris si le client abandonne : libère le curseur
+        close = getattr(self.iterateur, 'close', None)
+        if close is not None:
+            close()
+
+
+def sous_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+class Echo:
+    """Pseudo-fichier pour csv.writer : write() renvoie la ligne formatée au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def cellule(valeur):
+    """Valeur lisible par un tableur : dates locales sans fuseau ni microsecondes."""
+    if isinstance(valeur, datetime.datetime):
+        if timezone.is_aware(valeur):
+            valeur = timezone.localtime(valeur)
+        return valeur.replace(tzinfo=None, microsecond=0)
+    return valeur
+
+
+def csv_stream(entetes, rangees):
+    # BOM et point-virgule : ouverture directe dans Excel en français
+    writer = csv.writer(Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(entetes)
+    for rangee in rangees:
+        yield writer.writerow([cellule(valeur) for valeur in rangee])
+
+
+def csv_response(nom, entetes, rangees, request=None):
+    flux = csv_stream(entetes, rangees)
+    if sous_asgi(request):
+        flux = FluxAsynchrone(flux)
+    response = StreamingHttpResponse(flux, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="%s.csv"' % nom
+    return response
+
+
+def xlsx_response(nom, entetes, rangees, request=None):
+    from openpyxl import Workbook
+
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet()
+    feuille.append(entetes)
+    for rangee in rangees:
+        feuille.append([cellule(valeur) for valeur in rangee])
+    fichier = tempfile.TemporaryFile()
+    classeur.save(fichier)
+    fichier.seek(0)
+    response = FileResponse(fichier, as_attachment=True, filename='%s.xlsx' % nom, content_type=XLSX_CONTENT_TYPE)
+    if sous_asgi(request):
+        # En-têtes déjà posés d'après le fichier, qui reste fermé avec la réponse
+        response.streaming_content = FluxAsynchrone(iter(lambda: fichier.read(OCTETS_PAR_BLOC), b''), taille=16)
+    return response
+
+
+def export_response(format_, nom, entetes, rangees, request=None):
+    """
+    Réponse d'export au format demandé ; ValueError si le format n'est pas pris
+    en charge. `request` choisit un flux asynchrone pour une requête ASGI.
+    """
+    if format_ == 'csv':
+        return csv_response(nom, entetes, rangees, request)
+    if format_ == 'xlsx':
+        return xlsx_response(nom, entetes, rangees, request)
+    raise ValueError("Format d'export inconnu : %s" % format_)
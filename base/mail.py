@@ -0,0 +1,38 @@
+"""Backend d'e-mail instrumenté : délègue à METRICS_EMAIL_BACKEND et mesure l'envoi."""
+
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import metrics
+
+
+class MetricsEmailBackend(BaseEmailBackend):
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        backend = getattr(settings, 'METRICS_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+        self.backend = get_connection(backend, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        start = time.perf_counter()
+        try:
+            sent = self.backend.send_messages(email_messages)
+        except Exception:
+            metrics.EMAILS.labels('error').inc(len(email_messages))
+            raise
+        finally:
+            metrics.EMAIL_SEND_DURATION.observe(time.perf_counter() - start)
+        sent = sent or 0
+        metrics.EMAILS.labels('sent').inc(sent)
+        if sent < len(email_messages):
+            metrics.EMAILS.labels('error').inc(len(email_messages) - sent)
+        return sent
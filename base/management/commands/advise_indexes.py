@@ -0,0 +1,289 @@
+"""
+Conseiller d'index.
+
+Rejoue du trafic (fichier JSON Lines, voir base.traffic) dans le processus,
+collecte le SQL émis par chaque vue, passe chaque SELECT à EXPLAIN et propose
+des index composites pour les tables parcourues intégralement. Les index
+proposés sont créés temporairement pour mesurer les temps avant/après (dans
+une transaction annulée si le SGBD sait annuler le DDL, sinon supprimés
+explicitement, comme sous MySQL), et peuvent être écrits dans une migration
+(--write-migration).
+"""
+
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack, nullcontext
+from statistics import median
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, models, transaction
+from django.db.migrations import AddIndex, Migration
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from base.traffic import TrafficReplayer, load_traffic, replay_environment, synthetic_traffic, url_name
+
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+TABLE_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)"?')
+RANGE_OPERATORS = ('<', '>', '<=', '>=', 'BETWEEN', 'LIKE')
+MAX_INDEX_COLUMNS = 3
+
+
+def explain_full_scans(connection, sql):
+    """Retourne les tables (ou alias) parcourues intégralement par une requête."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            scans = []
+            for row in cursor.fetchall():
+                match = SQLITE_SCAN.match(row[-1])
+                if match and 'INDEX' not in row[-1]:
+                    scans.append(match.group(1))
+            return scans
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql)
+            return [m.group(1) for (line,) in cursor.fetchall() for m in [POSTGRES_SCAN.search(line)] if m]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [row['table'] for row in rows if row.get('type') == 'ALL']
+    raise CommandError("EXPLAIN n'est pas pris en charge pour %s" % connection.vendor)
+
+
+def time_statement(connection, sql, repeat):
+    durations = []
+    with connection.cursor() as cursor:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            durations.append((time.perf_counter() - start) * 1000)
+    return median(durations)
+
+
+def predicate_columns(sql, table):
+    """Colonnes de `table` filtrées par égalité, puis par intervalle ou tri."""
+    aliases = [alias for name, alias in TABLE_ALIAS.findall(sql) if name == table]
+    refs = '|'.join(['"%s"' % re.escape(table)] + ['"?%s"?' % re.escape(alias) for alias in aliases])
+    where, _, order_by = sql.partition(' ORDER BY ')
+    _, _, where = where.partition(' WHERE ')
+
+    equality, ranges = [], []
+    # Un booléen filtré sans opérateur (WHERE "t"."status") compte comme une égalité
+    pattern = re.compile(r'(?:%s)\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b|LIKE\b|(?=\)|AND\b|OR\b|LIMIT\b|$))' % refs)
+    for column, operator in pattern.findall(where):
+        target = ranges if operator in RANGE_OPERATORS else equality
+        if column not in equality and column not in ranges:
+            target.append(column)
+    ordering = re.findall(r'(?:%s)\."(\w+)"' % refs, order_by)
+
+    columns = equality[:MAX_INDEX_COLUMNS]
+    for column in ranges + ordering:
+        if len(columns) >= MAX_INDEX_COLUMNS:
+            break
+        if column not in columns:
+            columns.append(column)
+            break
+    return columns
+
+
+def project_models_by_table():
+    base_dir = str(settings.BASE_DIR)
+    tables = {}
+    for model in apps.get_models():
+        app_path = model._meta.app_config.path
+        if app_path.startswith(base_dir) and 'site-packages' not in app_path:
+            tables[model._meta.db_table] = model
+    return tables
+
+
+def existing_indexes(connection, table):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [tuple(c['columns']) for c in constraints.values() if c['index'] or c['unique'] or c['primary_key']]
+
+
+class Command(BaseCommand):
+    help = "Rejoue du trafic, repère les parcours complets de table et propose des index composites."
+
+    def add_arguments(self, parser):
+        parser.add_argument('traffic', nargs='?', help="Fichier de trafic JSON Lines (trafic synthétique par défaut)")
+        parser.add_argument('--repeat', type=int, default=5, help="Exécutions par requête pour les mesures")
+        parser.add_argument('--commit', action='store_true', help="Conserver les écritures faites pendant le rejeu")
+        parser.add_argument('--write-migration', action='store_true', help="Écrire une migration AddIndex par application")
+
+    def handle(self, *args, **options):
+        entries = load_traffic(options['traffic']) if options['traffic'] else synthetic_traffic()
+        if not entries:
+            raise CommandError("Aucune requête rejouable (chaque ligne doit avoir un champ \"path\").")
+
+        statements = self.capture(entries, options['commit'])
+        scans_by_view, candidates = self.analyse(statements)
+        self.report_views(statements, scans_by_view)
+        if not candidates:
+            self.stdout.write(self.style.SUCCESS("Aucun index à recommander."))
+            return
+
+        recommendations = self.measure(candidates, options['repeat'])
+        self.report_recommendations(recommendations)
+        if options['write_migration']:
+            self.write_migrations(recommendations)
+
+    def capture(self, entries, commit):
+        """Rejoue le trafic ; retourne {(alias, sql): ensemble des vues}."""
+        statements = defaultdict(set)
+        replayer = TrafficReplayer(client_class=lambda: Client(raise_request_exception=False))
+        with replay_environment():
+            with transaction.atomic():
+                for entry in entries:
+                    view = url_name(entry['path'])
+                    with ExitStack() as stack:
+                        contexts = {
+                            alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                            for alias in connections
+                        }
+                        try:
+                            with transaction.atomic():
+                                replayer.replay(entry)
+                        except Exception as exc:
+                            self.stderr.write("%s %s : %s" % (entry.get('method', 'GET'), entry['path'], exc))
+                    for alias, context in contexts.items():
+                        for query in context.captured_queries:
+                            sql = query['sql']
+                            if sql and sql.lstrip().upper().startswith('SELECT'):
+                                statements[(alias, sql)].add(view)
+                if not commit:
+                    transaction.set_rollback(True)
+        return statements
+
+    def analyse(self, statements):
+        tables = project_models_by_table()
+        scans_by_view = defaultdict(lambda: defaultdict(int))
+        candidates = {}
+        for (alias, sql), views in statements.items():
+            connection = connections[alias]
+            try:
+                scanned = explain_full_scans(connection, sql)
+            except DatabaseError:
+                continue
+            aliases = {short: name for name, short in TABLE_ALIAS.findall(sql)}
+            for name in scanned:
+                table = aliases.get(name, name)
+                for view in views:
+                    scans_by_view[view][table] += 1
+                model = tables.get(table)
+                if model is None:
+                    continue
+                columns = predicate_columns(sql, table)
+                if not columns:
+                    continue
+                if any(index[:len(columns)] == tuple(columns) for index in existing_indexes(connection, table)):
+                    continue
+                key = (alias, table, tuple(columns))
+                candidate = candidates.setdefault(key, {'model': model, 'columns': columns, 'statements': set(), 'views': set()})
+                candidate['statements'].add(sql)
+                candidate['views'].update(views)
+        return scans_by_view, candidates
+
+    def measure(self, candidates, repeat):
+        """Mesure les requêtes avant puis après création temporaire des index."""
+        recommendations = []
+        by_alias = defaultdict(list)
+        for (alias, table, columns), candidate in candidates.items():
+            model = candidate['model']
+            columns_to_fields = {f.column: f.name for f in model._meta.concrete_fields}
+            index = models.Index(fields=[columns_to_fields[c] for c in candidate['columns']])
+            index.set_name_with_model(model)
+            candidate['index'] = index
+            by_alias[alias].append(candidate)
+
+        for alias, items in by_alias.items():
+            connection = connections[alias]
+            statements = sorted({sql for candidate in items for sql in candidate['statements']})
+            before = {sql: time_statement(connection, sql, repeat) for sql in statements}
+            # MySQL valide implicitement chaque CREATE INDEX : l'annulation de la
+            # transaction ne les retirerait pas, ils sont supprimés un à un
+            rollback_ddl = connection.features.can_rollback_ddl
+            editor = connection.schema_editor(collect_sql=True)
+            created = []
+            try:
+                with transaction.atomic(using=alias) if rollback_ddl else nullcontext():
+                    with connection.cursor() as cursor:
+                        for candidate in items:
+                            cursor.execute(str(candidate['index'].create_sql(candidate['model'], editor)))
+                            created.append(candidate)
+                    after = {sql: time_statement(connection, sql, repeat) for sql in statements}
+                    still_scanning = {sql for sql in statements if explain_full_scans(connection, sql)}
+                    if rollback_ddl:
+                        transaction.set_rollback(True, using=alias)
+            finally:
+                if not rollback_ddl:
+                    self.drop_indexes(connection, editor, created)
+
+            for candidate in items:
+                sqls = candidate['statements']
+                candidate['before_ms'] = sum(before[sql] for sql in sqls)
+                candidate['after_ms'] = sum(after[sql] for sql in sqls)
+                candidate['removes_scan'] = not (sqls & still_scanning)
+                recommendations.append(candidate)
+        return recommendations
+
+    def drop_indexes(self, connection, editor, candidates):
+        for candidate in candidates:
+            index = candidate['index']
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(str(index.remove_sql(candidate['model'], editor)))
+            except DatabaseError as exc:
+                self.stderr.write("Index temporaire %s non supprimé, à retirer à la main : %s" % (index.name, exc))
+
+    def report_views(self, statements, scans_by_view):
+        counts = defaultdict(int)
+        for views in statements.values():
+            for view in views:
+                counts[view] += 1
+        self.stdout.write(self.style.MIGRATE_HEADING("Parcours complets par vue"))
+        for view in sorted(counts):
+            scans = scans_by_view.get(view, {})
+            detail = ', '.join('%s (x%d)' % (table, n) for table, n in sorted(scans.items())) or '-'
+            self.stdout.write("  %-32s %4d SELECT  %s" % (view, counts[view], detail))
+
+    def report_recommendations(self, recommendations):
+        self.stdout.write(self.style.MIGRATE_HEADING("Index recommandés"))
+        for candidate in recommendations:
+            model = candidate['model']
+            index = candidate['index']
+            self.stdout.write("  %s.%s  models.Index(fields=%r, name=%r)" % (
+                model._meta.app_label, model.__name__, index.fields, index.name))
+            self.stdout.write("      vues : %s" % ', '.join(sorted(candidate['views'])))
+            self.stdout.write("      %.2f ms -> %.2f ms%s" % (
+                candidate['before_ms'], candidate['after_ms'],
+                '' if candidate['removes_scan'] else ' (parcours complet persistant)'))
+
+    def write_migrations(self, recommendations):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        by_app = defaultdict(list)
+        for candidate in recommendations:
+            by_app[candidate['model']._meta.app_label].append(candidate)
+
+        for app_label, items in sorted(by_app.items()):
+            leaves = loader.graph.leaf_nodes(app_label)
+            number = max((int(name[:4]) for _, name in leaves if name[:4].isdigit()), default=0) + 1
+            migration = Migration('%04d_advised_indexes' % number, app_label)
+            migration.dependencies = leaves
+            migration.operations = [
+                AddIndex(model_name=c['model']._meta.model_name, index=c['index']) for c in items
+            ]
+            writer = MigrationWriter(migration)
+            with open(writer.path, 'w', encoding='utf-8') as fichier:
+                fichier.write(writer.as_string())
+            self.stdout.write(self.style.SUCCESS("Migration écrite : %s" % writer.path))
+        self.stdout.write("Reporter ces index dans Meta.indexes des modèles concernés.")
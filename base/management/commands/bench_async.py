@@ -0,0 +1,135 @@
+"""
+Compare les points d'entrée JSON synchrones (WSGI) et asynchrones (ASGI).
+
+Chaque chemin tourne dans un processus distinct (ASYNC_VIEWS=0 puis 1) pour
+que l'URLconf charge la bonne version des vues, sur une base de test jetable
+créée pour l'occasion. Rapporte requêtes par seconde et p99 par point d'entrée.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from base.bench import run_async, run_threaded
+from base.traffic import replay_environment
+
+
+ENDPOINTS = ['add_to_cart', 'update_cart', 'add_coupon', 'delete_from_cart', 'post_contact', 'post_newsletter', 'islogin']
+PASSWORD = 'Bench@123456'
+
+
+def create_fixtures(total):
+    from django.contrib.auth.models import User
+    from customer.models import CodePromotionnel, Customer, Panier, ProduitPanier
+    from shop.models import CategorieEtablissement, CategorieProduit, Etablissement, Produit
+
+    user = User.objects.create_user('bench', 'bench@example.com', PASSWORD, first_name='Bench', last_name='Bench')
+    customer = Customer.objects.create(user=user, adresse='-', contact_1='0')
+    categorie_etab = CategorieEtablissement.objects.create(nom='Bench', description='-')
+    categorie = CategorieProduit.objects.create(nom='Bench', description='-', categorie=categorie_etab)
+    etablissement = Etablissement.objects.create(
+        user=user, nom='Bench', description='-', logo='b-1.jpg', couverture='b-1.jpg',
+        categorie=categorie_etab, adresse='-', pays='CI', contact_1='0', email='bench@example.com',
+        nom_du_responsable='Bench', prenoms_duresponsable='Bench',
+    )
+    produits = [
+        Produit.objects.create(
+            nom='Produit %d' % i, description='-', description_deal='-', prix=1000 + i,
+            categorie=categorie, etablissement=etablissement,
+        ).pk
+        for i in range(20)
+    ]
+    panier = Panier.objects.create(customer=customer)
+    panier_suppression = Panier.objects.create(customer=customer)
+    CodePromotionnel.objects.create(
+        libelle='BENCH', etat=True, date_fin=date.today() + timedelta(days=1), reduction=0.1, code_promo='BENCH',
+    )
+    lignes = ProduitPanier.objects.bulk_create(
+        [ProduitPanier(produit_id=produits[0], panier=panier_suppression) for _ in range(total)]
+    )
+    return {
+        'panier': panier.pk,
+        'produits': produits,
+        'lignes': [ligne.pk for ligne in lignes],
+    }
+
+
+def scenarios(data):
+    produits = data['produits']
+    return {
+        'add_to_cart': lambda i: (reverse('add_to_cart'), {
+            'panier': data['panier'], 'produit': produits[i % len(produits)], 'quantite': 1 + i % 3}),
+        'update_cart': lambda i: (reverse('update_cart'), {
+            'panier': data['panier'], 'produit': produits[i % len(produits)], 'quantite': 2}),
+        'add_coupon': lambda i: (reverse('add_coupon'), {'panier': data['panier'], 'coupon': 'BENCH'}),
+        'delete_from_cart': lambda i: (reverse('delete_from_cart'), {
+            'panier': data['panier'], 'produit_panier': data['lignes'][i]}),
+        'post_contact': lambda i: (reverse('post_contact'), {
+            'email': 'bench%d@example.com' % i, 'sujet': 'Bench', 'messages': 'Bench', 'nom': 'Bench'}),
+        'post_newsletter': lambda i: (reverse('post_newsletter'), {'email': 'bench%d@example.com' % i}),
+        'islogin': lambda i: (reverse('post'), {'username': 'bench', 'password': PASSWORD}),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare débit et p99 des vues JSON synchrones (WSGI) et asynchrones (ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requêtes par point d'entrée")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+        parser.add_argument('--worker', choices=['sync', 'async'], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        results = {}
+        for mode in ('sync', 'async'):
+            env = dict(os.environ, ASYNC_VIEWS='1' if mode == 'async' else '0')
+            command = [
+                sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'bench_async', '--worker', mode,
+                '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+                '--endpoints', *options['endpoints'],
+            ]
+            result = subprocess.run(command, capture_output=True, text=True, env=env)
+            if result.returncode != 0:
+                raise CommandError(result.stderr.strip() or 'échec du worker %s' % mode)
+            results[mode] = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.stdout.write("%-18s %10s %10s %11s %11s %7s" % (
+            "point d'entrée", 'sync rps', 'async rps', 'sync p99', 'async p99', 'erreurs'))
+        for endpoint in options['endpoints']:
+            sync, async_ = results['sync'][endpoint], results['async'][endpoint]
+            self.stdout.write("%-18s %10.1f %10.1f %9.1fms %9.1fms %3d/%-3d" % (
+                endpoint, sync['rps'], async_['rps'], sync['p99_ms'], async_['p99_ms'],
+                sync['errors'], async_['errors']))
+
+    def run_worker(self, options):
+        if settings.ASYNC_VIEWS != (options['worker'] == 'async'):
+            raise CommandError("ASYNC_VIEWS ne correspond pas au mode %s" % options['worker'])
+        settings.DATABASE_REPLICAS = []
+        runner = run_async if options['worker'] == 'async' else run_threaded
+
+        with tempfile.TemporaryDirectory() as tmpdir, replay_environment():
+            if connection.vendor == 'sqlite':
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                make_request = scenarios(create_fixtures(options['requests']))
+                return {
+                    endpoint: runner(make_request[endpoint], options['requests'], options['concurrency'])
+                    for endpoint in options['endpoints']
+                }
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
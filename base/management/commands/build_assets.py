@@ -0,0 +1,51 @@
+"""
+Construit les bundles CSS/JS de la boutique (voir base.assets), puis lance
+collectstatic qui les hache, écrit le manifeste et les précompresse.
+
+    python manage.py build_assets            # bundles + collectstatic
+    python manage.py build_assets --check    # échoue si un bundle n'est pas à jour
+"""
+
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from base import assets
+
+
+class Command(BaseCommand):
+    help = "Assemble et minifie les bundles CSS/JS, puis lance collectstatic (hachage, manifeste, gzip/Brotli)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Vérifier que les bundles écrits sont à jour")
+        parser.add_argument('--no-minify', action='store_true')
+        parser.add_argument('--no-collect', action='store_true', help="Ne pas lancer collectstatic")
+
+    def handle(self, *args, **options):
+        stale = []
+        for name in assets.bundles():
+            try:
+                content = assets.build(name, minify=not options['no_minify'])
+            except assets.BundleError as error:
+                raise CommandError(str(error))
+            path = assets.bundle_path(name)
+            current = None
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as fichier:
+                    current = fichier.read()
+            if content == current:
+                self.stdout.write("%s : à jour" % name)
+                continue
+            if options['check']:
+                stale.append(name)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as fichier:
+                fichier.write(content)
+            self.stdout.write(self.style.SUCCESS("%s : %d octets" % (name, len(content.encode('utf-8')))))
+
+        if stale:
+            raise CommandError("Bundles à reconstruire (manage.py build_assets) : %s" % ', '.join(stale))
+        if not options['check'] and not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
@@ -0,0 +1,102 @@
+"""
+Conversion des fichiers media existants au nommage par empreinte.
+
+Pour chaque FileField/ImageField stocké par ContentHashStorage, chaque fichier
+référencé est copié sous son nom haché (une seule fois par contenu : les
+doublons « 2.webp », « 2_2TvqQ88.webp »… convergent vers le même fichier),
+puis les références sont réécrites en une requête UPDATE … CASE par lot.
+Les anciens fichiers ne sont supprimés qu'après validation de la transaction.
+
+Les valeurs par défaut des champs (ex. « b-1.jpg ») restent en place : les
+nouvelles lignes continuent de les référencer.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, FileField, Value, When
+
+from base.storage import ContentHashStorage
+
+
+BATCH_SIZE = 500
+
+
+def hashed_fields():
+    """(modèle, champ) des champs fichier stockés par empreinte."""
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentHashStorage):
+                yield model, field
+
+
+def rewrite_references(model, field, renames):
+    """Remplace les anciens noms par les nouveaux, par lots de BATCH_SIZE. Retourne le nombre de lignes."""
+    olds, updated = list(renames), 0
+    for start in range(0, len(olds), BATCH_SIZE):
+        batch = olds[start:start + BATCH_SIZE]
+        updated += model._base_manager.filter(**{'%s__in' % field.attname: batch}).update(**{
+            field.attname: Case(*[When(**{field.attname: old}, then=Value(renames[old])) for old in batch], default=field.attname, output_field=field),
+        })
+    return updated
+
+
+class Command(BaseCommand):
+    help = "Renomme les fichiers media par empreinte de contenu, fusionne les doublons et réécrit les références."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Afficher les renommages sans rien modifier")
+        parser.add_argument('--keep', action='store_true', help="Conserver les anciens fichiers")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        plans, obsolete, kept, defaults = [], {}, set(), set()
+        for model, field in hashed_fields():
+            storage = field.storage
+            default = field.get_default()
+            defaults.add(default)
+            renames = {}
+            names = model._base_manager.exclude(**{field.attname: ''}).exclude(**{'%s__isnull' % field.attname: True})
+            for name in names.values_list(field.attname, flat=True).distinct().iterator():
+                if name == default:
+                    continue
+                if not storage.exists(name):
+                    self.stdout.write(self.style.WARNING("Fichier manquant : %s (%s.%s)" % (name, model.__name__, field.name)))
+                    continue
+                with storage.open(name) as fichier:
+                    target = storage.hashed_name(name, fichier)
+                    if target != name and not dry_run and not storage.exists(target):
+                        storage.save(target, fichier)
+                if target != name:
+                    renames[name] = target
+                    kept.add(target)
+            if renames:
+                plans.append((model, field, renames))
+                obsolete.update(dict.fromkeys(renames, storage))
+                if dry_run or options['verbosity'] > 1:
+                    for old, new in sorted(renames.items()):
+                        self.stdout.write("%s.%s : %s -> %s" % (model.__name__, field.name, old, new))
+
+        if dry_run:
+            self.stdout.write("%d fichiers à renommer vers %d fichiers" % (len(obsolete), len(kept)))
+            return
+
+        with transaction.atomic():
+            rows = sum(rewrite_references(model, field, renames) for model, field, renames in plans)
+
+        deleted = 0
+        if not options['keep']:
+            # Un fichier par défaut d'un autre champ reste référencé par les nouvelles lignes
+            for name, storage in obsolete.items():
+                if name in kept or name in defaults:
+                    continue
+                if storage.exists(name):
+                    storage.delete(name)
+                    deleted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            "%d fichiers renommés vers %d fichiers, %d références réécrites, %d anciens fichiers supprimés"
+            % (len(obsolete), len(kept), rows, deleted)
+        ))
@@ -0,0 +1,166 @@
+"""
+Test de charge dans le processus, par rejeu de trafic.
+
+Rejoue un fichier de trafic JSON Lines (voir base.traffic) ou, à défaut, un
+mélange synthétique catalogue / panier / commande / marchand, à travers le
+gestionnaire WSGI ou ASGI de Django, sur plusieurs threads ou processus.
+Rapporte p50/p95/p99, requêtes par seconde et requêtes SQL par requête HTTP,
+globalement et par nom d'URL ; --output écrit le tout en JSON pour comparer
+les exécutions.
+
+Par défaut, une base SQLite est d'abord copiée dans un fichier temporaire :
+les écritures du rejeu (panier, etc.) ne touchent pas la base réelle.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from base.bench import QueryCounter, summarize
+from base.traffic import TrafficReplayer, load_traffic, replay_environment, storefront_mix, url_name
+
+
+def replay_share(entries, interface, indexes):
+    """
+    Rejoue entries[i] pour chaque i de `indexes` dans le thread courant.
+    Retourne une liste de (nom d'URL, latence en secondes, requêtes SQL, statut).
+    """
+    client_class = AsyncClient if interface == 'asgi' else Client
+    replayer = TrafficReplayer(partial(client_class, raise_request_exception=False))
+    counter = QueryCounter()
+    samples = []
+    try:
+        with counter.installed():
+            for i in indexes:
+                entry = entries[i % len(entries)]
+                before = counter.count
+                start = time.perf_counter()
+                response = replayer.replay(entry)
+                samples.append((url_name(entry['path']), time.perf_counter() - start, counter.count - before, response.status_code))
+    finally:
+        connections.close_all()
+    return samples
+
+
+def replay_threads(entries, interface, total, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        shares = pool.map(partial(replay_share, entries, interface), [range(n, total, concurrency) for n in range(concurrency)])
+        return [sample for share in shares for sample in share]
+
+
+def replay_processes(entries, interface, total, concurrency):
+    # Les processus héritent de la configuration (base copiée comprise) par fork
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(concurrency) as pool:
+        shares = pool.map(partial(replay_share, entries, interface), [range(n, total, concurrency) for n in range(concurrency)])
+    return [sample for share in shares for sample in share]
+
+
+def report(samples, elapsed):
+    def stats(group):
+        result = summarize([s[1] for s in group], elapsed, sum(1 for s in group if s[3] >= 400))
+        queries = [s[2] for s in group]
+        result['queries_mean'] = sum(queries) / len(queries) if queries else 0.0
+        result['queries_max'] = max(queries, default=0)
+        return result
+
+    by_url = defaultdict(list)
+    for sample in samples:
+        by_url[sample[0]].append(sample)
+    return stats(samples), {name: stats(group) for name, group in sorted(by_url.items())}
+
+
+class Command(BaseCommand):
+    help = "Rejoue du trafic enregistré ou synthétique et mesure latences, débit et requêtes SQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--traffic', help="Fichier de trafic JSON Lines (mélange synthétique par défaut)")
+        parser.add_argument('--limit', type=int, default=10, help="Objets par type dans le mélange synthétique")
+        parser.add_argument('--requests', type=int, help="Nombre total de requêtes (par défaut une passe du trafic)")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+        parser.add_argument(
+            '--interface', choices=['wsgi', 'asgi'], default='wsgi',
+            help="Gestionnaire traversé (ASYNC_VIEWS=1 pour servir aussi les vues asynchrones)",
+        )
+        parser.add_argument('--warmup', type=int, default=10, help="Requêtes de chauffe, non mesurées")
+        parser.add_argument('--output', help="Fichier JSON de résultats")
+        parser.add_argument('--in-place', action='store_true', help="Rejouer sur la base configurée, sans copie")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency doit être positif")
+        if options['mode'] == 'processes' and 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("--mode processes nécessite fork sur cette plateforme")
+
+        with tempfile.TemporaryDirectory() as tmpdir, replay_environment():
+            if not options['in_place']:
+                self.use_copy(tmpdir)
+            # Tout passe par la base rejouée
+            settings.DATABASE_REPLICAS = []
+
+            entries = load_traffic(options['traffic']) if options['traffic'] else storefront_mix(options['limit'])
+            if not entries:
+                raise CommandError("Aucune requête à rejouer")
+            total = options['requests'] or len(entries)
+
+            runner = replay_processes if options['mode'] == 'processes' else replay_threads
+            # Les erreurs sont comptées dans le rapport, pas journalisées une à une
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.CRITICAL)
+            try:
+                if options['warmup']:
+                    replay_share(entries, options['interface'], range(options['warmup']))
+                start = time.perf_counter()
+                samples = runner(entries, options['interface'], total, options['concurrency'])
+                elapsed = time.perf_counter() - start
+            finally:
+                request_logger.setLevel(level)
+
+        overall, by_url = report(samples, elapsed)
+        results = {
+            'date': timezone.now().isoformat(),
+            'traffic': options['traffic'] or 'synthetique',
+            'mode': options['mode'],
+            'interface': options['interface'],
+            'async_views': settings.ASYNC_VIEWS,
+            'concurrency': options['concurrency'],
+            'elapsed_s': elapsed,
+            'overall': overall,
+            'urls': by_url,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fichier:
+                json.dump(results, fichier, indent=2, ensure_ascii=False)
+
+        self.stdout.write("%-28s %7s %8s %9s %9s %9s %8s" % ('url', 'req', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'sql moy'))
+        for name, row in list(by_url.items()) + [('TOTAL', overall)]:
+            self.stdout.write("%-28s %7d %8.1f %9.1f %9.1f %9.1f %8.1f" % (
+                name[:28], row['requests'], row['rps'], row['p50_ms'], row['p95_ms'], row['p99_ms'], row['queries_mean']))
+        if overall['errors']:
+            self.stdout.write(self.style.WARNING("%d réponses en erreur (statut >= 400)" % overall['errors']))
+
+    def use_copy(self, tmpdir):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Copie automatique réservée à SQLite : utilisez une base de recette avec --in-place")
+        source = str(connection.settings_dict['NAME'])
+        if connection.is_in_memory_db() or not os.path.exists(source):
+            raise CommandError("Base SQLite introuvable : %s" % source)
+        copy = os.path.join(tmpdir, 'loadtest.sqlite3')
+        shutil.copyfile(source, copy)
+        connections.close_all()
+        connection.settings_dict['NAME'] = copy
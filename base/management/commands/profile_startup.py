@@ -0,0 +1,100 @@
+"""
+Profil de démarrage d'un worker.
+
+Lance un interpréteur neuf avec -X importtime et tracemalloc, y charge
+Django, l'application WSGI et toutes les vues (via l'URLconf), puis rapporte
+le temps d'import et la mémoire allouée par paquet, le temps total et le RSS.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+CHILD_SCRIPT = r'''
+import json, os, sys, time, tracemalloc
+start = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+
+roots = sorted((os.path.abspath(p) for p in sys.path if p and os.path.isdir(p)), key=len, reverse=True)
+def package(filename):
+    for root in roots:
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:].split(os.sep)[0].split('.')[0]
+    return '<autre>'
+
+memory = {}
+if tracemalloc.is_tracing():
+    for stat in tracemalloc.take_snapshot().statistics('filename'):
+        name = package(stat.traceback[0].filename)
+        memory[name] = memory.get(name, 0) + stat.size
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except (ImportError, AttributeError):
+    rss_kb = None
+print(json.dumps({'elapsed': elapsed, 'rss_kb': rss_kb, 'memory': memory}))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'import et la mémoire de démarrage d'un worker, par paquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help="Nombre de paquets affichés")
+        parser.add_argument('--production', action='store_true', help="Simuler ENV=PRODUCTION (DEBUG désactivé)")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'cooldeal.settings')
+        if options['production']:
+            env['ENV'] = 'PRODUCTION'
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-X', 'tracemalloc=1', '-c', CHILD_SCRIPT],
+            capture_output=True, text=True, env=env, cwd=os.getcwd(),
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'échec du démarrage')
+
+        summary = json.loads(result.stdout.strip().splitlines()[-1])
+        import_us = defaultdict(int)
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                import_us[match.group(4).split('.')[0]] += int(match.group(1))
+
+        packages = sorted(set(import_us) | set(summary['memory']), key=lambda name: import_us.get(name, 0), reverse=True)
+        rows = [
+            {'package': name, 'import_ms': import_us.get(name, 0) / 1000, 'memory_kb': summary['memory'].get(name, 0) / 1024}
+            for name in packages
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'elapsed_ms': summary['elapsed'] * 1000,
+                'rss_kb': summary['rss_kb'],
+                'packages': rows,
+            }, indent=2))
+            return
+
+        self.stdout.write("%-32s %12s %12s" % ('paquet', 'import (ms)', 'mémoire (Ko)'))
+        for row in rows[:options['limit']]:
+            self.stdout.write("%-32s %12.1f %12.0f" % (row['package'], row['import_ms'], row['memory_kb']))
+        self.stdout.write('')
+        self.stdout.write("Démarrage : %.0f ms (tracemalloc actif, valeurs relatives)" % (summary['elapsed'] * 1000))
+        if summary['rss_kb'] is not None:
+            self.stdout.write("RSS max : %.1f Mo" % (summary['rss_kb'] / 1024))
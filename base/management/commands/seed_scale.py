@@ -0,0 +1,344 @@
+"""
+Génère un jeu de données à l'échelle de la production.
+
+Établissements (avec leurs utilisateurs), produits avec fenêtres de
+promotion, clients répartis sur les villes cities_light, favoris, paniers et
+commandes avec leurs lignes, insérés par bulk_create en lots.
+
+La génération est déterministe : chaque lot tire ses valeurs d'un
+générateur initialisé par (graine, type, début du lot), et les tirages parmi
+les lignes déjà générées (établissement d'un produit, client d'une commande…)
+se font dans l'ordre de génération, lu dans le slug ou le nom d'utilisateur,
+et non dans celui des clés primaires : en parallèle, celles-ci suivent
+l'ordre de validation des processus. Le résultat ne dépend donc ni du nombre
+de processus ni de l'ordre des lots (à --batch-size égal). Les dates sont relatives à --date (aujourd'hui par défaut).
+
+Les lots sont répartis sur plusieurs processus sauf sous SQLite, qui
+sérialise les écritures. Les comptes générés ont un nom préfixé par
+« seed_ » et le mot de passe --password.
+"""
+
+import datetime
+import multiprocessing
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from cities_light.models import City, Country
+from customer.models import Commande, Customer, Panier, ProduitPanier
+from shop.models import CategorieEtablissement, CategorieProduit, Etablissement, Favorite, Produit
+from shop import catalogue
+from shop.slugs import registry as slug_registry
+
+
+PREFIX = 'seed_'
+# Indice de génération en fin de slug (seed-produit-12) ou de nom d'utilisateur (seed_client_000012)
+INDICE = re.compile(r'\d+$')
+
+CATEGORIES = {
+    'Restaurants': ['Grillades', 'Plats locaux', 'Fast-food', 'Pâtisserie'],
+    'Beauté': ['Coiffure', 'Soins du visage', 'Manucure'],
+    'Loisirs': ['Cinéma', 'Parcs', 'Concerts', 'Karaoké'],
+    'Hôtels': ['Nuitées', 'Week-ends', 'Séminaires'],
+    'Sport': ['Salles de sport', 'Piscines', 'Cours collectifs'],
+    'Shopping': ['Mode', 'Électronique', 'Maison'],
+}
+NOMS = ['Chez', 'Maquis', 'Espace', 'Le Palais', 'La Terrasse', 'Studio', 'Maison', 'Club']
+LIEUX = ['Cocody', 'Plateau', 'Marcory', 'Yopougon', 'Treichville', 'Riviera', 'Bingerville', 'Angré']
+ARTICLES = ['Menu', 'Formule', 'Séance', 'Pack', 'Offre', 'Bon', 'Coffret', 'Forfait']
+QUALIFICATIFS = ['découverte', 'duo', 'famille', 'premium', 'express', 'prestige', 'détente', 'du jour']
+PRENOMS = ['Aya', 'Kouassi', 'Adjoua', 'Yao', 'Awa', 'Koffi', 'Mariam', 'Ibrahim', 'Fatou', 'Serge']
+NOMS_FAMILLE = ['Kouamé', 'Traoré', 'Koné', 'Yao', 'Bamba', 'Ouattara', 'Diallo', 'Konan', 'Coulibaly', 'Touré']
+
+# Contexte partagé avec les processus de travail, hérité par fork
+_context = {}
+
+
+def rng_for(kind, start):
+    return random.Random('%s:%s:%s' % (_context['seed'], kind, start))
+
+
+def par_indice(lignes):
+    """Lignes (clé de génération, ...) triées par l'indice qui termine la clé, sans cette clé."""
+    return [ligne[1:] for ligne in sorted(lignes, key=lambda ligne: int(INDICE.search(ligne[0]).group()))]
+
+
+def bulk_create_with_pks(model, objs, key):
+    """bulk_create, en relisant les clés primaires si la base ne les retourne pas."""
+    model.objects.bulk_create(objs, batch_size=_context['batch_size'])
+    if objs and objs[0].pk is None:
+        pks = dict(model.objects.filter(**{key + '__in': [getattr(o, key) for o in objs]}).values_list(key, 'pk'))
+        for obj in objs:
+            obj.pk = pks[getattr(obj, key)]
+    return objs
+
+
+def aware(day, rng):
+    moment = datetime.datetime.combine(day, datetime.time(rng.randrange(8, 22), rng.randrange(60)))
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def build_etablissements(start, end):
+    rng = rng_for('etablissement', start)
+    users = bulk_create_with_pks(User, [
+        User(
+            username='%smarchand_%06d' % (PREFIX, i), email='marchand%06d@seed.cooldeal.ci' % i,
+            password=_context['password'], first_name=rng.choice(PRENOMS), last_name=rng.choice(NOMS_FAMILLE),
+        )
+        for i in range(start, end)
+    ], 'username')
+    etablissements = []
+    for i, user in zip(range(start, end), users):
+        nom = '%s %s %s' % (rng.choice(NOMS), user.last_name, rng.choice(LIEUX))
+        etablissements.append(Etablissement(
+            user=user, nom=nom, description='%s, au cœur de %s.' % (nom, rng.choice(LIEUX)),
+            logo='b-1.jpg', couverture='b-1.jpg', categorie_id=rng.choice(_context['categories_etab']),
+            nom_du_responsable=user.last_name, prenoms_duresponsable=user.first_name,
+            ville_id=rng.choice(_context['cities']), adresse=rng.choice(LIEUX), pays="Côte d'Ivoire",
+            contact_1='07%08d' % rng.randrange(10 ** 8), email=user.email, slug='seed-etablissement-%d' % i,
+        ))
+    Etablissement.objects.bulk_create(etablissements, batch_size=_context['batch_size'])
+    return len(etablissements)
+
+
+def build_produits(start, end):
+    rng = rng_for('produit', start)
+    today = _context['today']
+    produits = []
+    for i in range(start, end):
+        etablissement_id, categorie_etab_id = rng.choice(_context['etablissements'])
+        prix = rng.randrange(10, 1000) * 50
+        produit = Produit(
+            nom='%s %s' % (rng.choice(ARTICLES), rng.choice(QUALIFICATIFS)),
+            description='Description du produit %d' % i, description_deal='Conditions du deal %d' % i,
+            prix=prix, quantite=rng.randrange(1, 500), categorie_etab_id=categorie_etab_id,
+            categorie_id=rng.choice(_context['categories_produit'][categorie_etab_id]),
+            etablissement_id=etablissement_id, super_deal=rng.random() < 0.02, slug='seed-produit-%d' % i,
+        )
+        # 40 % en promotion : fenêtre passée, en cours ou à venir
+        if rng.random() < 0.4:
+            produit.date_debut_promo = today + datetime.timedelta(days=rng.randrange(-60, 15))
+            produit.date_fin_promo = produit.date_debut_promo + datetime.timedelta(days=rng.randrange(1, 60))
+            produit.prix_promotionnel = round(prix * rng.uniform(0.5, 0.9) / 50) * 50
+        produits.append(produit)
+    Produit.objects.bulk_create(produits, batch_size=_context['batch_size'])
+    return len(produits)
+
+
+def build_clients(start, end):
+    rng = rng_for('client', start)
+    users = bulk_create_with_pks(User, [
+        User(
+            username='%sclient_%06d' % (PREFIX, i), email='client%06d@seed.cooldeal.ci' % i,
+            password=_context['password'], first_name=rng.choice(PRENOMS), last_name=rng.choice(NOMS_FAMILLE),
+        )
+        for i in range(start, end)
+    ], 'username')
+    cities, weights = _context['cities'], _context['city_weights']
+    customers = bulk_create_with_pks(Customer, [
+        Customer(
+            user=user, adresse=rng.choice(LIEUX), contact_1='05%08d' % rng.randrange(10 ** 8),
+            ville_id=rng.choices(cities, weights)[0], pays="Côte d'Ivoire",
+        )
+        for user in users
+    ], 'user_id')
+
+    produits = _context['produits']
+    favorites, paniers = [], []
+    for customer in customers:
+        for produit_id in rng.sample(produits, min(len(produits), rng.randrange(0, 6))):
+            favorites.append(Favorite(user_id=customer.user_id, produit_id=produit_id))
+        if rng.random() < 0.5:
+            paniers.append(Panier(customer=customer))
+    Favorite.objects.bulk_create(favorites, batch_size=_context['batch_size'])
+    paniers = bulk_create_with_pks(Panier, paniers, 'customer_id')
+
+    lignes = [
+        ProduitPanier(panier=panier, produit_id=produit_id, quantite=rng.randrange(1, 4))
+        for panier in paniers
+        for produit_id in rng.sample(produits, min(len(produits), rng.randrange(1, 6)))
+    ]
+    ProduitPanier.objects.bulk_create(lignes, batch_size=_context['batch_size'])
+    return len(customers)
+
+
+def build_commandes(start, end):
+    """Lignes de commande start..end, groupées en commandes de 1 à 5 lignes."""
+    rng = rng_for('commande', start)
+    today, days = _context['today'], _context['days']
+    customers, produits = _context['customers'], _context['produits']
+    commandes, lignes_par_commande = [], []
+    remaining = end - start
+    while remaining > 0:
+        count = min(remaining, rng.randrange(1, 6))
+        remaining -= count
+        lignes = [(rng.choice(produits), rng.randrange(1, 4)) for _ in range(count)]
+        day = today - datetime.timedelta(days=rng.randrange(days))
+        n = end - remaining
+        commandes.append(Commande(
+            customer_id=rng.choice(customers), id_paiment='SEED%010d' % n, transaction_id='seed-%d' % n,
+            prix_total=sum(_context['prix'][produit_id] * quantite for produit_id, quantite in lignes),
+            date_add=aware(day, rng),
+        ))
+        lignes_par_commande.append(lignes)
+    commandes = bulk_create_with_pks(Commande, commandes, 'transaction_id')
+    ProduitPanier.objects.bulk_create([
+        ProduitPanier(commande=commande, produit_id=produit_id, quantite=quantite, date_add=commande.date_add)
+        for commande, lignes in zip(commandes, lignes_par_commande)
+        for produit_id, quantite in lignes
+    ], batch_size=_context['batch_size'])
+    return end - start
+
+
+BUILDERS = {
+    'etablissements': build_etablissements,
+    'produits': build_produits,
+    'clients': build_clients,
+    'commandes': build_commandes,
+}
+
+
+def run_chunk(kind, start, end):
+    with transaction.atomic():
+        return BUILDERS[kind](start, end)
+
+
+@contextmanager
+def keep_explicit_dates(*fields):
+    """Désactive auto_now_add le temps du chargement, pour étaler les dates."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Génère un catalogue et un historique de commandes à l'échelle de la production (déterministe)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--etablissements', type=int, default=2000)
+        parser.add_argument('--produits', type=int, default=100000)
+        parser.add_argument('--clients', type=int, default=20000)
+        parser.add_argument('--lignes', type=int, default=1000000, help="Lignes de commande (ProduitPanier)")
+        parser.add_argument('--jours', type=int, default=730, help="Profondeur de l'historique de commandes")
+        parser.add_argument('--date', help="Date de référence AAAA-MM-JJ (aujourd'hui par défaut)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Ignoré sous SQLite")
+        parser.add_argument('--password', default='Seed@123456', help="Mot de passe des comptes générés")
+        parser.add_argument('--clear', action='store_true', help="Supprimer d'abord les données « seed_ »")
+
+    def handle(self, *args, **options):
+        workers = 1 if connection.vendor == 'sqlite' else max(1, options['workers'])
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            workers = 1
+        self.workers, self.batch_size = workers, options['batch_size']
+
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError("Des données « seed_ » existent déjà : relancer avec --clear")
+
+        _context.clear()
+        _context.update({
+            'seed': options['seed'],
+            'batch_size': options['batch_size'],
+            'today': datetime.date.fromisoformat(options['date']) if options['date'] else datetime.date.today(),
+            'days': max(1, options['jours']),
+            # Un seul hachage pour tous les comptes : PBKDF2 par utilisateur prendrait des heures
+            'password': make_password(options['password'], salt='seedscale%d' % options['seed']),
+        })
+        self.prepare_referentiels()
+
+        self.phase('etablissements', options['etablissements'])
+        etablissements = par_indice(Etablissement.objects.filter(slug__startswith='seed-').values_list('slug', 'pk', 'categorie_id'))
+        if not etablissements:
+            raise CommandError("Aucun établissement généré : --etablissements doit être positif")
+        _context['etablissements'] = etablissements
+
+        self.phase('produits', options['produits'])
+        produits = par_indice(Produit.objects.filter(slug__startswith='seed-').values_list('slug', 'pk', 'prix', 'prix_promotionnel'))
+        _context['prix'] = {pk: promo or prix for pk, prix, promo in produits}
+        _context['produits'] = [pk for pk, prix, promo in produits]
+        if not _context['produits']:
+            raise CommandError("Aucun produit généré : --produits doit être positif")
+
+        self.phase('clients', options['clients'])
+        _context['customers'] = [pk for pk, in par_indice(
+            Customer.objects.filter(user__username__startswith=PREFIX).values_list('user__username', 'pk'))]
+        if _context['customers']:
+            with keep_explicit_dates(Commande._meta.get_field('date_add'), ProduitPanier._meta.get_field('date_add')):
+                self.phase('commandes', options['lignes'])
+
+        # bulk_create n'émet pas post_save : les workers rechargent leurs slugs
+        slug_registry.bump_version()
+        catalogue.invalider()
+
+    def prepare_referentiels(self):
+        """Catégories et villes : peu de lignes, créées une fois, hors lots."""
+        categories_produit = {}
+        for nom, sous_categories in CATEGORIES.items():
+            categorie = CategorieEtablissement.objects.filter(nom=nom).first()
+            if categorie is None:
+                categorie = CategorieEtablissement.objects.create(nom=nom, description=nom)
+            ids = []
+            for sous_nom in sous_categories:
+                sous_categorie = CategorieProduit.objects.filter(nom=sous_nom, categorie=categorie).first()
+                if sous_categorie is None:
+                    sous_categorie = CategorieProduit.objects.create(nom=sous_nom, description=sous_nom, categorie=categorie)
+                ids.append(sous_categorie.pk)
+            categories_produit[categorie.pk] = ids
+        _context['categories_etab'] = sorted(categories_produit)
+        _context['categories_produit'] = categories_produit
+
+        cities = list(City.objects.order_by('pk').values_list('pk', 'population'))
+        if not cities:
+            country, _ = Country.objects.get_or_create(
+                slug='ci', defaults={'name': "Côte d'Ivoire", 'name_ascii': "Cote d'Ivoire", 'code2': 'CI', 'code3': 'CIV'})
+            for nom in ('Abidjan', 'Bouaké', 'Yamoussoukro', 'San-Pédro', 'Korhogo', 'Daloa'):
+                City.objects.get_or_create(slug=nom.lower(), defaults={'name': nom, 'name_ascii': nom, 'country': country})
+            cities = list(City.objects.order_by('pk').values_list('pk', 'population'))
+        _context['cities'] = [pk for pk, _ in cities]
+        # Les clients suivent la population quand cities_light la connaît
+        _context['city_weights'] = [max(population or 0, 1000) for _, population in cities]
+
+    def phase(self, kind, total):
+        if total <= 0:
+            return
+        chunks = [(kind, start, min(start + self.batch_size, total)) for start in range(0, total, self.batch_size)]
+        started = time.perf_counter()
+        if self.workers > 1:
+            # Chaque processus ouvre ses propres connexions
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(self.workers, initializer=connections.close_all) as pool:
+                created = sum(pool.starmap(run_chunk, chunks))
+        else:
+            created = sum(run_chunk(*chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - started
+        self.stdout.write("%-15s %9d en %6.1f s (%d lots, %d processus)" % (kind, created, elapsed, len(chunks), self.workers))
+
+    def clear(self):
+        started = time.perf_counter()
+        # Du plus dépendant au moins dépendant : chaque suppression reste un DELETE en masse
+        ProduitPanier.objects.filter(commande__transaction_id__startswith='seed-').delete()
+        Commande.objects.filter(transaction_id__startswith='seed-').delete()
+        ProduitPanier.objects.filter(panier__customer__user__username__startswith=PREFIX).delete()
+        Panier.objects.filter(customer__user__username__startswith=PREFIX).delete()
+        Favorite.objects.filter(user__username__startswith=PREFIX).delete()
+        Produit.objects.filter(slug__startswith='seed-').delete()
+        Etablissement.objects.filter(slug__startswith='seed-').delete()
+        Customer.objects.filter(user__username__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+        slug_registry.bump_version()
+        self.stdout.write("Données « seed_ » supprimées en %.1f s" % (time.perf_counter() - started))
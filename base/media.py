@@ -0,0 +1,101 @@
+"""
+Service des fichiers de MEDIA_ROOT (images produits, logos, photos).
+
+La vue media_view répond aux requêtes conditionnelles (ETag, Last-Modified,
+304), aux requêtes partielles (Range, 206) et pose un Cache-Control long et
+immuable sur les noms versionnés. Derrière nginx ou Apache, MEDIA_OFFLOAD
+délègue l'envoi des octets au proxy (X-Accel-Redirect / X-Sendfile) : le
+worker Python ne fait plus que vérifier le chemin et poser les en-têtes.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# Fichiers privés déposés dans MEDIA_ROOT avant base.storage.PrivateStorage
+PRIVATE_PREFIXES = ('imports/',)
+
+
+def media_path(name):
+    """Chemin absolu de `name` dans MEDIA_ROOT, ou None s'il n'y désigne pas un fichier public."""
+    if posixpath.normpath(name).lstrip('/').startswith(PRIVATE_PREFIXES):
+        return None
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        # Le chemin sort de MEDIA_ROOT
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def etag(stat):
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def is_versioned(name):
+    """Un nom portant une empreinte de contenu ne change jamais de contenu."""
+    return bool(re.search(getattr(settings, 'MEDIA_VERSIONED_PATTERN', r'$^'), os.path.basename(name)))
+
+
+def cache_control(name):
+    if is_versioned(name):
+        return 'public, max-age=31536000, immutable'
+    return 'public, max-age=%d' % getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+
+
+def content_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    return content_type or 'application/octet-stream'
+
+
+def parse_range(header, size):
+    """
+    (début, fin incluse) pour un en-tête « bytes=a-b », « bytes=a- » ou « bytes=-n ».
+    None si l'en-tête est absent ou ignoré (plusieurs plages, autre unité) :
+    le fichier est alors servi entier. ValueError si la plage est insatisfiable.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffixe : les n derniers octets
+        length = int(last)
+        if not length or not size:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as fichier:
+        fichier.seek(start)
+        while length > 0:
+            chunk = fichier.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload_headers(name, path):
+    """En-têtes de délégation au proxy selon MEDIA_OFFLOAD, {} si désactivé."""
+    offload = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if offload == 'x-accel-redirect':
+        return {'X-Accel-Redirect': getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + quote(name)}
+    if offload == 'x-sendfile':
+        return {'X-Sendfile': path}
+    return {}
@@ -0,0 +1,55 @@
+"""
+Métriques Prometheus de l'application.
+
+Sous gunicorn, chaque worker écrit ses valeurs dans PROMETHEUS_MULTIPROC_DIR
+(positionné par gunicorn.conf.py avant le chargement de l'application) et la
+vue /metrics agrège tous les workers. Sans ce répertoire, les métriques
+restent celles du processus courant.
+"""
+
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUEST_DURATION = Histogram(
+    'cooldeal_request_duration_seconds', "Durée des requêtes HTTP par nom d'URL",
+    ['view', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('cooldeal_requests_total', "Requêtes HTTP par nom d'URL et statut", ['view', 'method', 'status'])
+REQUESTS_IN_PROGRESS = Gauge(
+    'cooldeal_requests_in_progress', "Requêtes en cours de traitement, tous workers confondus",
+    multiprocess_mode='livesum',
+)
+REQUEST_QUERIES = Histogram(
+    'cooldeal_request_db_queries', "Requêtes SQL par requête HTTP", ['view'], buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'cooldeal_request_db_duration_seconds', "Temps SQL cumulé par requête HTTP", ['view'], buckets=LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter('cooldeal_cache_requests_total', "Lectures du cache Django", ['cache', 'result'])
+
+INVOICE_PDF_DURATION = Histogram(
+    'cooldeal_invoice_pdf_seconds', "Génération des reçus PDF, par étape", ['stage'], buckets=LATENCY_BUCKETS,
+)
+
+EMAIL_SEND_DURATION = Histogram('cooldeal_email_send_seconds', "Envoi des e-mails", buckets=LATENCY_BUCKETS)
+EMAILS = Counter('cooldeal_emails_total', "E-mails envoyés ou en échec", ['result'])
+
+CART_OPERATIONS = Counter('cooldeal_cart_operations_total', "Opérations sur les paniers", ['operation'])
+ORDERS = Counter('cooldeal_orders_total', "Commandes", ['status'])
+RATELIMITED = Counter('cooldeal_ratelimited_total', "Requêtes refusées (429) par nom d'URL et portée", ['view', 'scope'])
+
+
+def exposition():
+    """Texte d'exposition Prometheus, agrégé sur tous les workers si possible."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
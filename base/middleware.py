@@ -0,0 +1,242 @@
+"""
+Middlewares du site.
+
+Tous sont synchrones et asynchrones (sync_capable / async_capable) : sous
+ASGI, Django les appelle directement depuis la boucle d'événements au lieu
+de les encadrer chacun d'un aller-retour sync_to_async / async_to_sync.
+"""
+
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+from . import metrics, routers
+from .profiling import RequestProfiler, SQLRecorder, enregistrer_sql
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncAsyncMiddleware:
+    """
+    Base des middlewares synchrones et asynchrones, comme
+    django.utils.deprecation.MiddlewareMixin : en mode asynchrone,
+    __call__ renvoie la coroutine de __acall__.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+def est_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class ReplicaPinningMiddleware(SyncAsyncMiddleware):
+    """
+    Propage l'épinglage sur la base principale d'une requête à l'autre.
+
+    Quand une requête écrit, un cookie mémorise l'échéance : la requête
+    suivante (typiquement la redirection après un POST) lit alors sur la
+    base principale et voit sa propre écriture. Sous ASGI, l'épinglage posé
+    par une vue synchrone revient au middleware avec le contexte
+    (sync_to_async recopie les ContextVar modifiées).
+    """
+
+    def cookie_name(self):
+        return getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_pin')
+
+    def echeance(self, request):
+        try:
+            deadline = float(request.COOKIES.get(self.cookie_name(), 0))
+        except ValueError:
+            deadline = 0.0
+        maintenant = time.time()
+        if deadline <= maintenant:
+            return 0.0
+        # Le cookie vient du client : jamais plus loin que la durée d'épinglage
+        return min(deadline, maintenant + routers.pin_seconds())
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        deadline = self.echeance(request)
+        token = routers.set_pinned_until(deadline)
+        try:
+            response = self.get_response(request)
+            new_deadline = routers.pinned_until()
+        finally:
+            routers.reset_pinning(token)
+        return self.memoriser(response, deadline, new_deadline)
+
+    async def __acall__(self, request):
+        deadline = self.echeance(request)
+        token = routers.set_pinned_until(deadline)
+        try:
+            response = await self.get_response(request)
+            new_deadline = routers.pinned_until()
+        finally:
+            routers.reset_pinning(token)
+        return self.memoriser(response, deadline, new_deadline)
+
+    def memoriser(self, response, deadline, new_deadline):
+        if new_deadline > deadline and new_deadline > time.time():
+            response.set_cookie(
+                self.cookie_name(),
+                '%.3f' % new_deadline,
+                max_age=max(1, int(new_deadline - time.time()) + 1),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RequestProfilerMiddleware(SyncAsyncMiddleware):
+    """
+    Profile une requête à la demande : un membre du staff ajoute l'en-tête
+    X-Profile ou le paramètre ?_profile, et PROFILER_SAMPLE_RATE prélève en
+    plus une fraction de tout le trafic. Le rapport (profil CPU, requêtes SQL,
+    temps des gabarits) est enregistré dans RequestProfile, visible dans
+    l'admin ; l'en-tête X-Profile-Id de la réponse en donne l'identifiant.
+
+    À placer après AuthenticationMiddleware.
+
+    Sous ASGI, le profil CPU et les requêtes SQL sont relevés dans le thread
+    qui exécute le code synchrone de la requête (vue, ORM) ; le temps passé
+    dans la boucle d'événements n'apparaît que dans la durée totale.
+    """
+
+    def demande(self, request):
+        if request.META.get('HTTP_X_PROFILE'):
+            return 'header'
+        return 'query' if '_profile' in request.GET else None
+
+    def echantillon(self):
+        rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+        return 'sample' if rate and random.random() < rate else None
+
+    def declencheur(self, request):
+        demande = self.demande(request)
+        if demande is not None and est_staff(request):
+            return demande
+        return self.echantillon()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        declencheur = self.declencheur(request)
+        if declencheur is None:
+            return self.get_response(request)
+
+        with RequestProfiler() as profiler:
+            response = self.get_response(request)
+
+        return self.signer(response, self.save(request, response, profiler, declencheur), declencheur)
+
+    async def __acall__(self, request):
+        demande = self.demande(request)
+        # request.user se charge depuis la base : seulement si un profil est demandé
+        if demande is not None and await sync_to_async(est_staff)(request):
+            declencheur = demande
+        else:
+            declencheur = self.echantillon()
+        if declencheur is None:
+            return await self.get_response(request)
+
+        profiler = RequestProfiler()
+        await sync_to_async(profiler.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(profiler.__exit__)(None, None, None)
+
+        profile = await sync_to_async(self.save)(request, response, profiler, declencheur)
+        return self.signer(response, profile, declencheur)
+
+    def signer(self, response, profile, declencheur):
+        if profile is not None and declencheur != 'sample':
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    def save(self, request, response, profiler, declencheur):
+        from .models import RequestProfile
+
+        report = profiler.report()
+        user = getattr(request, 'user', None)
+        match = getattr(request, 'resolver_match', None)
+        try:
+            profile = RequestProfile.objects.create(
+                method=request.method,
+                path=request.get_full_path()[:500],
+                view_name=(match.view_name if match else '')[:200],
+                status_code=response.status_code,
+                user=user if user is not None and user.is_authenticated else None,
+                declencheur=declencheur,
+                duree_ms=report['duree_ms'],
+                cpu_ms=report['cpu_ms'],
+                sql_count=report['sql_count'],
+                sql_ms=report['sql_ms'],
+                template_ms=report['template_ms'],
+                rapport=RequestProfile.compress({'functions': report['functions'], 'queries': report['queries']}),
+            )
+            RequestProfile.purge()
+        except DatabaseError:
+            logger.warning("Profil de %s non enregistré", request.path, exc_info=True)
+            return None
+        return profile
+
+
+class MetricsMiddleware(SyncAsyncMiddleware):
+    """
+    Alimente les métriques Prometheus des requêtes : durée, statut, requêtes
+    en cours, nombre et temps des requêtes SQL, par nom d'URL.
+
+    À placer en tête de MIDDLEWARE pour mesurer toute la chaîne.
+    """
+    METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sql = SQLRecorder(limit=0)
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with enregistrer_sql(sql):
+                response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+        self.observer(request, response, sql, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        sql = SQLRecorder(limit=0)
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            with enregistrer_sql(sql):
+                response = await self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+        self.observer(request, response, sql, time.perf_counter() - start)
+        return response
+
+    def observer(self, request, response, sql, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or '<non résolue>'
+        # Étiquettes bornées : une méthode inventée ne crée pas de nouvelle série
+        method = request.method if request.method in self.METHODS else 'OTHER'
+        metrics.REQUEST_DURATION.labels(view, method).observe(duration)
+        metrics.REQUESTS.labels(view, method, str(response.status_code)).inc()
+        metrics.REQUEST_QUERIES.labels(view).observe(sql.count)
+        metrics.REQUEST_DB_DURATION.labels(view).observe(sql.total)
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('declencheur', models.CharField(choices=[('header', 'En-tête X-Profile'), ('query', 'Paramètre _profile'), ('sample', 'Échantillonnage')], max_length=10)),
+                ('duree_ms', models.FloatField()),
+                ('cpu_ms', models.FloatField(null=True)),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_ms', models.FloatField(default=0)),
+                ('template_ms', models.FloatField(null=True)),
+                ('rapport', models.BinaryField()),
+                ('date_add', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profil de requête',
+                'verbose_name_plural': 'Profils de requêtes',
+                'ordering': ['-date_add'],
+                'indexes': [models.Index(fields=['date_add'], name='base_reques_date_ad_d77081_idx'), models.Index(fields=['view_name', 'date_add'], name='base_reques_view_na_f16026_idx')],
+            },
+        ),
+    ]
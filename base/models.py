@@ -1,3 +1,65 @@
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
+
 
 # Create your models here.
+class RequestProfile(models.Model):
+    """Profil d'une requête (CPU, SQL, gabarits), voir base.profiling."""
+    DECLENCHEURS = (
+        ('header', 'En-tête X-Profile'),
+        ('query', 'Paramètre _profile'),
+        ('sample', 'Échantillonnage'),
+    )
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='request_profiles')
+    declencheur = models.CharField(max_length=10, choices=DECLENCHEURS)
+    duree_ms = models.FloatField()
+    cpu_ms = models.FloatField(null=True)
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    template_ms = models.FloatField(null=True)
+    # Rapport détaillé (fonctions, requêtes SQL) : JSON compressé par zlib
+    rapport = models.BinaryField()
+
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Profil de requête'
+        verbose_name_plural = 'Profils de requêtes'
+        ordering = ['-date_add']
+        indexes = [
+            models.Index(fields=['date_add']),
+            models.Index(fields=['view_name', 'date_add']),
+        ]
+
+    def __str__(self):
+        return '%s %s (%.0f ms)' % (self.method, self.path, self.duree_ms)
+
+    @staticmethod
+    def compress(data):
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 9)
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(bytes(self.rapport)).decode('utf-8'))
+
+    @classmethod
+    def purge(cls):
+        """Applique la rétention : PROFILER_RETENTION_DAYS et PROFILER_MAX_REPORTS."""
+        days = getattr(settings, 'PROFILER_RETENTION_DAYS', 7)
+        deleted, _ = cls.objects.filter(date_add__lt=timezone.now() - timedelta(days=days)).delete()
+        max_reports = getattr(settings, 'PROFILER_MAX_REPORTS', 500)
+        oldest_kept = cls.objects.order_by('-pk').values_list('pk', flat=True)[max_reports - 1:max_reports]
+        if oldest_kept:
+            deleted += cls.objects.filter(pk__lt=oldest_kept[0]).delete()[0]
+        return deleted
@@ -0,0 +1,151 @@
+"""
+Profilage d'une requête : profil CPU (cProfile), requêtes SQL chronométrées
+et temps de rendu des gabarits.
+
+Le temps des gabarits est lu dans le profil CPU : c'est le temps cumulé de
+la méthode render du moteur Django (les {% include %} imbriqués y sont déjà
+comptés). Il n'est donc pas disponible quand un autre profileur occupe le
+thread et que cProfile ne peut pas démarrer.
+
+Sous ASGI, le code synchrone d'une requête (vues, ORM) s'exécute dans un
+autre thread que la boucle d'événements : enregistrer_sql() suit donc la
+requête par une ContextVar (copiée par sync_to_async) plutôt que par les
+connexions du thread courant.
+"""
+
+import cProfile
+import pstats
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+TEMPLATE_RENDER = ('django/template/backends/django.py', 'render')
+
+# Enregistreur SQL de la requête en cours (voir enregistrer_sql)
+_enregistreur = ContextVar('enregistreur_sql', default=None)
+
+
+class SQLRecorder:
+    """Enregistre les requêtes SQL du thread courant avec leur durée."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.total = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'sql': sql[:2000],
+                    'ms': round(duration * 1000, 3),
+                    'alias': context['connection'].alias,
+                    'many': many,
+                })
+
+
+def enregistreur_courant(execute, sql, params, many, context):
+    """Wrapper d'exécution posé sur chaque connexion, qui délègue à l'enregistreur du contexte."""
+    recorder = _enregistreur.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def installer_enregistreur(sender, connection, **kwargs):
+    """Récepteur de connection_created (base.apps)."""
+    if enregistreur_courant not in connection.execute_wrappers:
+        connection.execute_wrappers.append(enregistreur_courant)
+
+
+@contextmanager
+def enregistrer_sql(recorder):
+    """Passe à `recorder` les requêtes SQL du contexte courant, quel que soit le thread qui les exécute."""
+    token = _enregistreur.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _enregistreur.reset(token)
+
+
+class RequestProfiler:
+
+    def __init__(self):
+        self.sql = SQLRecorder(getattr(settings, 'PROFILER_MAX_QUERIES', 500))
+        self.profile = cProfile.Profile()
+        self.cpu_enabled = False
+        self.duration = 0.0
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.sql))
+        try:
+            self.profile.enable()
+            self.cpu_enabled = True
+        except ValueError:
+            # Un autre profileur est actif sur ce thread (sys.monitoring)
+            self.cpu_enabled = False
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self._start
+        if self.cpu_enabled:
+            self.profile.disable()
+        self._stack.close()
+        return False
+
+    def stats(self):
+        if not self.cpu_enabled:
+            return None
+        stats = pstats.Stats(self.profile)
+        return stats if stats.stats else None
+
+    def template_seconds(self, stats):
+        if stats is None:
+            return None
+        total = 0.0
+        for (filename, lineno, function), (cc, nc, tt, ct, callers) in stats.stats.items():
+            if function == TEMPLATE_RENDER[1] and filename.replace('\\', '/').endswith(TEMPLATE_RENDER[0]):
+                total += ct
+        return total
+
+    def report(self, limit=None):
+        """Résumé compact : durées, fonctions les plus coûteuses, requêtes SQL."""
+        limit = limit or getattr(settings, 'PROFILER_MAX_FUNCTIONS', 40)
+        stats = self.stats()
+        functions = []
+        cpu = None
+        if stats is not None:
+            cpu = stats.total_tt
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+            for (filename, lineno, function), (cc, nc, tt, ct, callers) in rows:
+                functions.append({
+                    'function': '%s:%d(%s)' % (filename, lineno, function),
+                    'ncalls': nc,
+                    'tottime_ms': round(tt * 1000, 3),
+                    'cumtime_ms': round(ct * 1000, 3),
+                })
+        template = self.template_seconds(stats)
+        return {
+            'duree_ms': self.duration * 1000,
+            'cpu_ms': cpu * 1000 if cpu is not None else None,
+            'template_ms': template * 1000 if template is not None else None,
+            'sql_count': self.sql.count,
+            'sql_ms': self.sql.total * 1000,
+            'functions': functions,
+            'queries': self.sql.queries,
+        }
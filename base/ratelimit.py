@@ -0,0 +1,220 @@
+"""
+Limitation de débit des points d'entrée publics.
+
+Fenêtre glissante approchée par deux compteurs fixes : le nombre de
+requêtes estimé est celui de la fenêtre en cours plus celui de la
+précédente pondéré par la part encore couverte. Deux opérations de cache
+par règle, sans liste d'horodatages à stocker.
+
+Les règles sont déclarées par nom d'URL dans RATELIMITS, avec une limite
+(nombre, secondes) par portée :
+- « ip » : adresse du client (base.adresses, proxys de confiance compris) ;
+- « session » : clé de session (ignorée si le visiteur n'en a pas encore) ;
+- « compte » : utilisateur connecté (ignorée pour un anonyme).
+
+Les compteurs vivent dans le cache configuré ; si celui-ci est indisponible,
+un compteur en mémoire du processus prend le relais plutôt que de laisser
+passer ou de bloquer tout le monde.
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from . import metrics
+from .adresses import ip_client
+from .middleware import SyncAsyncMiddleware
+
+
+logger = logging.getLogger(__name__)
+
+PORTEES = ('ip', 'session', 'compte')
+
+
+class MemoireLocale:
+    """Compteurs expirant du processus courant, utilisés quand le cache ne répond pas."""
+
+    def __init__(self):
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def incr(self, cle, duree):
+        maintenant = time.monotonic()
+        with self._verrou:
+            if len(self._valeurs) > 10000:
+                self._valeurs = {k: v for k, v in self._valeurs.items() if v[1] > maintenant}
+            valeur, expiration = self._valeurs.get(cle, (0, 0))
+            if expiration <= maintenant:
+                valeur, expiration = 0, maintenant + duree
+            self._valeurs[cle] = (valeur + 1, expiration)
+            return valeur + 1
+
+    def get(self, cle):
+        with self._verrou:
+            valeur, expiration = self._valeurs.get(cle, (0, 0))
+        return valeur if expiration > time.monotonic() else 0
+
+    def clear(self):
+        with self._verrou:
+            self._valeurs.clear()
+
+
+locale = MemoireLocale()
+
+
+def incr(cle, duree):
+    try:
+        # add() ne fait rien si le compteur existe : il expire avec sa fenêtre
+        cache.add(cle, 0, duree)
+        try:
+            return cache.incr(cle)
+        except ValueError:
+            cache.set(cle, 1, duree)
+            return 1
+    except Exception:
+        logger.warning("Cache indisponible pour la limitation de débit, compteur local", exc_info=True)
+        return locale.incr(cle, duree)
+
+
+def lire(cle):
+    try:
+        return cache.get(cle, 0)
+    except Exception:
+        return locale.get(cle)
+
+
+def attente(precedente, courante, limite, fenetre, ecoule):
+    """Secondes avant que l'estimation repasse sous la limite."""
+    if courante < limite:
+        # La fenêtre précédente doit encore perdre assez de poids
+        part = 1 - (limite - 1 - courante) / precedente if precedente else ecoule
+        return max(part - ecoule, 0) * fenetre
+    # Attendre la fenêtre suivante, où la fenêtre en cours devient la précédente
+    return (1 - ecoule) * fenetre + (1 - (limite - 1) / courante) * fenetre
+
+
+def consommer(cle, limite, fenetre, maintenant=None):
+    """
+    Compte une requête pour `cle`. Renvoie 0 si elle est admise, sinon le
+    nombre de secondes à attendre (Retry-After). Les requêtes refusées sont
+    comptées aussi : un client qui insiste reste bloqué.
+    """
+    maintenant = time.time() if maintenant is None else maintenant
+    index, reste = divmod(maintenant, fenetre)
+    ecoule = reste / fenetre
+    courante = incr('ratelimit:%s:%d' % (cle, index), fenetre * 2)
+    precedente = lire('ratelimit:%s:%d' % (cle, index - 1))
+    if precedente * (1 - ecoule) + courante <= limite:
+        return 0
+    return max(1, math.ceil(attente(precedente, courante, limite, fenetre, ecoule)))
+
+
+def identite(request, portee):
+    if portee == 'ip':
+        return ip_client(request)
+    if portee == 'session':
+        session = getattr(request, 'session', None)
+        return session.session_key if session is not None else None
+    if portee == 'compte':
+        user = getattr(request, 'user', None)
+        return str(user.pk) if user is not None and user.is_authenticated else None
+    raise ValueError("Portée de limitation inconnue : %s" % portee)
+
+
+def verifier(request, nom, regles):
+    """Applique les règles {portée: (nombre, secondes)} ; renvoie (portée, Retry-After) du refus ou None."""
+    for portee, (limite, fenetre) in regles.items():
+        valeur = identite(request, portee)
+        if not valeur:
+            continue
+        retry_after = consommer('%s:%s:%s' % (nom, portee, valeur), limite, fenetre)
+        if retry_after:
+            return portee, retry_after
+    return None
+
+
+def trop_de_requetes(retry_after):
+    response = JsonResponse({
+        'success': False,
+        'message': "Trop de requêtes, merci de réessayer dans %d secondes" % retry_after,
+    }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def limiter(nom, **regles):
+    """
+    Décorateur pour une vue hors de RATELIMITS :
+    @limiter('telechargement', ip=(20, 60))
+    """
+    def decorateur(vue):
+        @functools.wraps(vue)
+        def enveloppe(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED:
+                refus = verifier(request, nom, regles)
+                if refus is not None:
+                    metrics.RATELIMITED.labels(nom, refus[0]).inc()
+                    return trop_de_requetes(refus[1])
+            return vue(request, *args, **kwargs)
+        return enveloppe
+    return decorateur
+
+
+class RateLimitMiddleware(SyncAsyncMiddleware):
+    """
+    Applique RATELIMITS aux vues d'après leur nom d'URL, pour les méthodes de
+    RATELIMIT_METHODS. Refus en 429 avec Retry-After, avant l'exécution de la
+    vue (donc sans requête en base).
+
+    Sous ASGI, process_view est une coroutine : les compteurs sont lus dans
+    la boucle d'événements, et seule la portée « compte » (request.user,
+    chargé depuis la base) passe par sync_to_async.
+
+    À placer après SessionMiddleware et AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.async_mode:
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        # En mode asynchrone, renvoie telle quelle la coroutine de la suite de la chaîne
+        return self.get_response(request)
+
+    def regles(self, request):
+        if not settings.RATELIMIT_ENABLED or request.method not in settings.RATELIMIT_METHODS:
+            return None, None
+        nom = request.resolver_match.url_name if request.resolver_match else None
+        return nom, settings.RATELIMITS.get(nom)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        nom, regles = self.regles(request)
+        if not regles:
+            return None
+        return self.refuser(request, nom, verifier(request, nom, regles))
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        nom, regles = self.regles(request)
+        if not regles:
+            return None
+        if 'compte' in regles:
+            refus = await sync_to_async(verifier)(request, nom, regles)
+        else:
+            refus = verifier(request, nom, regles)
+        return self.refuser(request, nom, refus)
+
+    def refuser(self, request, nom, refus):
+        if refus is None:
+            return None
+        portee, retry_after = refus
+        metrics.RATELIMITED.labels(nom, portee).inc()
+        logger.info("Limite %s atteinte sur %s (%s)", portee, nom, ip_client(request))
+        return trop_de_requetes(retry_after)
@@ -0,0 +1,92 @@
+"""
+Routage lecture/écriture entre la base principale et ses réplicas.
+
+Les lectures partent sur un réplica tiré au hasard, les écritures sur la base
+principale. Après une écriture, le contexte courant reste épinglé sur la base
+principale pendant REPLICA_PIN_SECONDS, afin qu'un marchand qui vient de
+modifier un article relise bien sa propre modification (voir
+base.middleware.ReplicaPinningMiddleware pour la propagation entre requêtes).
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+PRIMARY = 'default'
+
+# Horodatage (time.time()) jusqu'auquel les lectures restent sur la base principale
+_pinned_until = ContextVar('pinned_until', default=0.0)
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_to_primary(seconds=None):
+    """Épingle le contexte courant sur la base principale."""
+    if seconds is None:
+        seconds = pin_seconds()
+    deadline = time.time() + seconds
+    if deadline > _pinned_until.get():
+        _pinned_until.set(deadline)
+
+
+def pinned_until():
+    return _pinned_until.get()
+
+
+def set_pinned_until(deadline):
+    """Positionne l'échéance d'épinglage ; retourne le jeton de réinitialisation."""
+    return _pinned_until.set(deadline)
+
+
+def reset_pinning(token):
+    _pinned_until.reset(token)
+
+
+def is_pinned():
+    return _pinned_until.get() > time.time()
+
+
+def _primary_only(model):
+    apps = getattr(settings, 'REPLICA_PRIMARY_ONLY_APPS', ())
+    return model is not None and model._meta.app_label in apps
+
+
+class PrimaryReplicaRouter:
+    """Envoie les lectures vers les réplicas et les écritures vers 'default'."""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or _primary_only(model) or is_pinned():
+            return PRIMARY
+        # Une lecture dans une transaction doit voir les écritures de cette transaction
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if replicas() and not _primary_only(model):
+            pin_to_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Toutes les bases contiennent les mêmes données
+        aliases = {PRIMARY, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas sont alimentés par la réplication, jamais migrés directement
+        if db in replicas():
+            return False
+        return None
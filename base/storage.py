@@ -0,0 +1,92 @@
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StorefrontStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Noms hachés + manifeste + précompression gzip/Brotli (WhiteNoise sert alors
+    les fichiers hachés avec un cache « immutable » d'un an).
+
+    Un fichier absent du manifeste (collectstatic pas encore relancé) est servi
+    sous son nom d'origine au lieu de faire échouer le rendu de la page ; de
+    même, une url() de CSS vers un fichier inexistant est laissée telle quelle.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+
+        return tolerant
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Stockage des fichiers envoyés, nommés par l'empreinte de leur contenu :
+    « produis/images/photo.jpg » devient « produis/images/<sha256[:16]>.jpg ».
+
+    Deux envois identiques dans le même répertoire partagent donc un seul
+    fichier, et un nom ne change jamais de contenu : base.media le sert avec
+    un cache immuable (MEDIA_VERSIONED_PATTERN). Les fichiers déjà présents
+    sont convertis par `manage.py dedupe_media`.
+    """
+    hash_length = 16
+
+    def content_hash(self, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()[:self.hash_length]
+
+    def hashed_name(self, name, content):
+        dirname, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(dirname, self.content_hash(content) + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Même empreinte, même contenu : rien à écrire
+            return name
+        return super().save(name, content, max_length)
+
+
+class PrivateStorage(FileSystemStorage):
+    """
+    Fichiers envoyés qui ne doivent pas être publics (catalogues importés,
+    archives d'images) : rangés sous PRIVATE_MEDIA_ROOT, hors de MEDIA_ROOT,
+    ils ne sont jamais servis par media_view ni par le proxy.
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from base import assets
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Balises <link> ou <script> d'un bundle de ASSET_BUNDLES : le bundle
+    construit (nom haché) en production, ses fichiers sources si
+    ASSET_BUNDLES_SOURCES est vrai.
+    """
+    if getattr(settings, 'ASSET_BUNDLES_SOURCES', settings.DEBUG):
+        paths = assets.bundles()[name]
+    else:
+        paths = [name]
+    if name.endswith('.css'):
+        tag = '<link rel="stylesheet" href="{}">'
+    else:
+        tag = '<script src="{}"></script>'
+    return format_html_join('\n    ', tag, ((static(path),) for path in paths))
@@ -0,0 +1,105 @@
+"""Tests de la base d'administration des grosses tables (FastModelAdmin)"""
+
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from base.admin import AFTER_VAR, BEFORE_VAR
+from customer.models import Commande
+
+
+pytestmark = pytest.mark.django_db
+
+URL = reverse('admin:customer_commande_changelist')
+
+
+@pytest.fixture
+def commandes(customer, monkeypatch):
+    monkeypatch.setattr(admin.site._registry[Commande], 'list_per_page', 2)
+    return [Commande.objects.create(customer=customer, prix_total=1000 * i) for i in range(5)]
+
+
+def pks(response):
+    return [obj.pk for obj in response.context['cl'].result_list]
+
+
+class TestPaginationCurseur:
+
+    @pytest.mark.integration
+    def test_parcours(self, admin_client, commandes):
+        """
+        Arrange: 5 commandes, 2 par page
+        Act: Première page, puis « Suivant » deux fois, puis « Précédent »
+        Assert: Les pages se suivent par pk décroissante sans OFFSET
+        """
+        attendu = [c.pk for c in reversed(commandes)]
+
+        premiere = admin_client.get(URL)
+        cl = premiere.context['cl']
+        assert cl.keyset and not cl.has_previous and cl.has_next
+        assert pks(premiere) == attendu[:2]
+
+        with CaptureQueriesContext(connection) as queries:
+            seconde = admin_client.get(URL + cl.next_url)
+        assert pks(seconde) == attendu[2:4]
+        assert not any('OFFSET' in q['sql'] for q in queries.captured_queries)
+
+        derniere = admin_client.get(URL + seconde.context['cl'].next_url)
+        assert pks(derniere) == attendu[4:]
+        assert not derniere.context['cl'].has_next
+
+        retour = admin_client.get(URL + derniere.context['cl'].previous_url)
+        assert pks(retour) == attendu[2:4]
+        assert retour.context['cl'].has_previous
+
+    @pytest.mark.integration
+    def test_tri_par_colonne_pagination_classique(self, admin_client, commandes):
+        response = admin_client.get(URL, {'o': '-8'})
+
+        assert not response.context['cl'].keyset
+        assert response.context['cl'].paginator.num_pages == 3
+
+    @pytest.mark.integration
+    def test_curseur_invalide(self, admin_client, commandes):
+        """Un curseur non numérique renvoie à la liste avec le marqueur d'erreur de l'admin"""
+        response = admin_client.get(URL, {AFTER_VAR: 'x'})
+
+        assert response.status_code == 302
+        assert response.url.endswith('?e=1')
+
+    @pytest.mark.integration
+    def test_curseurs_absents_des_filtres(self, admin_client, commandes):
+        response = admin_client.get(URL, {BEFORE_VAR: commandes[0].pk})
+
+        assert response.status_code == 200
+        assert pks(response) == [commandes[2].pk, commandes[1].pk]
+
+
+class TestTotalEstime:
+
+    @pytest.mark.integration
+    def test_sans_filtre(self, admin_client, commandes, monkeypatch, settings):
+        """
+        Arrange: Des statistiques annonçant 2 millions de lignes
+        Act: Afficher la liste sans filtre, puis filtrée par année
+        Assert: Total estimé sans filtre, exact avec filtre
+        """
+        monkeypatch.setattr('base.admin.estimated_count', lambda queryset: 2000000)
+        settings.ADMIN_ESTIMATED_COUNT_THRESHOLD = 1000
+
+        response = admin_client.get(URL)
+        filtree = admin_client.get(URL, {'date_add__year': commandes[0].date_add.year})
+
+        assert response.context['cl'].result_count == 2000000
+        assert response.context['cl'].paginator.estimated
+        assert '≈' in response.content.decode()
+        assert filtree.context['cl'].result_count == 5
+
+    @pytest.mark.integration
+    def test_sqlite_compte_exact(self, admin_client, commandes):
+        response = admin_client.get(URL)
+
+        assert response.context['cl'].result_count == 5
+        assert not response.context['cl'].paginator.estimated
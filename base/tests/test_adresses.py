@@ -0,0 +1,45 @@
+"""Tests de la résolution de l'adresse IP du client derrière des proxys (base.adresses)"""
+
+import pytest
+from django.test import RequestFactory
+
+from base.adresses import ip_client
+
+
+def requete(xff=None, remote='10.0.0.2'):
+    entetes = {'REMOTE_ADDR': remote}
+    if xff is not None:
+        entetes['HTTP_X_FORWARDED_FOR'] = xff
+    return RequestFactory().get('/', **entetes)
+
+
+class TestIpClient:
+
+    @pytest.mark.unit
+    def test_sans_proxy_en_tete_ignore(self, settings):
+        settings.TRUSTED_PROXY_COUNT = 0
+
+        assert ip_client(requete('1.2.3.4')) == '10.0.0.2'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('proxys, xff, attendu', [
+        (1, '198.51.100.7', '198.51.100.7'),
+        (1, '1.2.3.4, 198.51.100.7', '198.51.100.7'),
+        (2, '1.2.3.4, 198.51.100.7, 10.0.0.1', '198.51.100.7'),
+    ])
+    def test_entree_posee_par_le_proxy(self, settings, proxys, xff, attendu):
+        """
+        Arrange: N proxys de confiance, le client ajoute une fausse adresse en tête
+        Act: Résoudre l'adresse du client
+        Assert: Seule l'entrée ajoutée par le premier proxy de confiance est retenue
+        """
+        settings.TRUSTED_PROXY_COUNT = proxys
+
+        assert ip_client(requete(xff)) == attendu
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('xff', [None, '', 'pas-une-ip'])
+    def test_repli_sur_remote_addr(self, settings, xff):
+        settings.TRUSTED_PROXY_COUNT = 1
+
+        assert ip_client(requete(xff)) == '10.0.0.2'
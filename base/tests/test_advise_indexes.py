@@ -0,0 +1,93 @@
+"""Tests du conseiller d'index (advise_indexes)"""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from shop.models import Produit
+
+from base.management.commands.advise_indexes import Command, existing_indexes, explain_full_scans, predicate_columns
+from base.traffic import load_traffic
+
+
+class TestPredicateColumns:
+
+    @pytest.mark.unit
+    def test_egalite_puis_tri(self):
+        """Les colonnes en égalité passent avant la colonne de tri"""
+        sql = ('SELECT * FROM "customer_commande" WHERE "customer_commande"."customer_id" = 3 '
+               'ORDER BY "customer_commande"."date_add" DESC')
+
+        assert predicate_columns(sql, 'customer_commande') == ['customer_id', 'date_add']
+
+    @pytest.mark.unit
+    def test_booleen_sans_operateur(self):
+        """SQLite rend filter(status=True) sans opérateur"""
+        sql = 'SELECT * FROM "shop_produit" WHERE "shop_produit"."status"'
+
+        assert predicate_columns(sql, 'shop_produit') == ['status']
+
+    @pytest.mark.unit
+    def test_alias_de_sous_requete(self):
+        sql = ('SELECT * FROM "shop_produit" WHERE "shop_produit"."id" IN '
+               '(SELECT U0."produit_id" FROM "customer_produitpanier" U0 WHERE U0."panier_id" = 1)')
+
+        assert predicate_columns(sql, 'customer_produitpanier') == ['panier_id']
+
+
+@pytest.mark.django_db
+class TestAdviseIndexes:
+
+    @pytest.mark.unit
+    def test_parcours_complet_detecte(self):
+        scans = explain_full_scans(connection, 'SELECT * FROM "shop_produit" WHERE "shop_produit"."prix" > 10')
+
+        assert scans == ['shop_produit']
+
+    @pytest.mark.unit
+    def test_recherche_par_cle_primaire_ignoree(self):
+        scans = explain_full_scans(connection, 'SELECT * FROM "shop_produit" WHERE "shop_produit"."id" = 1')
+
+        assert scans == []
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('rollback_ddl', [True, False])
+    def test_index_temporaires_retires(self, monkeypatch, rollback_ddl):
+        """
+        Arrange: Un index candidat sur shop_produit.prix, DDL annulable ou non (MySQL)
+        Act: Mesurer avant/après
+        Assert: La mesure est faite et l'index n'existe plus ensuite
+        """
+        monkeypatch.setattr(connection.features, 'can_rollback_ddl', rollback_ddl)
+        sql = 'SELECT * FROM "shop_produit" WHERE "shop_produit"."prix" > 10'
+        candidates = {('default', 'shop_produit', ('prix',)): {
+            'model': Produit, 'columns': ['prix'], 'statements': {sql}, 'views': {'shop'}}}
+
+        recommendations = Command(stdout=StringIO(), stderr=StringIO()).measure(candidates, 1)
+
+        assert recommendations[0]['removes_scan'] is True
+        assert ('prix',) not in existing_indexes(connection, 'shop_produit')
+
+    @pytest.mark.integration
+    def test_rejeu_et_rapport(self, tmp_path, produit_sans_promo):
+        """
+        Arrange: Un fichier de trafic mêlant requêtes et lignes sans "path"
+        Act: Lancer advise_indexes
+        Assert: Les vues rejouées apparaissent dans le rapport
+        """
+        traffic = tmp_path / 'traffic.jsonl'
+        traffic.write_text('\n'.join([
+            json.dumps({'request_id': 'x', 'title': 'ignorée'}),
+            json.dumps({'method': 'GET', 'path': '/deals/'}),
+            json.dumps({'method': 'GET', 'path': '/deals/produit/%s' % produit_sans_promo.slug}),
+        ]))
+        out = StringIO()
+
+        call_command('advise_indexes', str(traffic), '--repeat', '1', stdout=out, stderr=StringIO())
+
+        assert len(load_traffic(traffic)) == 2
+        assert 'shop' in out.getvalue()
+        assert 'product_detail' in out.getvalue()
@@ -0,0 +1,80 @@
+"""Tests des bundles statiques (build_assets, {% bundle %}, stockage haché)"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.template import Context, Template
+
+from base import assets
+from base.storage import StorefrontStaticFilesStorage
+
+
+class TestAssemblage:
+
+    @pytest.mark.unit
+    def test_urls_relatives_rebasees(self):
+        css = '.a{background:url("images/x.png")} .b{background:url(../fonts/f.woff?v=1#iefix)}'
+
+        result = assets.rebase_css(css, 'css/plugins/owl.css', 'bundles/storefront.css')
+
+        assert 'url("../css/plugins/images/x.png")' in result
+        assert 'url(../css/fonts/f.woff?v=1#iefix)' in result
+
+    @pytest.mark.unit
+    def test_urls_absolues_inchangees(self):
+        css = '.a{background:url(data:image/png;base64,AAAA)} .b{background:url("https://cdn/x.png")} .c{background:url(/static/y.png)}'
+
+        assert assets.rebase_css(css, 'css/core.css', 'bundles/storefront.css') == css
+
+    @pytest.mark.unit
+    def test_bundle_css(self):
+        """
+        Arrange: Le bundle CSS de la boutique (core.css importe ses plugins)
+        Act: L'assembler
+        Assert: Plus aucun @import local, un seul @charset en tête, suivi des @import distants
+        """
+        css = assets.build('bundles/storefront.css')
+
+        assert css.startswith('@charset "UTF-8";@import url(\'https://fonts.googleapis.com')
+        assert css.count('@charset') == 1
+        assert '@import url("font-awesome.min.css")' not in css
+        assert 'url("../css/plugins/images/' in css
+
+    @pytest.mark.unit
+    def test_bundles_a_jour(self):
+        """Les bundles versionnés correspondent à leurs sources"""
+        call_command('build_assets', check=True, stdout=StringIO())
+
+
+class TestBalise:
+
+    def render(self):
+        return Template("{% load bundles %}{% bundle 'bundles/storefront.js' %}").render(Context())
+
+    @pytest.mark.unit
+    def test_production(self, settings):
+        settings.ASSET_BUNDLES_SOURCES = False
+
+        html = self.render()
+
+        assert html.count('<script') == 1
+        assert 'bundles/storefront' in html
+
+    @pytest.mark.unit
+    def test_sources_en_developpement(self, settings):
+        settings.ASSET_BUNDLES_SOURCES = True
+
+        html = self.render()
+
+        assert html.count('<script') == len(settings.ASSET_BUNDLES['bundles/storefront.js'])
+        assert 'js/main.' in html
+
+
+class TestStockage:
+
+    @pytest.mark.unit
+    def test_fichier_absent_du_manifeste(self, tmp_path):
+        storage = StorefrontStaticFilesStorage(location=str(tmp_path))
+
+        assert storage.stored_name('bundles/inexistant.css') == 'bundles/inexistant.css'
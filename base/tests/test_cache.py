@@ -0,0 +1,136 @@
+"""Tests du cache à deux niveaux et du recalcul unique (base.cache)"""
+
+import threading
+import time
+
+import pytest
+from django.core.cache import cache, caches
+
+from base import cache as base_cache
+
+
+class TestLRU:
+
+    @pytest.mark.unit
+    def test_eviction_moins_recemment_lue(self):
+        lru = base_cache.LRU(2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+
+        assert lru.get('a') == (True, 1)
+        assert lru.get('b') == (False, None)
+
+    @pytest.mark.unit
+    def test_valeur_isolee(self):
+        lru = base_cache.LRU(2)
+        lru.set('a', [1], 60)
+        lru.get('a')[1].append(2)
+
+        assert lru.get('a') == (True, [1])
+
+
+class TestTwoTierCache:
+
+    @pytest.mark.unit
+    def test_lecture_l1_sans_l2(self, monkeypatch):
+        """
+        Arrange: Une valeur écrite par le cache par défaut
+        Act: La relire après avoir rendu L2 inaccessible
+        Assert: Servie par L1
+        """
+        cache.set('vitrine:test', 'valeur')
+        monkeypatch.setattr(caches['partage'], 'get', lambda *a, **k: pytest.fail("L2 interrogé"))
+
+        assert cache.get('vitrine:test') == 'valeur'
+
+    @pytest.mark.unit
+    def test_ecriture_d_un_autre_processus(self):
+        """Une écriture faite directement dans L2 est vue après rafraîchissement de L1"""
+        cache.set('vitrine:test', 'ancienne')
+        caches['partage'].set('vitrine:test', 'nouvelle')
+
+        assert cache.get('vitrine:test') == 'ancienne'
+        assert cache.relire('vitrine:test') == 'nouvelle'
+        assert cache.get('vitrine:test') == 'nouvelle'
+
+    @pytest.mark.unit
+    def test_compteurs_atomiques_dans_l2(self):
+        cache.add('compteur', 0)
+        assert cache.get('compteur') == 0
+        cache.incr('compteur')
+
+        assert cache.get('compteur') == 1
+        assert caches['partage'].get('compteur') == 1
+
+    @pytest.mark.unit
+    def test_suppression_et_get_many(self):
+        cache.set_many({'a': 1, 'b': 2})
+        cache.delete('a')
+
+        assert cache.get_many(['a', 'b']) == {'b': 2}
+        assert caches['partage'].get_many(['a', 'b']) == {'b': 2}
+
+
+class TestMemoiser:
+
+    @pytest.mark.unit
+    def test_valeur_none_memorisee(self):
+        appels = []
+
+        for _ in range(3):
+            assert base_cache.memoiser('memo:none', lambda: appels.append(1), 60) is None
+
+        assert len(appels) == 1
+
+    @pytest.mark.unit
+    def test_un_seul_calcul_sous_rafale(self):
+        """
+        Arrange: Un calcul lent d'une clé absente
+        Act: Dix threads demandent la clé en même temps
+        Assert: Un seul calcul, tous reçoivent sa valeur
+        """
+        appels = []
+
+        def calcul():
+            appels.append(1)
+            time.sleep(0.2)
+            return 'valeur'
+
+        resultats = []
+        threads = [threading.Thread(target=lambda: resultats.append(base_cache.memoiser('memo:rafale', calcul, 60)))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(appels) == 1
+        assert resultats == ['valeur'] * 10
+
+    @pytest.mark.unit
+    def test_valeur_perimee_servie_pendant_le_recalcul(self, monkeypatch):
+        """Expirée, la valeur est recalculée par le premier appelant ; les autres servent l'ancienne"""
+        base_cache.memoiser('memo:swr', lambda: 'ancienne', 10)
+        maintenant = time.time()
+        monkeypatch.setattr(base_cache.time, 'time', lambda: maintenant + 11)
+        cache.add('memo:swr:recalcul', 1)
+
+        assert base_cache.memoiser('memo:swr', lambda: pytest.fail("recalcul concurrent"), 10) == 'ancienne'
+
+        cache.delete('memo:swr:recalcul')
+        assert base_cache.memoiser('memo:swr', lambda: 'nouvelle', 10) == 'nouvelle'
+        assert base_cache.memoiser('memo:swr', lambda: pytest.fail("déjà frais"), 10) == 'nouvelle'
+
+    @pytest.mark.unit
+    def test_echec_du_recalcul(self, monkeypatch):
+        base_cache.memoiser('memo:echec', lambda: 'ancienne', 10)
+        maintenant = time.time()
+        monkeypatch.setattr(base_cache.time, 'time', lambda: maintenant + 11)
+
+        def panne():
+            raise RuntimeError('base indisponible')
+
+        assert base_cache.memoiser('memo:echec', panne, 10) == 'ancienne'
+        assert not cache.has_key('memo:echec:recalcul')
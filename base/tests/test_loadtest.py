@@ -0,0 +1,64 @@
+"""Tests du test de charge par rejeu de trafic (loadtest)"""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from base.bench import percentile
+from base.traffic import storefront_mix, url_name
+
+
+class TestMesures:
+
+    @pytest.mark.unit
+    def test_percentile_rang_le_plus_proche(self):
+        valeurs = list(range(1, 101))
+
+        assert percentile(valeurs, 50) == 50
+        assert percentile(valeurs, 99) == 99
+        assert percentile([], 99) == 0.0
+
+    @pytest.mark.unit
+    def test_nom_url_accentue(self):
+        """Les chemins encodés par reverse() sont résolus"""
+        assert url_name(reverse('commande-reçu')) == 'commande-reçu'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadtest:
+
+    @pytest.mark.integration
+    def test_melange_boutique(self, panier, produit_sans_promo, etablissement):
+        """Le mélange synthétique couvre catalogue, panier, commande et marchand"""
+        noms = {url_name(entry['path']) for entry in storefront_mix()}
+
+        assert {'shop', 'product_detail', 'add_to_cart', 'checkout', 'dashboard'} <= noms
+
+    @pytest.mark.integration
+    def test_rapport_json(self, tmp_path, produit_sans_promo):
+        """
+        Arrange: Un fichier de trafic de deux requêtes catalogue
+        Act: Rejouer 6 requêtes sur 2 threads
+        Assert: Le JSON contient les percentiles et les requêtes SQL par nom d'URL
+        """
+        traffic = tmp_path / 'traffic.jsonl'
+        traffic.write_text('\n'.join(json.dumps(entry) for entry in [
+            {'method': 'GET', 'path': reverse('shop')},
+            {'method': 'GET', 'path': reverse('product_detail', args=[produit_sans_promo.slug])},
+        ]))
+        output = tmp_path / 'resultats.json'
+
+        call_command(
+            'loadtest', traffic=str(traffic), requests=6, concurrency=2, warmup=0,
+            in_place=True, output=str(output), stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        assert results['overall']['requests'] == 6
+        assert set(results['urls']) == {'shop', 'product_detail'}
+        for stats in results['urls'].values():
+            assert stats['p99_ms'] >= stats['p50_ms'] > 0
+            assert stats['queries_mean'] > 0
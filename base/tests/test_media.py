@@ -0,0 +1,223 @@
+"""Tests du service et du stockage des fichiers media (conditionnel, plages, proxy, empreintes)"""
+
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from base.media import is_versioned, parse_range
+from shop.models import Produit
+
+
+CONTENU = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_OFFLOAD = ''
+    (tmp_path / 'produits').mkdir()
+    (tmp_path / 'produits' / 'photo.jpg').write_bytes(CONTENU)
+    (tmp_path / 'produits' / '3f2a9c1b7d4e05a8.jpg').write_bytes(CONTENU)
+    (tmp_path / 'imports' / 'catalogues').mkdir(parents=True)
+    (tmp_path / 'imports' / 'catalogues' / 'catalogue.csv').write_bytes(b'sku;nom;prix\n')
+    return tmp_path
+
+
+def contenu(response):
+    return b''.join(response.streaming_content)
+
+
+class TestPlages:
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('header, attendu', [
+        ('bytes=0-99', (0, 99)),
+        ('bytes=1000-', (1000, 1023)),
+        ('bytes=-24', (1000, 1023)),
+        ('bytes=1000-5000', (1000, 1023)),
+        ('bytes=0-1,5-6', None),
+        ('items=0-1', None),
+        (None, None),
+    ])
+    def test_parse_range(self, header, attendu):
+        assert parse_range(header, 1024) == attendu
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('header', ['bytes=1024-', 'bytes=5-2', 'bytes=-0'])
+    def test_plage_insatisfiable(self, header):
+        with pytest.raises(ValueError):
+            parse_range(header, 1024)
+
+
+@pytest.mark.django_db
+class TestMediaView:
+
+    @pytest.mark.integration
+    def test_fichier_complet(self, client, media_root):
+        response = client.get('/media/produits/photo.jpg')
+
+        assert response.status_code == 200
+        assert contenu(response) == CONTENU
+        assert response['Content-Type'] == 'image/jpeg'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response['Cache-Control'] == 'public, max-age=3600'
+        assert response['ETag'] and response['Last-Modified']
+
+    @pytest.mark.integration
+    def test_304_sur_etag_et_date(self, client, media_root):
+        """
+        Arrange: Une première réponse portant ETag et Last-Modified
+        Act: Redemander le fichier avec If-None-Match puis If-Modified-Since
+        Assert: 304 sans corps, en-têtes de cache conservés
+        """
+        premiere = client.get('/media/produits/photo.jpg')
+
+        par_etag = client.get('/media/produits/photo.jpg', HTTP_IF_NONE_MATCH=premiere['ETag'])
+        par_date = client.get('/media/produits/photo.jpg', HTTP_IF_MODIFIED_SINCE=premiere['Last-Modified'])
+
+        for response in (par_etag, par_date):
+            assert response.status_code == 304
+            assert response.content == b''
+            assert response['ETag'] == premiere['ETag']
+
+    @pytest.mark.integration
+    def test_plage_206(self, client, media_root):
+        response = client.get('/media/produits/photo.jpg', HTTP_RANGE='bytes=10-19')
+
+        assert response.status_code == 206
+        assert contenu(response) == CONTENU[10:20]
+        assert response['Content-Range'] == 'bytes 10-19/1024'
+        assert response['Content-Length'] == '10'
+
+    @pytest.mark.integration
+    def test_if_range_perime(self, client, media_root):
+        """Un If-Range qui ne correspond plus au fichier donne le fichier entier"""
+        response = client.get('/media/produits/photo.jpg', HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"ancien"')
+
+        assert response.status_code == 200
+        assert contenu(response) == CONTENU
+
+    @pytest.mark.integration
+    def test_416(self, client, media_root):
+        response = client.get('/media/produits/photo.jpg', HTTP_RANGE='bytes=5000-')
+
+        assert response.status_code == 416
+        assert response['Content-Range'] == 'bytes */1024'
+
+    @pytest.mark.integration
+    def test_nom_versionne_immuable(self, client, media_root):
+        response = client.get('/media/produits/3f2a9c1b7d4e05a8.jpg')
+
+        assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('name', [
+        'produits/20230101123456.jpg', 'produits/2023010112345678.jpg', 'produits/photo.3f2a9c1b7d4e.jpg',
+        'produits/3f2a9c1b7d4e05a8b.jpg', 'produits/photo.jpg',
+    ])
+    def test_nom_non_versionne(self, name):
+        """Seuls les noms donnés par ContentHashStorage reçoivent le cache immuable"""
+        assert not is_versioned(name)
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('path', [
+        '/media/produits/absente.jpg', '/media/produits/', '/media/../manage.py',
+        '/media/imports/catalogues/catalogue.csv', '/media/produits/../imports/catalogues/catalogue.csv',
+    ])
+    def test_404(self, client, media_root, path):
+        assert client.get(path).status_code == 404
+
+    @pytest.mark.integration
+    def test_x_accel_redirect(self, client, media_root, settings):
+        """
+        Arrange: MEDIA_OFFLOAD en mode nginx
+        Act: Demander un fichier
+        Assert: Réponse vide déléguant le fichier à la location interne, en-têtes de cache posés
+        """
+        settings.MEDIA_OFFLOAD = 'x-accel-redirect'
+
+        response = client.get('/media/produits/photo.jpg')
+
+        assert response.status_code == 200
+        assert response.content == b''
+        assert response['X-Accel-Redirect'] == '/protected-media/produits/photo.jpg'
+        assert response['Content-Type'] == 'image/jpeg'
+        assert response['ETag']
+
+    @pytest.mark.integration
+    def test_x_sendfile(self, client, media_root, settings):
+        settings.MEDIA_OFFLOAD = 'x-sendfile'
+
+        response = client.get('/media/produits/photo.jpg')
+
+        assert response['X-Sendfile'] == str(media_root / 'produits' / 'photo.jpg')
+
+
+class TestContentHashStorage:
+
+    @pytest.mark.unit
+    def test_envois_identiques_stockes_une_fois(self, media_root):
+        """
+        Arrange: Deux envois de même contenu sous des noms différents, un troisième différent
+        Act: Les enregistrer dans le même répertoire
+        Assert: Les deux premiers partagent un fichier au nom versionné, le troisième a le sien
+        """
+        premier = default_storage.save('produis/images/2.webp', ContentFile(b'image', name='2.webp'))
+        second = default_storage.save('produis/images/copie.WEBP', ContentFile(b'image', name='copie.WEBP'))
+        autre = default_storage.save('produis/images/2.webp', ContentFile(b'autre', name='2.webp'))
+
+        assert premier == second
+        assert premier.startswith('produis/images/') and premier.endswith('.webp')
+        assert is_versioned(premier)
+        assert autre != premier
+        assert sorted(p.name for p in (media_root / 'produis' / 'images').iterdir()) == sorted(
+            [premier.rsplit('/', 1)[1], autre.rsplit('/', 1)[1]])
+
+
+@pytest.mark.django_db
+class TestDedupeMedia:
+
+    @pytest.mark.integration
+    def test_fusion_des_doublons(self, media_root, produit_sans_promo):
+        """
+        Arrange: Deux copies identiques (2.webp, 2_BKaJUdF.webp) référencées par un produit
+                 dont la troisième image garde la valeur par défaut b-1.jpg
+        Act: Lancer dedupe_media
+        Assert: Les deux références pointent vers un même fichier haché, les copies sont
+                supprimées, b-1.jpg est conservé ; une seconde exécution ne change rien
+        """
+        images = media_root / 'produis' / 'images'
+        images.mkdir(parents=True)
+        (images / '2.webp').write_bytes(b'image')
+        (images / '2_BKaJUdF.webp').write_bytes(b'image')
+        (media_root / 'b-1.jpg').write_bytes(b'defaut')
+        Produit.objects.filter(pk=produit_sans_promo.pk).update(
+            image='produis/images/2.webp', image_2='produis/images/2_BKaJUdF.webp', image_3='b-1.jpg')
+
+        call_command('dedupe_media', stdout=StringIO())
+
+        produit = Produit.objects.get(pk=produit_sans_promo.pk)
+        assert produit.image.name == produit.image_2.name
+        assert is_versioned(produit.image.name)
+        assert produit.image.read() == b'image'
+        assert produit.image_3.name == 'b-1.jpg'
+        assert not (images / '2.webp').exists() and not (images / '2_BKaJUdF.webp').exists()
+        assert (media_root / 'b-1.jpg').exists()
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        assert '0 fichiers renommés' in out.getvalue()
+
+    @pytest.mark.integration
+    def test_dry_run(self, media_root, produit_sans_promo):
+        (media_root / 'produis' / 'images').mkdir(parents=True)
+        (media_root / 'produis' / 'images' / '2.webp').write_bytes(b'image')
+        Produit.objects.filter(pk=produit_sans_promo.pk).update(image='produis/images/2.webp')
+
+        call_command('dedupe_media', dry_run=True, stdout=StringIO())
+
+        assert Produit.objects.get(pk=produit_sans_promo.pk).image.name == 'produis/images/2.webp'
+        assert [p.name for p in (media_root / 'produis' / 'images').iterdir()] == ['2.webp']
@@ -0,0 +1,153 @@
+"""Tests des métriques Prometheus et de la vue /metrics"""
+
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import EmailMessage
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from base.mail import MetricsEmailBackend
+from base.middleware import MetricsMiddleware, ReplicaPinningMiddleware, RequestProfilerMiddleware
+from base.ratelimit import RateLimitMiddleware
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+
+    @pytest.mark.integration
+    def test_exposition_par_nom_d_url(self, client, settings):
+        """
+        Arrange: Une requête sur la boutique
+        Act: Lire /metrics avec le jeton
+        Assert: L'histogramme de latence et celui des requêtes SQL sont étiquetés « shop »
+        """
+        settings.METRICS_TOKEN = 'secret'
+        client.get(reverse('shop'))
+
+        response = client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        body = response.content.decode()
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        assert 'cooldeal_request_duration_seconds_bucket{le="0.005",method="GET",view="shop"}' in body
+        assert 'cooldeal_request_db_queries_count{view="shop"}' in body
+        assert 'cooldeal_requests_in_progress' in body
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('jeton, authorization', [
+        ('', ''),
+        ('', 'Bearer '),
+        ('secret', ''),
+        ('secret', 'Bearer faux'),
+    ])
+    def test_refuse_sans_jeton(self, client, settings, jeton, authorization):
+        """
+        Arrange: Jeton absent de la configuration ou de la requête
+        Act: Lire /metrics depuis l'hôte local (comme derrière un proxy local)
+        Assert: Accès refusé, quelle que soit l'adresse d'origine
+        """
+        settings.METRICS_TOKEN = jeton
+
+        response = client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION=authorization)
+
+        assert response.status_code == 403
+
+    @pytest.mark.integration
+    def test_adresses_autorisees(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        settings.METRICS_ALLOWED_IPS = ['10.0.0.5']
+
+        refus = client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer secret')
+        accord = client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer secret')
+
+        assert refus.status_code == 403
+        assert accord.status_code == 200
+
+    @pytest.mark.integration
+    def test_jeton_bearer(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+
+        response = client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer secret')
+
+        assert response.status_code == 200
+
+    @pytest.mark.integration
+    def test_compteur_panier(self, client, panier, produit_sans_promo):
+        before = sample('cooldeal_cart_operations_total', operation='add')
+
+        client.post(reverse('add_to_cart'), data=json.dumps(
+            {'panier': panier.pk, 'produit': produit_sans_promo.pk, 'quantite': 1}), content_type='application/json')
+
+        assert sample('cooldeal_cart_operations_total', operation='add') == before + 1
+
+
+class TestAsgi:
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('middleware', [
+        MetricsMiddleware, ReplicaPinningMiddleware, RequestProfilerMiddleware, RateLimitMiddleware])
+    def test_middlewares_asynchrones(self, middleware):
+        """Devant une chaîne asynchrone, chaque middleware est lui-même une coroutine (pas d'adaptateur)"""
+        async def suite(request):
+            return None
+
+        assert middleware.async_capable and middleware.sync_capable
+        assert iscoroutinefunction(middleware(suite))
+        assert not iscoroutinefunction(middleware(lambda request: None))
+
+    @pytest.mark.integration
+    @pytest.mark.django_db(transaction=True)
+    def test_requetes_sql_comptees_sous_asgi(self, settings):
+        """
+        Arrange: La chaîne de middlewares en mode asynchrone (AsyncClient)
+        Act: Demander la boutique, vue synchrone exécutée dans un autre thread
+        Assert: Ses requêtes SQL sont comptées par MetricsMiddleware
+        """
+        count = sample('cooldeal_request_db_queries_count', view='shop')
+        total = sample('cooldeal_request_db_queries_sum', view='shop')
+
+        response = async_to_sync(AsyncClient().get)(reverse('shop'))
+
+        assert response.status_code == 200
+        assert sample('cooldeal_request_db_queries_count', view='shop') == count + 1
+        assert sample('cooldeal_request_db_queries_sum', view='shop') > total
+
+
+class TestInstrumentation:
+
+    @pytest.mark.unit
+    def test_cache_succes_et_echecs(self):
+        cache = caches['default']
+        hits = sample('cooldeal_cache_requests_total', cache='default', result='hit')
+        misses = sample('cooldeal_cache_requests_total', cache='default', result='miss')
+
+        assert cache.get('metrics:test') is None
+        cache.set('metrics:test', 0)
+        assert cache.get('metrics:test') == 0
+        cache.get_many(['metrics:test', 'metrics:absent'])
+        cache.delete('metrics:test')
+
+        assert sample('cooldeal_cache_requests_total', cache='default', result='hit') == hits + 2
+        assert sample('cooldeal_cache_requests_total', cache='default', result='miss') == misses + 2
+
+    @pytest.mark.unit
+    def test_backend_email(self, settings):
+        settings.METRICS_EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        count = sample('cooldeal_email_send_seconds_count')
+        sent = sample('cooldeal_emails_total', result='sent')
+
+        EmailMessage('Sujet', 'Corps', 'noreply@cooldeal.ci', ['client@example.com'],
+                     connection=MetricsEmailBackend()).send()
+
+        assert len(mail.outbox) == 1
+        assert sample('cooldeal_email_send_seconds_count') == count + 1
+        assert sample('cooldeal_emails_total', result='sent') == sent + 1
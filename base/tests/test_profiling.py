@@ -0,0 +1,102 @@
+"""Tests du profilage des requêtes à la demande"""
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from base.models import RequestProfile
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_client(client, user):
+    user.is_staff = True
+    user.save()
+    client.force_login(user)
+    return client
+
+
+class TestRequestProfilerMiddleware:
+
+    @pytest.mark.integration
+    def test_staff_avec_en_tete(self, staff_client, produit_sans_promo):
+        """
+        Arrange: Un membre du staff connecté
+        Act: Demander la boutique avec l'en-tête X-Profile
+        Assert: Un rapport est enregistré, avec SQL, gabarits et fonctions
+        """
+        response = staff_client.get(reverse('shop'), HTTP_X_PROFILE='1')
+
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        assert profile.declencheur == 'header'
+        assert profile.view_name == 'shop'
+        assert profile.sql_count > 0
+        assert profile.template_ms > 0
+        assert profile.template_ms <= profile.duree_ms
+        data = profile.data
+        assert data['functions']
+        assert len(data['queries']) == profile.sql_count
+
+    @pytest.mark.integration
+    def test_parametre_de_requete(self, staff_client):
+        response = staff_client.get(reverse('index') + '?_profile=1')
+
+        assert RequestProfile.objects.get(pk=response['X-Profile-Id']).declencheur == 'query'
+
+    @pytest.mark.integration
+    def test_ignore_hors_staff(self, client, user):
+        client.force_login(user)
+
+        response = client.get(reverse('shop'), HTTP_X_PROFILE='1')
+
+        assert 'X-Profile-Id' not in response
+        assert not RequestProfile.objects.exists()
+
+    @pytest.mark.integration
+    def test_echantillonnage(self, client, settings):
+        settings.PROFILER_SAMPLE_RATE = 1.0
+
+        response = client.get(reverse('shop'))
+
+        assert 'X-Profile-Id' not in response
+        assert RequestProfile.objects.get().declencheur == 'sample'
+
+    @pytest.mark.integration
+    @pytest.mark.django_db(transaction=True)
+    def test_echantillonnage_sous_asgi(self, settings):
+        """En mode asynchrone, le profil relève le SQL de la vue exécutée dans son thread"""
+        settings.PROFILER_SAMPLE_RATE = 1.0
+
+        response = async_to_sync(AsyncClient().get)(reverse('shop'))
+
+        assert response.status_code == 200
+        profile = RequestProfile.objects.get()
+        assert profile.declencheur == 'sample' and profile.view_name == 'shop'
+        assert profile.sql_count > 0
+
+    @pytest.mark.integration
+    def test_rapport_dans_l_admin(self, staff_client, admin_client, produit_sans_promo):
+        response = staff_client.get(reverse('shop'), HTTP_X_PROFILE='1')
+
+        page = admin_client.get(reverse('admin:base_requestprofile_change', args=[response['X-Profile-Id']]))
+
+        assert page.status_code == 200
+        assert 'shop_produit' in page.content.decode()
+
+
+class TestRetention:
+
+    @pytest.mark.unit
+    def test_nombre_maximal(self, settings):
+        settings.PROFILER_MAX_REPORTS = 2
+        for i in range(4):
+            RequestProfile.objects.create(
+                method='GET', path='/%d' % i, status_code=200, declencheur='sample', duree_ms=1,
+                rapport=RequestProfile.compress({'functions': [], 'queries': []}),
+            )
+
+        assert RequestProfile.purge() == 2
+        assert list(RequestProfile.objects.order_by('-pk').values_list('path', flat=True)) == ['/3', '/2']
@@ -0,0 +1,160 @@
+"""Tests de la limitation de débit à fenêtre glissante (base.ratelimit)"""
+
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.urls import reverse
+
+from base import ratelimit
+from contact.models import Contact
+
+
+@pytest.fixture(autouse=True)
+def compteurs_vides():
+    cache.clear()
+    ratelimit.locale.clear()
+    yield
+    cache.clear()
+    ratelimit.locale.clear()
+
+
+def contacter(client, ip='198.51.100.7'):
+    donnees = {'nom': 'Awa', 'email': 'awa@example.com', 'sujet': 'Livraison', 'messages': 'Bonjour'}
+    return client.post(reverse('post_contact'), json.dumps(donnees), content_type='application/json',
+                       REMOTE_ADDR=ip)
+
+
+class TestFenetreGlissante:
+
+    @pytest.mark.unit
+    def test_limite_dans_la_fenetre(self):
+        resultats = [ratelimit.consommer('t', 3, 60, maintenant=1000) for _ in range(4)]
+
+        assert resultats[:3] == [0, 0, 0]
+        assert resultats[3] > 0
+
+    @pytest.mark.unit
+    def test_fenetre_precedente_ponderee(self):
+        """
+        Arrange: 4 requêtes (limite 4) à la fin d'une fenêtre de 60 s
+        Act: Requêter au début puis à la fin de la fenêtre suivante
+        Assert: Refus tant que la fenêtre précédente pèse trop, admis ensuite
+        """
+        for _ in range(4):
+            assert ratelimit.consommer('t', 4, 60, maintenant=1199) == 0
+
+        assert ratelimit.consommer('t', 4, 60, maintenant=1205) > 0
+        assert ratelimit.consommer('t', 4, 60, maintenant=1255) == 0
+
+    @pytest.mark.unit
+    def test_retry_after(self):
+        for _ in range(2):
+            ratelimit.consommer('t', 2, 60, maintenant=1200)
+
+        # Refusée à t=1230 : la fenêtre suivante commence dans 30 s, où 3 requêtes pèsent encore
+        assert ratelimit.consommer('t', 2, 60, maintenant=1230) == 30 + 40
+
+    @pytest.mark.unit
+    def test_repli_en_memoire(self, monkeypatch):
+        """Cache indisponible : les compteurs du processus prennent le relais"""
+        def panne(*args, **kwargs):
+            raise ConnectionError('cache injoignable')
+        monkeypatch.setattr(cache, 'add', panne)
+        monkeypatch.setattr(cache, 'get', panne)
+
+        resultats = [ratelimit.consommer('t', 2, 60, maintenant=1000) for _ in range(3)]
+
+        assert resultats[:2] == [0, 0] and resultats[2] > 0
+
+
+class TestPortees:
+
+    @pytest.mark.unit
+    def test_portees_absentes_ignorees(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='198.51.100.7')
+
+        assert ratelimit.identite(request, 'session') is None
+        assert ratelimit.identite(request, 'compte') is None
+        assert ratelimit.verifier(request, 'vue', {'session': (1, 60), 'compte': (1, 60)}) is None
+
+    @pytest.mark.unit
+    def test_decorateur(self):
+        vue = ratelimit.limiter('vue', ip=(1, 60))(lambda request: HttpResponse('ok'))
+        request = RequestFactory().get('/', REMOTE_ADDR='198.51.100.7')
+
+        assert vue(request).status_code == 200
+        response = vue(request)
+        assert response.status_code == 429 and int(response['Retry-After']) > 0
+
+    @pytest.mark.unit
+    def test_ip_derriere_un_proxy(self, settings):
+        """
+        Arrange: Un proxy de confiance, deux clients derrière la même REMOTE_ADDR
+        Act: Limiter à une requête par adresse IP
+        Assert: Chaque client a son propre compteur ; changer la tête de
+                X-Forwarded-For ne contourne pas la limite
+        """
+        settings.TRUSTED_PROXY_COUNT = 1
+        vue = ratelimit.limiter('vue', ip=(1, 60))(lambda request: HttpResponse('ok'))
+
+        def appel(xff):
+            return vue(RequestFactory().get('/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR=xff)).status_code
+
+        assert appel('198.51.100.7') == 200
+        assert appel('203.0.113.9') == 200
+        assert appel('1.2.3.4, 198.51.100.7') == 429
+
+
+@pytest.mark.django_db
+class TestMiddleware:
+
+    @pytest.mark.integration
+    def test_429_sans_insertion(self, client, settings, django_assert_num_queries):
+        """
+        Arrange: post_contact limité à 2 messages par adresse IP
+        Act: Envoyer 3 messages puis un depuis une autre adresse
+        Assert: Le troisième est refusé en 429 avec Retry-After, sans requête SQL ;
+                l'autre adresse n'est pas concernée
+        """
+        settings.RATELIMITS = {'post_contact': {'ip': (2, 600)}}
+        for _ in range(2):
+            assert contacter(client).status_code == 200
+
+        with django_assert_num_queries(0):
+            response = contacter(client)
+
+        assert response.status_code == 429
+        assert int(response['Retry-After']) > 0
+        assert response.json()['success'] is False
+        assert Contact.objects.count() == 2
+        assert contacter(client, ip='203.0.113.9').status_code == 200
+
+    @pytest.mark.integration
+    @pytest.mark.django_db(transaction=True)
+    def test_429_sous_asgi(self, settings):
+        """Chaîne asynchrone : process_view est une coroutine et refuse de même"""
+        settings.RATELIMITS = {'post_contact': {'ip': (1, 600), 'compte': (5, 600)}}
+        donnees = json.dumps({'nom': 'Awa', 'email': 'awa@example.com', 'sujet': 'Livraison', 'messages': 'Bonjour'})
+        envoyer = async_to_sync(AsyncClient().post)
+
+        statuts = [envoyer(reverse('post_contact'), donnees, content_type='application/json').status_code
+                   for _ in range(2)]
+
+        assert statuts == [200, 429]
+
+    @pytest.mark.integration
+    def test_get_non_limite(self, client, settings):
+        settings.RATELIMITS = {'contact': {'ip': (1, 600)}}
+
+        assert [client.get(reverse('contact')).status_code for _ in range(3)] == [200, 200, 200]
+
+    @pytest.mark.integration
+    def test_desactive(self, client, settings):
+        settings.RATELIMITS = {'post_contact': {'ip': (1, 600)}}
+        settings.RATELIMIT_ENABLED = False
+
+        assert [contacter(client).status_code for _ in range(3)] == [200, 200, 200]
@@ -0,0 +1,153 @@
+"""Tests du routage lecture/écriture entre base principale et réplicas"""
+
+import time
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from base import routers
+from base.middleware import ReplicaPinningMiddleware
+from shop.models import Produit
+
+
+@pytest.fixture
+def replica_settings(settings):
+    settings.DATABASE_REPLICAS = ['replica_1']
+    settings.REPLICA_PIN_SECONDS = 5
+    return settings
+
+
+@pytest.fixture
+def router(replica_settings):
+    token = routers.set_pinned_until(0.0)
+    yield routers.PrimaryReplicaRouter()
+    routers.reset_pinning(token)
+
+
+class TestPrimaryReplicaRouter:
+
+    @pytest.mark.unit
+    def test_lecture_sur_replica(self, router):
+        """Sans écriture préalable, les lectures partent sur le réplica"""
+        assert router.db_for_read(Produit) == 'replica_1'
+
+    @pytest.mark.unit
+    def test_ecriture_sur_principale_et_epinglage(self, router):
+        """
+        Arrange: Une écriture sur Produit
+        Act: Lire juste après
+        Assert: La lecture reste sur la base principale
+        """
+        assert router.db_for_write(Produit) == 'default'
+        assert router.db_for_read(Produit) == 'default'
+
+    @pytest.mark.unit
+    def test_epinglage_expire(self, router):
+        """Une fois l'échéance passée, les lectures repartent sur le réplica"""
+        routers.set_pinned_until(time.time() - 1)
+        assert router.db_for_read(Produit) == 'replica_1'
+
+    @pytest.mark.unit
+    def test_sessions_toujours_sur_principale(self, router):
+        """Les sessions sont lues sur la principale et n'épinglent pas"""
+        assert router.db_for_read(Session) == 'default'
+        router.db_for_write(Session)
+        assert routers.is_pinned() is False
+
+    @pytest.mark.unit
+    def test_pas_de_migration_sur_replica(self, router):
+        assert router.allow_migrate('replica_1', 'shop') is False
+        assert router.allow_migrate('default', 'shop') is None
+
+
+@pytest.mark.unit
+def test_sans_replica_tout_va_sur_principale(router, settings):
+    """Sans réplica configuré, aucun épinglage n'est posé"""
+    settings.DATABASE_REPLICAS = []
+
+    assert router.db_for_read(Produit) == 'default'
+    router.db_for_write(Produit)
+    assert routers.is_pinned() is False
+
+
+@pytest.mark.usefixtures('replica_settings')
+class TestReplicaPinningMiddleware:
+
+    @pytest.mark.unit
+    def test_cookie_pose_apres_ecriture(self):
+        """
+        Arrange: Une vue qui écrit
+        Act: Traverser le middleware
+        Assert: Un cookie d'épinglage est posé sur la réponse
+        """
+        def view(request):
+            routers.PrimaryReplicaRouter().db_for_write(Produit)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(RequestFactory().post('/'))
+
+        assert 'primary_pin' in response.cookies
+        assert routers.is_pinned() is False  # le contexte est restauré
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('vue_synchrone', [True, False])
+    def test_cookie_pose_sous_asgi(self, vue_synchrone):
+        """
+        Arrange: Une vue qui écrit, synchrone (exécutée par sync_to_async) ou asynchrone
+        Act: Traverser le middleware en mode asynchrone
+        Assert: L'épinglage remonte au middleware et le cookie est posé
+        """
+        def view(request):
+            routers.PrimaryReplicaRouter().db_for_write(Produit)
+            return HttpResponse()
+
+        async def async_view(request):
+            return view(request)
+
+        middleware = ReplicaPinningMiddleware(sync_to_async(view) if vue_synchrone else async_view)
+        response = async_to_sync(middleware)(RequestFactory().post('/'))
+
+        assert 'primary_pin' in response.cookies
+        assert routers.is_pinned() is False
+
+    @pytest.mark.unit
+    def test_cookie_epingle_la_requete_suivante(self):
+        """La requête qui porte le cookie lit sur la base principale"""
+        seen = {}
+
+        def view(request):
+            seen['db'] = routers.PrimaryReplicaRouter().db_for_read(Produit)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES['primary_pin'] = str(time.time() + 5)
+        response = ReplicaPinningMiddleware(view)(request)
+
+        assert seen['db'] == 'default'
+        assert 'primary_pin' not in response.cookies
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('valeur', ['9999999999', 'inf'])
+    def test_echeance_du_cookie_bornee(self, valeur):
+        """
+        Arrange: Un cookie d'épinglage forgé, à échéance lointaine ou infinie
+        Act: Lire l'échéance dans le middleware
+        Assert: Elle ne dépasse pas la durée d'épinglage configurée
+        """
+        request = RequestFactory().get('/')
+        request.COOKIES['primary_pin'] = valeur
+
+        avant = time.time()
+        deadline = ReplicaPinningMiddleware(lambda request: HttpResponse()).echeance(request)
+
+        assert avant < deadline <= time.time() + routers.pin_seconds()
+
+    @pytest.mark.unit
+    def test_lecture_seule_sans_cookie(self):
+        """Une requête en lecture seule ne pose pas de cookie"""
+        response = ReplicaPinningMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+
+        assert 'primary_pin' not in response.cookies
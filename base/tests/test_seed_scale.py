@@ -0,0 +1,121 @@
+"""Tests du générateur de données à l'échelle (seed_scale)"""
+
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+
+from base.management.commands import seed_scale
+from customer.models import Commande, Customer, ProduitPanier
+from shop.models import Etablissement, Favorite, Produit
+
+
+pytestmark = pytest.mark.django_db
+
+OPTIONS = dict(etablissements=5, produits=60, clients=20, lignes=150, batch_size=25, date='2025-06-01', stdout=StringIO())
+
+
+def snapshot():
+    return {
+        'produits': list(Produit.objects.filter(slug__startswith='seed-').order_by('slug').values_list(
+            'slug', 'nom', 'prix', 'prix_promotionnel', 'date_debut_promo', 'date_fin_promo')),
+        'commandes': list(Commande.objects.filter(transaction_id__startswith='seed-').order_by('transaction_id').values_list(
+            'transaction_id', 'prix_total', 'date_add', 'customer__user__username')),
+    }
+
+
+def liens():
+    """Liens entre lignes générées, désignées par leur clé de génération et non par leur pk"""
+    return {
+        'produits': sorted(Produit.objects.filter(slug__startswith='seed-').values_list('slug', 'etablissement__slug')),
+        'favoris': sorted(Favorite.objects.filter(user__username__startswith='seed_').values_list(
+            'user__username', 'produit__slug')),
+        'paniers': sorted(ProduitPanier.objects.filter(panier__customer__user__username__startswith='seed_').values_list(
+            'panier__customer__user__username', 'produit__slug', 'quantite')),
+        'commandes': sorted(ProduitPanier.objects.filter(commande__transaction_id__startswith='seed-').values_list(
+            'commande__transaction_id', 'commande__customer__user__username', 'produit__slug', 'quantite')),
+    }
+
+
+class PoolDesordre:
+    """Pool de processus simulé : les lots sont validés dans l'ordre inverse, comme par des processus concurrents"""
+
+    def __init__(self, processes, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def starmap(self, fonction, lots):
+        return [fonction(*lot) for lot in reversed(lots)][::-1]
+
+
+class TestSeedScale:
+
+    @pytest.mark.integration
+    def test_volumes(self, city):
+        """
+        Arrange: Une base vide
+        Act: Générer 5 établissements, 60 produits, 20 clients et 150 lignes de commande
+        Assert: Les volumes demandés sont créés et chaque commande a 1 à 5 lignes
+        """
+        call_command('seed_scale', **OPTIONS)
+
+        assert Etablissement.objects.filter(slug__startswith='seed-').count() == 5
+        assert Produit.objects.filter(slug__startswith='seed-').count() == 60
+        assert Customer.objects.filter(user__username__startswith='seed_').count() == 20
+        assert ProduitPanier.objects.filter(commande__isnull=False).count() == 150
+        lignes = Commande.objects.annotate(n=Count('produit_commande')).values_list('n', flat=True)
+        assert set(lignes) <= {1, 2, 3, 4, 5}
+
+    @pytest.mark.integration
+    def test_prix_total_coherent(self, city):
+        call_command('seed_scale', **OPTIONS)
+
+        commande = Commande.objects.filter(transaction_id__startswith='seed-').first()
+        lignes = commande.produit_commande.select_related('produit')
+        attendu = sum((ligne.produit.prix_promotionnel or ligne.produit.prix) * ligne.quantite for ligne in lignes)
+        assert commande.prix_total == attendu
+
+    @pytest.mark.integration
+    def test_deterministe(self, city):
+        """Deux générations avec la même graine produisent les mêmes données"""
+        call_command('seed_scale', **OPTIONS)
+        premier = snapshot()
+
+        call_command('seed_scale', clear=True, **OPTIONS)
+
+        assert snapshot() == premier
+        assert Produit.objects.filter(slug__startswith='seed-').count() == 60
+
+    @pytest.mark.integration
+    def test_refuse_sans_clear(self, city):
+        call_command('seed_scale', **OPTIONS)
+
+        with pytest.raises(CommandError, match='--clear'):
+            call_command('seed_scale', **OPTIONS)
+
+    @pytest.mark.integration
+    def test_independant_du_nombre_de_processus(self, city, monkeypatch):
+        """
+        Arrange: Une génération avec 1 processus
+        Act: Régénérer avec 2 processus validant leurs lots dans le désordre (clés primaires permutées)
+        Assert: Les mêmes produits sont liés aux mêmes établissements, les mêmes commandes aux mêmes clients
+        """
+        call_command('seed_scale', workers=1, **OPTIONS)
+        sequentiel = liens()
+
+        # SQLite force un seul processus : base simulée et pool dans le désordre
+        monkeypatch.setattr(seed_scale, 'connection', SimpleNamespace(vendor='postgresql'))
+        monkeypatch.setattr(seed_scale, 'connections', SimpleNamespace(close_all=lambda: None))
+        monkeypatch.setattr(seed_scale.multiprocessing, 'get_context', lambda methode: SimpleNamespace(Pool=PoolDesordre))
+        out = StringIO()
+        call_command('seed_scale', clear=True, workers=2, **{**OPTIONS, 'stdout': out})
+
+        assert '2 processus' in out.getvalue()
+        assert liens() == sequentiel
@@ -0,0 +1,27 @@
+"""Tests du démarrage : les dépendances lourdes ne sont pas chargées au boot"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+HEAVY_MODULES = ['playwright', 'qrcode', 'xhtml2pdf', 'reportlab', 'cinetpay_sdk']
+
+
+@pytest.mark.slow
+def test_vues_importees_sans_dependances_lourdes():
+    """
+    Arrange: Un interpréteur neuf
+    Act: Charger Django et toutes les vues via l'URLconf
+    Assert: Aucun module lourd n'est importé
+    """
+    script = (
+        "import django, json, sys; django.setup();"
+        "from django.urls import get_resolver; get_resolver().url_patterns;"
+        "print(json.dumps(sorted(m for m in %r if m in sys.modules)))" % HEAVY_MODULES
+    )
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,151 @@
+"""
+Rejeu de trafic HTTP dans le processus, pour les outils de mesure.
+
+Un fichier de trafic est un JSON Lines ; chaque ligne décrit une requête :
+
+    {"method": "GET", "path": "/deals/"}
+    {"method": "POST", "path": "/customer/cart/add/product",
+     "json": {"panier": 1, "produit": 2, "quantite": 1}, "user": "marchand"}
+
+Les lignes sans "path" sont ignorées, ce qui permet de pointer l'outil sur
+n'importe quel journal JSON Lines (requests.jsonl par exemple).
+"""
+
+import inspect
+import json
+from contextlib import contextmanager
+from urllib.parse import unquote
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import Resolver404, resolve, reverse
+
+
+def load_traffic(path):
+    """Lit un fichier de trafic JSON Lines et retourne les requêtes rejouables."""
+    entries = []
+    with open(path, encoding='utf-8') as fichier:
+        for line in fichier:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get('path'):
+                entries.append(entry)
+    return entries
+
+
+def synthetic_traffic(limit=20):
+    """Trafic de navigation catalogue construit à partir des données en base."""
+    from shop.models import CategorieEtablissement, CategorieProduit, Produit
+
+    entries = [
+        {'method': 'GET', 'path': reverse('index')},
+        {'method': 'GET', 'path': reverse('shop')},
+    ]
+    for slug in Produit.objects.filter(status=True).values_list('slug', flat=True)[:limit]:
+        entries.append({'method': 'GET', 'path': reverse('product_detail', args=[slug])})
+    for model in (CategorieProduit, CategorieEtablissement):
+        for slug in model.objects.filter(status=True).values_list('slug', flat=True)[:limit]:
+            entries.append({'method': 'GET', 'path': reverse('categorie', args=[slug])})
+    return entries
+
+
+def storefront_mix(limit=10):
+    """
+    Mélange boutique : le trafic catalogue, plus le parcours panier et
+    commande du premier client actif et le tableau de bord du premier
+    marchand. Les utilisateurs et le panier sont pris en base, rien n'est créé.
+    """
+    from customer.models import Customer, Panier
+    from shop.models import Etablissement, Produit
+
+    entries = synthetic_traffic(limit)
+    produits = list(Produit.objects.filter(status=True).values_list('pk', flat=True)[:limit])
+
+    customer = Customer.objects.select_related('user').filter(user__is_active=True).first()
+    if customer is not None:
+        username = customer.user.username
+        panier = Panier.objects.filter(customer=customer, status=True).first()
+        if panier is not None:
+            for pk in produits:
+                ligne = {'panier': panier.pk, 'produit': pk, 'quantite': 1}
+                entries.append({'method': 'POST', 'path': reverse('add_to_cart'), 'json': ligne, 'user': username})
+                entries.append({'method': 'POST', 'path': reverse('update_cart'), 'json': dict(ligne, quantite=2), 'user': username})
+        for name in ('cart', 'checkout', 'commande', 'profil'):
+            entries.append({'method': 'GET', 'path': reverse(name), 'user': username})
+
+    etablissement = Etablissement.objects.select_related('user').first()
+    if etablissement is not None:
+        username = etablissement.user.username
+        for name in ('dashboard', 'article-detail', 'commande-reçu'):
+            entries.append({'method': 'GET', 'path': reverse(name), 'user': username})
+    return entries
+
+
+@contextmanager
+def replay_environment():
+    """
+    Environnement du client de test : hôte 'testserver' autorisé et e-mails
+    gardés en mémoire. Réutilise l'environnement déjà en place sous pytest.
+    """
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+def url_name(path):
+    try:
+        match = resolve(unquote(path.split('?', 1)[0]))
+    except Resolver404:
+        return '<404>'
+    return match.view_name or match.url_name or '<anonyme>'
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+class TrafficReplayer:
+    """
+    Rejoue des entrées de trafic avec un client de test par utilisateur.
+    Avec AsyncClient, la requête traverse le gestionnaire ASGI et le rejeu
+    reste synchrone pour l'appelant.
+    """
+
+    def __init__(self, client_class=Client):
+        self.client_class = client_class
+        self.clients = {}
+
+    def client_for(self, username):
+        if username not in self.clients:
+            client = self.client_class()
+            if username:
+                user = User.objects.filter(username=username).first()
+                if user is not None:
+                    client.force_login(user)
+            self.clients[username] = client
+        return self.clients[username]
+
+    def replay(self, entry):
+        client = self.client_for(entry.get('user'))
+        method = entry.get('method', 'GET').lower()
+        path = entry['path']
+        if 'json' in entry:
+            response = getattr(client, method)(path, data=json.dumps(entry['json']), content_type='application/json')
+        else:
+            response = getattr(client, method)(path, data=entry.get('data') or {})
+        if inspect.isawaitable(response):
+            response = async_to_sync(_await)(response)
+        return response
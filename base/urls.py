@@ -1,7 +1,16 @@
-from django.urls import path
+import re
+
+from django.conf import settings
+from django.urls import path, re_path
 from . import views
 
 
 urlpatterns = [
-    # path('', views.home, name='home'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
+
+# MEDIA_URL absolue (CDN, stockage distant) : rien à servir ici
+if settings.MEDIA_URL.startswith('/') and not settings.MEDIA_URL.startswith('//'):
+    urlpatterns.append(
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), views.media_view, name='media'),
+    )
@@ -1,6 +1,81 @@
-from django.shortcuts import render
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_GET, require_safe
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from . import media, metrics
+from .adresses import ip_client
+
 
 # Create your views here.
+@require_GET
+def metrics_view(request):
+    """
+    Exposition Prometheus, réservée aux requêtes portant « Authorization:
+    Bearer <METRICS_TOKEN> » : refusée à tous tant que le jeton n'est pas
+    défini. Derrière un proxy local, l'adresse d'origine ne prouve rien.
+    METRICS_ALLOWED_IPS, si renseignée, restreint en plus les adresses
+    clientes (base.adresses).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not constant_time_compare(authorization, 'Bearer %s' % token):
+        return HttpResponseForbidden()
+    adresses = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if adresses and ip_client(request) not in adresses:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type=CONTENT_TYPE_LATEST)
+
+
+@require_safe
+def media_view(request, path):
+    """
+    Fichier de MEDIA_ROOT avec ETag/Last-Modified (304), Range (206) et
+    Cache-Control ; l'envoi des octets est délégué au proxy si MEDIA_OFFLOAD est défini.
+    """
+    fullpath = media.media_path(path)
+    if fullpath is None:
+        raise Http404("Fichier introuvable")
+    stat = os.stat(fullpath)
+    etag, last_modified = media.etag(stat), int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = media_response(request, path, fullpath, stat, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = media.cache_control(path)
+    return response
+
 
+def media_response(request, path, fullpath, stat, etag, last_modified):
+    content_type = media.content_type(fullpath)
+    offload = media.offload_headers(path, fullpath)
+    if offload:
+        # Le proxy lit le fichier et gère lui-même les plages
+        return HttpResponse(content_type=content_type, headers=offload)
 
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+        try:
+            byte_range = media.parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+        except ValueError:
+            return HttpResponse(status=416, headers={'Content-Range': 'bytes */%d' % stat.st_size})
 
+    if byte_range is None:
+        # FileResponse passe par wsgi.file_wrapper (sendfile sous gunicorn)
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            media.read_range(fullpath, start, end - start + 1), status=206, content_type=content_type,
+        )
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, stat.st_size)
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,80 @@
+"""
+Micro-benchmarks des chemins chauds (modèles, prix, rendu).
+
+Chaque mesure est comparée à benchmarks/baseline.json : un test échoue si sa
+médiane dépasse la référence multipliée par BENCH_THRESHOLD (1.5 par défaut)
+et d'au moins 1 ms, pour ne pas échouer sur le bruit des mesures très courtes.
+BENCH_UPDATE_BASELINE=1 réécrit les références au lieu de comparer.
+
+    pytest benchmarks --no-cov
+    BENCH_UPDATE_BASELINE=1 pytest benchmarks --no-cov
+"""
+
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+
+BASELINE = Path(__file__).with_name('baseline.json')
+MIN_DELTA_MS = 1.0
+
+
+def threshold():
+    return float(os.environ.get('BENCH_THRESHOLD', '1.5'))
+
+
+def update_baseline():
+    return os.environ.get('BENCH_UPDATE_BASELINE') == '1'
+
+
+def load_baseline():
+    if BASELINE.exists():
+        return json.loads(BASELINE.read_text(encoding='utf-8'))
+    return {}
+
+
+class Benchmark:
+
+    def __init__(self, name, baseline, results):
+        self.name = name
+        self.baseline = baseline
+        self.results = results
+
+    def __call__(self, func, *args, rounds=5, warmup=1, **kwargs):
+        """Exécute func, retourne son résultat ; échoue en cas de régression."""
+        for _ in range(warmup):
+            func(*args, **kwargs)
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        median = statistics.median(timings)
+        self.results[self.name] = {'median_ms': round(median * 1000, 3), 'min_ms': round(min(timings) * 1000, 3)}
+        reference = self.baseline.get(self.name)
+        if not update_baseline() and reference:
+            limit = max(reference['median_ms'] * threshold(), reference['median_ms'] + MIN_DELTA_MS)
+            assert median * 1000 <= limit, "%s : %.2f ms, référence %.2f ms (seuil x%.2f)" % (
+                self.name, median * 1000, reference['median_ms'], threshold())
+        return result
+
+
+@pytest.fixture(scope='session')
+def benchmark_results():
+    results = {}
+    yield results
+    if update_baseline() and results:
+        baseline = load_baseline()
+        baseline.update(results)
+        BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+
+
+@pytest.fixture
+def benchmark(request, benchmark_results):
+    name = '%s::%s' % (Path(request.node.fspath).stem, request.node.name)
+    return Benchmark(name, load_baseline(), benchmark_results)
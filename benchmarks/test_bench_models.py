@@ -0,0 +1,60 @@
+"""Benchmarks des calculs de promotion et de total du panier"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from customer.models import Panier, ProduitPanier
+from shop.models import Produit
+
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture
+def produits_en_memoire():
+    """10 000 produits non enregistrés, promotions actives, à venir ou expirées"""
+    today = date.today()
+    return [
+        Produit(
+            nom='Produit %d' % i, prix=1000, prix_promotionnel=800,
+            date_debut_promo=today + timedelta(days=i % 7 - 3),
+            date_fin_promo=today + timedelta(days=i % 5 - 2) if i % 11 else None,
+        )
+        for i in range(10000)
+    ]
+
+
+@pytest.fixture
+def panier_50_lignes(db, customer, categorie_produit, etablissement, code_promotionnel):
+    today = date.today()
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom='Produit %d' % i, slug='produit-bench-%d' % i, description='-', description_deal='-',
+            prix=1000 + i, prix_promotionnel=800, categorie=categorie_produit, etablissement=etablissement,
+            date_debut_promo=today - timedelta(days=1) if i % 2 else None, date_fin_promo=today + timedelta(days=1),
+        )
+        for i in range(50)
+    ])
+    panier = Panier.objects.create(customer=customer, coupon=code_promotionnel)
+    ProduitPanier.objects.bulk_create([ProduitPanier(panier=panier, produit=produit, quantite=2) for produit in produits])
+    return panier
+
+
+@pytest.mark.django_db
+class TestBenchModels:
+
+    def test_check_promotion_10k_produits(self, benchmark, produits_en_memoire):
+        actifs = benchmark(lambda: sum(1 for produit in produits_en_memoire if produit.check_promotion))
+
+        assert 0 < actifs < len(produits_en_memoire)
+
+    def test_panier_total_50_lignes(self, benchmark, panier_50_lignes):
+        total = benchmark(lambda: panier_50_lignes.total)
+
+        assert total > 0
+
+    def test_panier_total_with_coupon_50_lignes(self, benchmark, panier_50_lignes):
+        total = benchmark(lambda: panier_50_lignes.total_with_coupon)
+
+        assert 0 < total < panier_50_lignes.total
@@ -0,0 +1,83 @@
+"""Benchmarks des processeurs de contexte, du rendu des pages et du reçu"""
+
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db.models import QuerySet
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from client.utils import qrcode_base64
+from customer.models import ProduitPanier
+from shop.models import Produit
+from website import context_processors
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.fixture
+def request_avec_session():
+    request = RequestFactory().get('/')
+    SessionMiddleware(lambda req: None).process_request(request)
+    request.user = AnonymousUser()
+    return request
+
+
+@pytest.fixture
+def produits_500(categorie_produit, etablissement):
+    today = date.today()
+    return Produit.objects.bulk_create([
+        Produit(
+            nom='Produit %d' % i, slug='produit-bench-%d' % i, description='Description', description_deal='-',
+            prix=1000 + i, prix_promotionnel=800, categorie=categorie_produit, etablissement=etablissement,
+            categorie_etab=categorie_produit.categorie,
+            date_debut_promo=today - timedelta(days=1) if i % 3 else None, date_fin_promo=today + timedelta(days=1),
+        )
+        for i in range(500)
+    ])
+
+
+def evaluer(contexte):
+    """Force l'évaluation des querysets paresseux retournés par un processeur"""
+    return {key: list(value) if isinstance(value, QuerySet) else value for key, value in contexte.items()}
+
+
+@pytest.mark.parametrize('processeur', ['categories', 'site_infos', 'cities', 'galeries', 'horaires', 'cart'])
+def test_context_processor(benchmark, request_avec_session, city, categorie_produit, processeur):
+    fonction = getattr(context_processors, processeur)
+
+    contexte = benchmark(lambda: evaluer(fonction(request_avec_session)), rounds=20)
+
+    assert contexte
+
+
+def test_rendu_shop_500_produits(benchmark, request_avec_session, produits_500):
+    html = benchmark(lambda: render_to_string(
+        'shop.html', {'produits': Produit.objects.filter(status=True)}, request=request_avec_session))
+
+    assert html.count('produit-bench-') >= 500
+
+
+def test_qrcode_base64(benchmark):
+    encoded = benchmark(qrcode_base64, 'https://cooldeal.ci/deals/commande-recu-detail/1/', rounds=10)
+
+    assert encoded
+
+
+def test_rendu_recu(benchmark, request_avec_session, commande, produit_sans_promo):
+    ProduitPanier.objects.bulk_create([
+        ProduitPanier(commande=commande, produit=produit_sans_promo, quantite=i + 1) for i in range(10)
+    ])
+    qr_code = qrcode_base64('https://cooldeal.ci/deals/commande-recu-detail/%d/' % commande.pk)
+
+    html = benchmark(lambda: render_to_string('receipt.html', {
+        'order_id': commande,
+        'produits_commande': commande.produit_commande.all(),
+        'qr_code': qr_code,
+        'logo': 'https://cooldeal.ci/media/logo.png',
+    }, request=request_avec_session), rounds=10)
+
+    assert qr_code in html
@@ -0,0 +1,93 @@
+"""Tests de l'historique des commandes du client (prefetch, recherche indexée, total en cache)"""
+
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from customer import historique
+from customer.models import Commande, ProduitPanier
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def commandes(customer, produit_sans_promo, produit_super_deal):
+    """Douze commandes de deux lignes, la plus ancienne datée d'il y a dix jours"""
+    # base2.html affiche la photo du client
+    customer.photo = 'clients/photo/client.jpg'
+    customer.save(update_fields=['photo'])
+    commandes = []
+    for n in range(12):
+        commande = Commande.objects.create(customer=customer, prix_total=1000 * n, transaction_id='TX%04d' % n)
+        ProduitPanier.objects.create(commande=commande, produit=produit_sans_promo, quantite=1)
+        ProduitPanier.objects.create(commande=commande, produit=produit_super_deal, quantite=2)
+        commandes.append(commande)
+    Commande.objects.filter(pk=commandes[0].pk).update(date_add=timezone.now() - datetime.timedelta(days=10))
+    return commandes
+
+
+class TestFiltrer:
+
+    @pytest.mark.unit
+    def test_prefixe_transaction(self, customer, commandes):
+        assert list(historique.filtrer(customer, 'TX0003')) == [commandes[3]]
+        assert len(historique.filtrer(customer, 'TX001')) == 2
+        assert not historique.filtrer(customer, 'X0003').exists()
+
+    @pytest.mark.unit
+    def test_nom_de_produit_sans_doublons(self, customer, commandes):
+        """Deux lignes correspondantes par commande donnent une seule commande"""
+        assert historique.filtrer(customer, 'attiéké').count() == 12
+
+    @pytest.mark.unit
+    def test_dates(self, customer, commandes):
+        """
+        Arrange: Une commande d'il y a dix jours, onze d'aujourd'hui
+        Act: Chercher par date saisie puis par période
+        Assert: Seules les commandes de la journée ou de la période sont retenues
+        """
+        ancienne = timezone.localtime(Commande.objects.get(pk=commandes[0].pk).date_add).date()
+
+        assert list(historique.filtrer(customer, ancienne.strftime('%d/%m/%Y'))) == [commandes[0]]
+        assert historique.filtrer(customer, date_min=str(ancienne + datetime.timedelta(days=1))).count() == 11
+        assert historique.filtrer(customer, date_max=str(ancienne)).count() == 1
+
+
+class TestVueCommande:
+
+    @pytest.mark.integration
+    def test_requetes_constantes(self, client, user, commandes, django_assert_max_num_queries):
+        """
+        Arrange: Un client avec douze commandes de deux lignes
+        Act: Afficher la première page de l'historique
+        Assert: Dix commandes affichées sans une requête de lignes par commande
+        """
+        client.force_login(user)
+        client.get(reverse('commande'))
+
+        with django_assert_max_num_queries(10):
+            response = client.get(reverse('commande'))
+
+        assert response.status_code == 200
+        assert len(response.context['commandes_data']) == 10
+        assert all(len(data['produits']) == 2 for data in response.context['commandes_data'])
+
+    @pytest.mark.integration
+    def test_total_en_cache_invalide_par_nouvelle_commande(self, client, user, customer, commandes):
+        client.force_login(user)
+        assert client.get(reverse('commande')).context['commandes_paginated'].paginator.count == 12
+
+        Commande.objects.create(customer=customer, prix_total=500, transaction_id='TX9999')
+
+        assert client.get(reverse('commande')).context['commandes_paginated'].paginator.count == 13
+
+    @pytest.mark.integration
+    def test_recherche(self, client, user, commandes):
+        client.force_login(user)
+
+        response = client.get(reverse('commande'), {'q': 'TX0005'})
+
+        assert [data['commande'] for data in response.context['commandes_data']] == [commandes[5]]
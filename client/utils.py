@@ -2,12 +2,14 @@ from io import BytesIO
 from django.http import HttpResponse
 from django.template.loader import get_template
 
-from xhtml2pdf import pisa
-import qrcode, base64
-from io import BytesIO
+import base64
 
 
+# xhtml2pdf (reportlab, pyhanko, pypdf...) et qrcode sont importés à l'appel :
+# les charger au niveau du module alourdit le démarrage de chaque worker.
 def render_to_pdf(template_src, context_dict={}):
+    from xhtml2pdf import pisa
+
     template = get_template(template_src)
     html = template.render(context_dict)
     result = BytesIO()
@@ -18,6 +20,8 @@ def render_to_pdf(template_src, context_dict={}):
 
 
 def qrcode_base64(data: str) -> str:
+    import qrcode
+
     img = qrcode.make(data)
     buf = BytesIO()
     img.save(buf, format="PNG")
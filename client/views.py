@@ -2,17 +2,16 @@ from django.shortcuts import render, reverse, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from customer.models import Customer, Commande, ProduitPanier
+from customer import historique, photos
 from shop.models import  Favorite, Produit
 from django.core.paginator import Paginator
-from django.db.models import Q
 from cities_light.models import City
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from .utils import render_to_pdf
 from .utils import qrcode_base64
 from website.models import SiteInfo
-import qrcode
-from playwright.sync_api import sync_playwright
+from base.metrics import INVOICE_PDF_DURATION
 import base64
 from io import BytesIO
 
@@ -50,38 +49,24 @@ def commande(request):
     except:
         return redirect('index')
 
-    # Récupération de toutes les commandes de l'utilisateur
-    commandes = Commande.objects.filter(customer=customer).order_by('-date_add')
-
-    # Recherche par ID transaction, produit ou date
+    # Recherche par ID transaction (préfixe), produit ou date, période date_min / date_max
     query = request.GET.get('q')
-    if query:
-        commandes = commandes.filter(
-            Q(transaction_id__icontains=query) |
-            Q(date_add__icontains=query) |
-            Q(produit_commande__produit__nom__icontains=query)
-        ).distinct()
-
-    # Pagination : Limite à 10 articles par page
-    paginator = Paginator(commandes, 10)  # 10 commandes par page
-    page = request.GET.get('page')
-    commandes_paginated = paginator.get_page(page)
-
-    # Récupération des produits associés aux commandes paginées
-    commandes_data = []
-    for commande in commandes_paginated:
-        produits_commande = ProduitPanier.objects.filter(commande=commande).select_related('produit')
-        commandes_data.append({
-            'commande': commande,
-            'produits': produits_commande,
-        })
+    commandes_paginated = historique.paginer(customer, request.GET, per_page=10)
+
+    # Produits des commandes de la page, chargés en une requête (Prefetch)
+    commandes_data = [
+        {'commande': commande, 'produits': commande.produit_commande.all()}
+        for commande in commandes_paginated
+    ]
 
     datas = {
         'user': user,
         'customer': customer,
         'commandes_data': commandes_data,
         'commandes_paginated': commandes_paginated,
-        'query': query
+        'query': query,
+        'date_min': request.GET.get('date_min', ''),
+        'date_max': request.GET.get('date_max', ''),
     }
 
     return render(request, 'commande.html', datas)
@@ -196,9 +181,12 @@ def parametre(request):
         customer.ville = ville
         customer.adresse = adresse
 
-        if 'profile_picture' in request.FILES:
+        nouvelle_photo = 'profile_picture' in request.FILES
+        if nouvelle_photo:
             customer.photo = request.FILES['profile_picture']
         customer.save()
+        if nouvelle_photo:
+            photos.lancer(customer)
 
         return redirect('parametre')
 
@@ -220,18 +208,22 @@ def invoice_pdf(request, order_id):
     detail_url = request.build_absolute_uri(
         reverse("commande-reçu-detail", args=[order.id])  # ou une URL publique de vérif
     )
-    qr_b64 = qrcode_base64(detail_url)
+    with INVOICE_PDF_DURATION.labels('qrcode').time():
+        qr_b64 = qrcode_base64(detail_url)
 
     # 2. Construire le HTML à partir du template
-    html = render_to_string("receipt.html", {
-        "order_id": order,
-        "produits_commande": order.produit_commande.all(),
-        "qr_code": qr_b64,
-        "logo": request.build_absolute_uri(SiteInfo.objects.latest('date_add').logo.url)
-    }, request=request)
-
-    # 3. Lancer Playwright et générer le PDF
-    with sync_playwright() as p:
+    with INVOICE_PDF_DURATION.labels('html').time():
+        html = render_to_string("receipt.html", {
+            "order_id": order,
+            "produits_commande": order.produit_commande.all(),
+            "qr_code": qr_b64,
+            "logo": request.build_absolute_uri(SiteInfo.objects.latest('date_add').logo.url)
+        }, request=request)
+
+    # 3. Lancer Playwright et générer le PDF (import coûteux, chargé à la demande)
+    from playwright.sync_api import sync_playwright
+
+    with INVOICE_PDF_DURATION.labels('pdf').time(), sync_playwright() as p:
         browser = p.chromium.launch()
         page = browser.new_page()
         page.set_content(html, wait_until="load")  # on imprime directement le HTML rendu
@@ -24,6 +24,14 @@ from customer.models import (
 )
 from contact.models import Contact, NewsLetter
 from cities_light.models import City, Country
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def cache_vide():
+    """Vide les deux niveaux du cache (base.cache.TwoTierCache) avant chaque test"""
+    cache.clear()
+    yield
 
 
 # ==================== FIXTURES UTILISATEUR ====================
@@ -280,6 +288,18 @@ def commande(db, customer):
     )
 
 
+@pytest.fixture
+def cinetpay(settings):
+    """CinetPay local (customer.cinetpay_local) : API de vérification et secret des notifications"""
+    from customer.cinetpay_local import CinetPayLocal
+
+    settings.CINETPAY_SECRET_KEY = 'secret-de-test'
+    settings.PAIEMENT_NOTIFICATION_ARRIERE_PLAN = False
+    with CinetPayLocal() as local:
+        settings.CINETPAY_CHECK_URL = local.check_url
+        yield local
+
+
 @pytest.fixture
 def password_reset_token(db, user):
     """Crée un token de réinitialisation de mot de passe"""
@@ -1,9 +1,10 @@
 from django.contrib import admin
 
 import contact.models as models
+from base.admin import FastModelAdmin
 
 
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -15,22 +16,41 @@ class ContactAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'sujet',
-        'email',
-        'message',
-    )
+    list_filter = ('status',)
+    search_fields = ('email', 'nom', 'sujet')
+    date_hierarchy = 'date_add'
 
 
-class NewsLetterAdmin(admin.ModelAdmin):
+class NewsLetterAdmin(FastModelAdmin):
 
     list_display = ('id', 'email', 'date_add', 'date_update', 'status')
-    list_filter = ('date_add', 'date_update', 'status', 'id', 'email')
+    list_filter = ('status',)
+    search_fields = ('email',)
+    date_hierarchy = 'date_add'
+
+
+class CampagneAdmin(FastModelAdmin):
+
+    list_display = ('id', 'sujet', 'statut', 'date_preparation', 'date_fin', 'date_add')
+    list_filter = ('statut',)
+    search_fields = ('sujet',)
+    readonly_fields = ('statut', 'date_preparation', 'date_fin')
+    actions = ('lancer',)
+
+    @admin.action(description="Lancer l'envoi (CampagneCronJob ou manage.py envoyer_campagne)")
+    def lancer(self, request, queryset):
+        count = queryset.filter(statut=models.Campagne.BROUILLON).update(statut=models.Campagne.EN_COURS)
+        self.message_user(request, "%d campagne(s) lancée(s)" % count)
+
+
+class EnvoiCampagneAdmin(FastModelAdmin):
+
+    list_display = ('id', 'campagne', 'abonne', 'statut', 'tentatives', 'date_envoi')
+    list_filter = ('statut', 'campagne')
+    list_select_related = ('campagne', 'abonne')
+    search_fields = ('abonne__email',)
+    raw_id_fields = ('campagne', 'abonne')
+    readonly_fields = ('statut', 'tentatives', 'erreur', 'date_envoi')
 
 
 def _register(model, admin_class):
@@ -38,4 +58,6 @@ def _register(model, admin_class):
 
 
 _register(models.Contact, ContactAdmin)
-_register(models.NewsLetter, NewsLetterAdmin)
\ No newline at end of file
+_register(models.NewsLetter, NewsLetterAdmin)
+_register(models.Campagne, CampagneAdmin)
+_register(models.EnvoiCampagne, EnvoiCampagneAdmin)
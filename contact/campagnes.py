@@ -0,0 +1,234 @@
+"""
+Envoi des campagnes de newsletter.
+
+1. preparer() crée une ligne EnvoiCampagne par abonné actif, par lots
+   (parcours par clé primaire, INSERT groupés) : rien n'est chargé en entier.
+2. envoyer() réserve les envois en attente par lots (UPDATE conditionnel,
+   comme customer.paiements.reserver : deux processus ne s'en partagent pas
+   un), puis les répartit sur NEWSLETTER_CONNEXIONS connexions SMTP ouvertes
+   une fois par lot. Le débit global est plafonné à
+   NEWSLETTER_ENVOIS_PAR_SECONDE.
+
+Le message est rendu une seule fois par campagne. Chaque envoi garde son
+statut : une campagne interrompue reprend là où elle s'était arrêtée, les
+envois restés « en cours » plus de NEWSLETTER_DELAI_REPRISE minutes sont
+repris.
+
+Chaque message porte un lien de désabonnement signé (pied de page et en-têtes
+List-Unsubscribe / List-Unsubscribe-Post pour le désabonnement en un clic des
+clients mail). Un abonné qui se désabonne en cours de campagne n'est plus
+servi : ses envois en attente sont annulés à la clôture.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Campagne, EnvoiCampagne, NewsLetter
+
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 500
+MAX_TENTATIVES = 3
+
+SEL_DESABONNEMENT = 'contact.desabonnement'
+# Remplacé par le lien de chaque destinataire dans le message rendu une fois par campagne
+MARQUE_DESABONNEMENT = '__lien_desabonnement__'
+
+
+class Debit:
+    """Plafond de débit partagé entre threads : un envoi toutes les 1/par_seconde secondes."""
+
+    def __init__(self, par_seconde):
+        self.intervalle = 1 / par_seconde if par_seconde else 0
+        self.prochain = time.monotonic()
+        self.verrou = threading.Lock()
+
+    def attendre(self):
+        if not self.intervalle:
+            return
+        with self.verrou:
+            maintenant = time.monotonic()
+            creneau = max(self.prochain, maintenant)
+            self.prochain = creneau + self.intervalle
+        if creneau > maintenant:
+            time.sleep(creneau - maintenant)
+
+
+def preparer(campagne):
+    """Crée les envois des abonnés actifs (une seule fois par campagne). Retourne le nombre d'abonnés parcourus."""
+    if campagne.date_preparation is not None:
+        return 0
+    dernier, total = 0, 0
+    while True:
+        pks = list(
+            NewsLetter.objects.filter(status=True, pk__gt=dernier).order_by('pk').values_list('pk', flat=True)[:TAILLE_LOT]
+        )
+        if not pks:
+            break
+        EnvoiCampagne.objects.bulk_create(
+            [EnvoiCampagne(campagne=campagne, abonne_id=pk) for pk in pks], ignore_conflicts=True)
+        dernier, total = pks[-1], total + len(pks)
+    campagne.date_preparation = timezone.now()
+    Campagne.objects.filter(pk=campagne.pk).update(date_preparation=campagne.date_preparation)
+    return total
+
+
+def jeton_desabonnement(abonne_id):
+    return signing.dumps(abonne_id, salt=SEL_DESABONNEMENT)
+
+
+def abonne_du_jeton(jeton):
+    """Clé de l'abonné désigné par le jeton, ou None s'il n'est pas authentique."""
+    try:
+        return int(signing.loads(jeton, salt=SEL_DESABONNEMENT))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def lien_desabonnement(abonne_id):
+    return settings.SITE_URL.rstrip('/') + reverse('desabonnement', args=[jeton_desabonnement(abonne_id)])
+
+
+def rendre(campagne):
+    """(sujet, texte, html) communs à tous les destinataires, lien de désabonnement à substituer."""
+    html = render_to_string('campagne-email.html', {'campagne': campagne, 'lien_desabonnement': MARQUE_DESABONNEMENT})
+    texte = "%s\n\nSe désabonner : %s" % (strip_tags(campagne.contenu).strip(), MARQUE_DESABONNEMENT)
+    return campagne.sujet, texte, html
+
+
+def a_reprendre():
+    delai = timedelta(minutes=settings.NEWSLETTER_DELAI_REPRISE)
+    return Q(statut=EnvoiCampagne.EN_ATTENTE) | Q(statut=EnvoiCampagne.EN_COURS, date_update__lt=timezone.now() - delai)
+
+
+def reserver(campagne, taille, apres=0):
+    """
+    Réserve jusqu'à `taille` envois d'abonnés encore actifs, de clé supérieure
+    à `apres` ; retourne [(pk, email, tentatives, abonne_id)].
+    """
+    pks = list(
+        EnvoiCampagne.objects.filter(a_reprendre(), campagne=campagne, pk__gt=apres, abonne__status=True)
+        .order_by('pk').values_list('pk', flat=True)[:taille]
+    )
+    if not pks:
+        return []
+    marque = timezone.now()
+    EnvoiCampagne.objects.filter(a_reprendre(), pk__in=pks).update(
+        statut=EnvoiCampagne.EN_COURS, tentatives=F('tentatives') + 1, date_update=marque)
+    return list(
+        EnvoiCampagne.objects.filter(pk__in=pks, statut=EnvoiCampagne.EN_COURS, date_update=marque)
+        .order_by('pk').values_list('pk', 'abonne__email', 'tentatives', 'abonne_id')
+    )
+
+
+def expedier(destinataires, message, debit):
+    """
+    Envoie le message à chaque destinataire sur une seule connexion SMTP.
+    Retourne (pks envoyés, {pk: (erreur, définitive)}).
+    """
+    sujet, texte, html = message
+    envoyes, erreurs = [], {}
+    connexion = get_connection()
+    try:
+        connexion.open()
+        for pk, email, tentatives, abonne_id in destinataires:
+            debit.attendre()
+            lien = lien_desabonnement(abonne_id)
+            mail = EmailMultiAlternatives(
+                sujet, texte.replace(MARQUE_DESABONNEMENT, lien), settings.DEFAULT_FROM_EMAIL, [email],
+                connection=connexion,
+                headers={'List-Unsubscribe': '<%s>' % lien, 'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click'},
+            )
+            mail.attach_alternative(html.replace(MARQUE_DESABONNEMENT, lien), 'text/html')
+            try:
+                if connexion.send_messages([mail]):
+                    envoyes.append(pk)
+                else:
+                    erreurs[pk] = ("Message non accepté", tentatives >= MAX_TENTATIVES)
+            except smtplib.SMTPRecipientsRefused as e:
+                erreurs[pk] = (str(e), True)
+            except Exception as e:
+                # Connexion perdue : reprise à la prochaine réservation, nouvelle connexion pour la suite
+                erreurs[pk] = (str(e), tentatives >= MAX_TENTATIVES)
+                connexion.close()
+                connexion.open()
+    except Exception as e:
+        # Serveur injoignable : les destinataires non traités restent à reprendre
+        logger.warning("Connexion SMTP impossible : %s", e)
+        for pk, email, tentatives, abonne_id in destinataires:
+            if pk not in erreurs and pk not in envoyes:
+                erreurs[pk] = (str(e), tentatives >= MAX_TENTATIVES)
+    finally:
+        connexion.close()
+    return envoyes, erreurs
+
+
+def enregistrer(envoyes, erreurs):
+    maintenant = timezone.now()
+    if envoyes:
+        EnvoiCampagne.objects.filter(pk__in=envoyes).update(
+            statut=EnvoiCampagne.ENVOYE, erreur='', date_envoi=maintenant, date_update=maintenant)
+    for pk, (erreur, definitive) in erreurs.items():
+        EnvoiCampagne.objects.filter(pk=pk).update(
+            statut=EnvoiCampagne.ERREUR if definitive else EnvoiCampagne.EN_ATTENTE, erreur=erreur[:1000],
+            date_update=maintenant)
+
+
+def envoyer(campagne, limite=None):
+    """
+    Envoie (ou reprend) une campagne, au plus `limite` messages.
+    Retourne {'envoyes': n, 'erreurs': n}.
+    """
+    preparer(campagne)
+    message = rendre(campagne)
+    debit = Debit(settings.NEWSLETTER_ENVOIS_PAR_SECONDE)
+    connexions = max(1, settings.NEWSLETTER_CONNEXIONS)
+    bilan = {'envoyes': 0, 'erreurs': 0}
+    restant, dernier = limite, 0
+    with ThreadPoolExecutor(max_workers=connexions, thread_name_prefix='campagne') as pool:
+        while restant is None or restant > 0:
+            # Parcours par clé croissante : un envoi en échec n'est retenté qu'au passage suivant
+            lot = reserver(campagne, TAILLE_LOT if restant is None else min(TAILLE_LOT, restant), dernier)
+            if not lot:
+                break
+            parts = [lot[n::connexions] for n in range(connexions) if lot[n::connexions]]
+            envoyes_lot = 0
+            for envoyes, erreurs in pool.map(lambda part: expedier(part, message, debit), parts):
+                enregistrer(envoyes, erreurs)
+                envoyes_lot += len(envoyes)
+                bilan['envoyes'] += len(envoyes)
+                bilan['erreurs'] += len(erreurs)
+            if not envoyes_lot:
+                logger.warning("Campagne %s : aucun envoi réussi sur un lot, interruption", campagne.pk)
+                break
+            dernier = lot[-1][0]
+            if restant is not None:
+                restant -= len(lot)
+    terminer(campagne)
+    return bilan
+
+
+def terminer(campagne):
+    """Clôt la campagne quand plus aucun envoi n'est en attente ni en cours."""
+    EnvoiCampagne.objects.filter(
+        campagne=campagne, statut=EnvoiCampagne.EN_ATTENTE, abonne__status=False
+    ).update(statut=EnvoiCampagne.ANNULE, date_update=timezone.now())
+    if not EnvoiCampagne.objects.filter(
+        campagne=campagne, statut__in=(EnvoiCampagne.EN_ATTENTE, EnvoiCampagne.EN_COURS)
+    ).exists():
+        Campagne.objects.filter(pk=campagne.pk, statut=Campagne.EN_COURS).update(
+            statut=Campagne.TERMINEE, date_fin=timezone.now())
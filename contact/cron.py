@@ -0,0 +1,18 @@
+from django.conf import settings
+from django_cron import CronJobBase, Schedule
+
+from contact.campagnes import envoyer
+from contact.models import Campagne
+
+
+class CampagneCronJob(CronJobBase):
+    RUN_EVERY_MINS = 5
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'contact.campagnes'
+
+    def do(self):
+        # Campagnes lancées depuis l'admin : NEWSLETTER_ENVOIS_PAR_CYCLE messages par passage
+        for campagne in Campagne.objects.filter(statut=Campagne.EN_COURS):
+            bilan = envoyer(campagne, limite=settings.NEWSLETTER_ENVOIS_PAR_CYCLE)
+            print(f"Campagne {campagne.pk} : {bilan['envoyes']} envoyés, {bilan['erreurs']} erreurs.")
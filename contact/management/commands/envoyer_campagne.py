@@ -0,0 +1,40 @@
+"""
+Envoi (ou reprise) d'une campagne de newsletter hors du serveur web.
+
+    python manage.py envoyer_campagne 12
+    python manage.py envoyer_campagne 12 --limite 5000 --par-seconde 20
+
+Le débit est plafonné (NEWSLETTER_ENVOIS_PAR_SECONDE par défaut) pour ne pas
+saturer le serveur SMTP ni la base pendant que le site tourne.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from contact import campagnes
+from contact.models import Campagne
+
+
+class Command(BaseCommand):
+    help = "Envoie une campagne de newsletter aux abonnés actifs, en reprenant les envois non faits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('campagne', type=int)
+        parser.add_argument('--limite', type=int, help="Nombre maximal de messages pour cette exécution")
+        parser.add_argument('--par-seconde', type=float, help="Plafond de débit (NEWSLETTER_ENVOIS_PAR_SECONDE)")
+
+    def handle(self, *args, **options):
+        try:
+            campagne = Campagne.objects.get(pk=options['campagne'])
+        except Campagne.DoesNotExist:
+            raise CommandError("Campagne %s introuvable" % options['campagne'])
+        if campagne.statut == Campagne.TERMINEE:
+            raise CommandError("La campagne « %s » est terminée" % campagne)
+        if options['par_seconde'] is not None:
+            settings.NEWSLETTER_ENVOIS_PAR_SECONDE = options['par_seconde']
+
+        Campagne.objects.filter(pk=campagne.pk, statut=Campagne.BROUILLON).update(statut=Campagne.EN_COURS)
+        campagne.statut = Campagne.EN_COURS
+        bilan = campagnes.envoyer(campagne, limite=options['limite'])
+        self.stdout.write(self.style.SUCCESS(
+            "%d messages envoyés, %d erreurs" % (bilan['envoyes'], bilan['erreurs'])))
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def normaliser_emails(apps, schema_editor):
+    """Emails en minuscules, un seul abonnement par adresse (le plus ancien) avant l'index unique."""
+    NewsLetter = apps.get_model('contact', 'NewsLetter')
+    vus = set()
+    doublons = []
+    for pk, email in NewsLetter.objects.order_by('pk').values_list('pk', 'email').iterator():
+        normalise = email.strip().lower()
+        if normalise in vus:
+            doublons.append(pk)
+            continue
+        vus.add(normalise)
+        if normalise != email:
+            NewsLetter.objects.filter(pk=pk).update(email=normalise)
+    for debut in range(0, len(doublons), 500):
+        NewsLetter.objects.filter(pk__in=doublons[debut:debut + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(normaliser_emails, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Campagne',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=255)),
+                ('contenu', models.TextField(help_text='HTML du message, inséré dans le gabarit campagne-email.html')),
+                ('statut', models.CharField(choices=[('brouillon', 'Brouillon'), ('en_cours', 'En cours'), ('terminee', 'Terminée')], default='brouillon', max_length=20)),
+                ('date_preparation', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('date_add', models.DateTimeField(auto_now_add=True)),
+                ('date_update', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Campagne',
+                'verbose_name_plural': 'Campagnes',
+            },
+        ),
+        migrations.AlterField(
+            model_name='newsletter',
+            name='email',
+            field=models.EmailField(max_length=255, unique=True),
+        ),
+        migrations.CreateModel(
+            name='EnvoiCampagne',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('envoye', 'Envoyé'), ('erreur', 'Erreur')], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_envoi', models.DateTimeField(blank=True, null=True)),
+                ('date_update', models.DateTimeField(auto_now=True)),
+                ('abonne', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envois', to='contact.newsletter')),
+                ('campagne', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envois', to='contact.campagne')),
+            ],
+            options={
+                'verbose_name': 'Envoi de campagne',
+                'verbose_name_plural': 'Envois de campagne',
+                'indexes': [models.Index(fields=['campagne', 'statut'], name='contact_env_campagn_6b9b2c_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='envoicampagne',
+            constraint=models.UniqueConstraint(fields=('campagne', 'abonne'), name='envoi_campagne_abonne_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0002_campagnes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='envoicampagne',
+            name='statut',
+            field=models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('envoye', 'Envoyé'), ('erreur', 'Erreur'), ('annule', 'Annulé (désabonné)')], default='en_attente', max_length=20),
+        ),
+    ]
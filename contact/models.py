@@ -17,11 +17,79 @@ class Contact(models.Model):
 
 
 class NewsLetter(models.Model):
-    email = models.EmailField(max_length=255)
+    # En minuscules (contact.views) : l'inscription est un upsert sur cet index unique
+    email = models.EmailField(max_length=255, unique=True)
 
     date_add = models.DateTimeField(auto_now_add=True)
     date_update = models.DateTimeField(auto_now=True)
     status = models.BooleanField(default=True)
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+
+class Campagne(models.Model):
+    """
+    Envoi d'un même message à tous les abonnés actifs de la newsletter,
+    destinataire par destinataire (EnvoiCampagne) par contact.campagnes.
+    """
+    BROUILLON = 'brouillon'
+    EN_COURS = 'en_cours'
+    TERMINEE = 'terminee'
+    STATUTS = (
+        (BROUILLON, 'Brouillon'),
+        (EN_COURS, 'En cours'),
+        (TERMINEE, 'Terminée'),
+    )
+
+    sujet = models.CharField(max_length=255)
+    contenu = models.TextField(help_text="HTML du message, inséré dans le gabarit campagne-email.html")
+    statut = models.CharField(max_length=20, choices=STATUTS, default=BROUILLON)
+    date_preparation = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    date_add = models.DateTimeField(auto_now_add=True)
+    date_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Campagne'
+        verbose_name_plural = 'Campagnes'
+
+    def __str__(self):
+        return self.sujet
+
+
+class EnvoiCampagne(models.Model):
+    EN_ATTENTE = 'en_attente'
+    EN_COURS = 'en_cours'
+    ENVOYE = 'envoye'
+    ERREUR = 'erreur'
+    ANNULE = 'annule'
+    STATUTS = (
+        (EN_ATTENTE, 'En attente'),
+        (EN_COURS, 'En cours'),
+        (ENVOYE, 'Envoyé'),
+        (ERREUR, 'Erreur'),
+        (ANNULE, 'Annulé (désabonné)'),
+    )
+
+    campagne = models.ForeignKey(Campagne, on_delete=models.CASCADE, related_name='envois')
+    abonne = models.ForeignKey(NewsLetter, on_delete=models.CASCADE, related_name='envois')
+    statut = models.CharField(max_length=20, choices=STATUTS, default=EN_ATTENTE)
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    date_envoi = models.DateTimeField(null=True, blank=True)
+    date_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Envoi de campagne'
+        verbose_name_plural = 'Envois de campagne'
+        constraints = [
+            models.UniqueConstraint(fields=['campagne', 'abonne'], name='envoi_campagne_abonne_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['campagne', 'statut']),
+        ]
+
+    def __str__(self):
+        return "%s → %s" % (self.campagne_id, self.abonne_id)
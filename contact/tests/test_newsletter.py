@@ -0,0 +1,221 @@
+"""Tests de l'inscription à la newsletter (upsert) et de l'envoi des campagnes"""
+
+import json
+import smtplib
+
+import pytest
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.urls import reverse
+
+from contact import campagnes
+from contact.models import Campagne, EnvoiCampagne, NewsLetter
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def envoi_immediat(settings):
+    settings.NEWSLETTER_ENVOIS_PAR_SECONDE = 0
+    settings.NEWSLETTER_CONNEXIONS = 2
+    cache.clear()
+
+
+@pytest.fixture
+def abonnes():
+    NewsLetter.objects.bulk_create([NewsLetter(email='abonne%d@example.com' % n) for n in range(7)])
+    NewsLetter.objects.create(email='parti@example.com', status=False)
+
+
+@pytest.fixture
+def campagne():
+    return Campagne.objects.create(sujet='Soldes', contenu='<p>Jusqu’à <b>-50 %</b></p>', statut=Campagne.EN_COURS)
+
+
+def abonner(client, email):
+    return client.post(reverse('post_newsletter'), json.dumps({'email': email}),
+                       content_type='application/json').json()
+
+
+class TestInscription:
+
+    @pytest.mark.integration
+    def test_upsert(self, client, django_assert_num_queries):
+        """
+        Arrange: Un abonnement désactivé
+        Act: S'inscrire de nouveau avec l'email en majuscules
+        Assert: Une seule requête, l'abonnement existant est réactivé sans doublon
+        """
+        NewsLetter.objects.create(email='awa@example.com', status=False)
+
+        with django_assert_num_queries(1):
+            datas = abonner(client, ' AWA@example.com ')
+
+        assert datas['success'] is True
+        abonnement = NewsLetter.objects.get()
+        assert (abonnement.email, abonnement.status) == ('awa@example.com', True)
+
+    @pytest.mark.integration
+    def test_email_invalide(self, client):
+        assert abonner(client, 'pas-un-email')['success'] is False
+        assert not NewsLetter.objects.exists()
+
+
+class TestCampagne:
+
+    @pytest.mark.integration
+    def test_envoi(self, abonnes, campagne, monkeypatch):
+        """
+        Arrange: 7 abonnés actifs et un désabonné
+        Act: Envoyer la campagne
+        Assert: Un message par abonné actif, rendu une seule fois, campagne terminée
+        """
+        rendus = []
+        rendre = campagnes.rendre
+        monkeypatch.setattr(campagnes, 'rendre', lambda c: rendus.append(c.pk) or rendre(c))
+
+        bilan = campagnes.envoyer(campagne)
+
+        assert bilan == {'envoyes': 7, 'erreurs': 0}
+        assert rendus == [campagne.pk]
+        assert sorted(m.to[0] for m in mail.outbox) == sorted('abonne%d@example.com' % n for n in range(7))
+        assert all(m.alternatives[0][0].count('-50 %') == 1 for m in mail.outbox)
+        campagne.refresh_from_db()
+        assert campagne.statut == Campagne.TERMINEE and campagne.date_fin
+
+    @pytest.mark.integration
+    def test_reprise(self, abonnes, campagne):
+        """Interrompue après 3 messages, la campagne reprend sans renvoyer les premiers"""
+        assert campagnes.envoyer(campagne, limite=3)['envoyes'] == 3
+        assert Campagne.objects.get(pk=campagne.pk).statut == Campagne.EN_COURS
+
+        campagnes.envoyer(Campagne.objects.get(pk=campagne.pk))
+
+        assert len(mail.outbox) == 7
+        assert len({m.to[0] for m in mail.outbox}) == 7
+        assert EnvoiCampagne.objects.filter(statut=EnvoiCampagne.ENVOYE).count() == 7
+
+    @pytest.mark.integration
+    def test_destinataire_refuse(self, abonnes, campagne, monkeypatch):
+        """Un destinataire refusé est en erreur définitive, les autres sont envoyés"""
+        envoyer = EmailBackend.send_messages
+
+        def send_messages(self, messages):
+            if messages[0].to == ['abonne3@example.com']:
+                raise smtplib.SMTPRecipientsRefused({'abonne3@example.com': (550, b'inconnu')})
+            return envoyer(self, messages)
+        monkeypatch.setattr(EmailBackend, 'send_messages', send_messages)
+
+        bilan = campagnes.envoyer(campagne)
+
+        assert bilan == {'envoyes': 6, 'erreurs': 1}
+        envoi = EnvoiCampagne.objects.get(abonne__email='abonne3@example.com')
+        assert envoi.statut == EnvoiCampagne.ERREUR and envoi.erreur
+        assert Campagne.objects.get(pk=campagne.pk).statut == Campagne.TERMINEE
+
+    @pytest.mark.integration
+    def test_serveur_injoignable(self, abonnes, campagne, monkeypatch):
+        """Sans serveur SMTP, l'envoi s'interrompt et tout reste à reprendre"""
+        def panne(self):
+            raise ConnectionRefusedError('SMTP injoignable')
+        monkeypatch.setattr(EmailBackend, 'open', panne)
+
+        bilan = campagnes.envoyer(campagne)
+
+        assert bilan['envoyes'] == 0
+        assert EnvoiCampagne.objects.filter(statut=EnvoiCampagne.EN_ATTENTE).count() == 7
+        assert Campagne.objects.get(pk=campagne.pk).statut == Campagne.EN_COURS
+
+    @pytest.mark.unit
+    def test_reservation_exclusive(self, abonnes, campagne):
+        campagnes.preparer(campagne)
+
+        premier = campagnes.reserver(campagne, 5)
+        second = campagnes.reserver(campagne, 5)
+
+        assert len(premier) == 5 and len(second) == 2
+        assert not {pk for pk, *_ in premier} & {pk for pk, *_ in second}
+
+    @pytest.mark.integration
+    def test_commande(self, abonnes, campagne):
+        Campagne.objects.filter(pk=campagne.pk).update(statut=Campagne.BROUILLON)
+
+        call_command('envoyer_campagne', str(campagne.pk), '--limite', '4')
+
+        assert len(mail.outbox) == 4
+
+
+class TestDesabonnement:
+
+    @pytest.mark.integration
+    def test_lien_et_entetes(self, abonnes, campagne, settings):
+        """
+        Arrange: Une campagne pour 7 abonnés
+        Act: L'envoyer
+        Assert: Chaque message porte son propre lien signé, dans le texte, le HTML
+                et les en-têtes de désabonnement en un clic
+        """
+        settings.SITE_URL = 'https://exemple.ci/'
+
+        campagnes.envoyer(campagne)
+
+        liens = set()
+        for message in mail.outbox:
+            abonne = NewsLetter.objects.get(email=message.to[0])
+            lien = campagnes.lien_desabonnement(abonne.pk)
+            assert lien.startswith('https://exemple.ci/')
+            assert message.extra_headers['List-Unsubscribe'] == '<%s>' % lien
+            assert message.extra_headers['List-Unsubscribe-Post'] == 'List-Unsubscribe=One-Click'
+            assert lien in message.body and lien in message.alternatives[0][0]
+            liens.add(lien)
+        assert len(liens) == 7
+
+    @pytest.mark.integration
+    def test_un_clic(self, client, abonnes):
+        """
+        Arrange: Le lien de désabonnement d'un abonné
+        Act: L'ouvrir (GET) puis le POST en un clic du client mail, sans jeton CSRF
+        Assert: Le GET ne change rien, le POST désabonne
+        """
+        abonne = NewsLetter.objects.get(email='abonne0@example.com')
+        url = reverse('desabonnement', args=[campagnes.jeton_desabonnement(abonne.pk)])
+        client.handler.enforce_csrf_checks = True
+
+        assert client.get(url).status_code == 200
+        assert NewsLetter.objects.get(pk=abonne.pk).status is True
+
+        response = client.post(url, 'List-Unsubscribe=One-Click', content_type='application/x-www-form-urlencoded')
+
+        assert response.status_code == 200
+        assert NewsLetter.objects.get(pk=abonne.pk).status is False
+
+    @pytest.mark.integration
+    def test_jeton_falsifie(self, client, abonnes):
+        abonne = NewsLetter.objects.get(email='abonne0@example.com')
+        jeton = campagnes.jeton_desabonnement(abonne.pk)
+
+        assert client.post(reverse('desabonnement', args=[jeton[:-1] + 'x'])).status_code == 404
+        assert client.post(reverse('desabonnement', args=['1'])).status_code == 404
+        assert NewsLetter.objects.get(pk=abonne.pk).status is True
+
+    @pytest.mark.integration
+    def test_desabonne_en_cours_de_campagne(self, abonnes, campagne):
+        """
+        Arrange: Une campagne interrompue après 3 messages
+        Act: Un abonné pas encore servi se désabonne, puis la campagne reprend
+        Assert: Il ne reçoit rien, son envoi est annulé et la campagne se termine
+        """
+        campagnes.envoyer(campagne, limite=3)
+        servis = {m.to[0] for m in mail.outbox}
+        parti = NewsLetter.objects.exclude(email__in=servis).filter(status=True).first()
+        NewsLetter.objects.filter(pk=parti.pk).update(status=False)
+
+        campagnes.envoyer(Campagne.objects.get(pk=campagne.pk))
+
+        assert parti.email not in {m.to[0] for m in mail.outbox}
+        assert len(mail.outbox) == 6
+        assert EnvoiCampagne.objects.get(abonne=parti).statut == EnvoiCampagne.ANNULE
+        assert Campagne.objects.get(pk=campagne.pk).statut == Campagne.TERMINEE
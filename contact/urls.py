@@ -1,9 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 
+# Sous ASGI, les points d'entrée JSON passent par leur version asynchrone
+if settings.ASYNC_VIEWS:
+    post_contact, post_newsletter = views.post_contact_async, views.post_newsletter_async
+else:
+    post_contact, post_newsletter = views.post_contact, views.post_newsletter
+
 urlpatterns = [
     path('', views.contact, name='contact'),
-    path('contact/post', views.post_contact, name='post_contact'),
-    path('newsletter/post', views.post_newsletter, name='post_newsletter'),
+    path('contact/post', post_contact, name='post_contact'),
+    path('newsletter/post', post_newsletter, name='post_newsletter'),
+    path('newsletter/desabonnement/<str:jeton>', views.desabonnement, name='desabonnement'),
 ]
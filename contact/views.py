@@ -1,11 +1,23 @@
 from django.core.validators import validate_email
 from django.shortcuts import render, redirect
 from django.shortcuts import render
-from . import models
+from . import campagnes, models
 from django.contrib.auth import authenticate, login as login_request, logout
 import json
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+
+# Inscription à la newsletter : un seul INSERT … ON CONFLICT sur l'email (unique),
+# qui réactive un abonnement désactivé
+ABONNEMENT = {'update_conflicts': True, 'unique_fields': ['email'], 'update_fields': ['status', 'date_update']}
+
+
+def abonnement(email):
+    return models.NewsLetter(email=email.lower(), status=True)
 
 
 # Create your views here.
@@ -48,12 +60,39 @@ def post_contact(request):
     }
     return JsonResponse(data, safe=False)
 
+async def post_contact_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    email = postdata['email']
+    sujet = postdata['sujet']
+    messages = postdata['messages']
+    nom = postdata['nom']
+    try:
+        validate_email(email)
+        is_email = True
+    except ValidationError:
+        is_email = False
+
+    if is_email and nom is not None and sujet is not None and messages is not None and nom:
+        await models.Contact.objects.acreate(nom=nom, email=email, sujet=sujet, message=messages)
+        isSuccess = True
+        message = "Merci pour votre message"
+    else:
+        isSuccess = False
+        message = "Merci de renseigner correctement les champs"
+    data = {
+        'message':message,
+        'success':isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
 def post_newsletter(request):
     postdata = json.loads(request.body.decode('utf-8'))
 
     # name = postdata['name']
 
-    email = postdata['email']
+    email = (postdata['email'] or '').strip()
     try:
         validate_email(email)
         is_email = True
@@ -61,9 +100,7 @@ def post_newsletter(request):
         is_email = False
     isSuccess = False
     if is_email:
-        newsletter = models.NewsLetter()
-        
-        newsletter.email = email
+        models.NewsLetter.objects.bulk_create([abonnement(email)], **ABONNEMENT)
         isSuccess = True
         message = "Félicitations vous êtes abonnés à notre newsletter"
     else:
@@ -73,4 +110,45 @@ def post_newsletter(request):
         'message':message,
         'success':isSuccess
     }
-    return JsonResponse(data, safe=False)
\ No newline at end of file
+    return JsonResponse(data, safe=False)
+
+
+async def post_newsletter_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    email = (postdata['email'] or '').strip()
+    try:
+        validate_email(email)
+        is_email = True
+    except ValidationError:
+        is_email = False
+    if is_email:
+        await models.NewsLetter.objects.abulk_create([abonnement(email)], **ABONNEMENT)
+        isSuccess = True
+        message = "Félicitations vous êtes abonnés à notre newsletter"
+    else:
+        isSuccess = False
+        message = "Merci de renseigner une adresse email correcte"
+    data = {
+        'message':message,
+        'success':isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
+@csrf_exempt
+def desabonnement(request, jeton):
+    """
+    Lien de désabonnement des campagnes. En GET, une page de confirmation
+    (les analyseurs de liens des messageries ne désabonnent personne) ; en
+    POST, le désabonnement, y compris en un clic depuis le client mail
+    (List-Unsubscribe-Post, sans jeton CSRF : le lien signé en tient lieu).
+    """
+    abonne_id = campagnes.abonne_du_jeton(jeton)
+    if abonne_id is None:
+        raise Http404("Lien de désabonnement invalide")
+    datas = {'desabonne': False}
+    if request.method == 'POST':
+        models.NewsLetter.objects.filter(pk=abonne_id).update(status=False, date_update=timezone.now())
+        datas['desabonne'] = True
+    return render(request, 'desabonnement.html', datas)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cooldeal.settings')
+# Sous ASGI, les points d'entrée JSON (panier, connexion, contact) sont servis en asynchrone
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
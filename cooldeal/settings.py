@@ -59,8 +59,6 @@ INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.humanize',
 
-    "sslserver",
-    "django_admin_generator",
     # 'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -82,21 +80,38 @@ INSTALLED_APPS = [
     'django_cron',
 ]
 
+# Outils de développement (runsslserver, admin_generator) : inutiles en production
+if DEBUG:
+    INSTALLED_APPS += [
+        "sslserver",
+        "django_admin_generator",
+    ]
+
 MIDDLEWARE = [
+    'base.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'base.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'base.ratelimit.RateLimitMiddleware',
+    'base.middleware.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+# Noms hachés, manifeste et précompression gzip/Brotli : cache navigateur d'un an
+STATICFILES_STORAGE = 'base.storage.StorefrontStaticFilesStorage'
 
 CRON_CLASSES = [
     "customer.cron.CleanExpiredTokensCronJob",
+    "base.cron.PurgeRequestProfilesCronJob",
+    "shop.cron.ImportCatalogueCronJob",
+    "customer.cron.PaiementNotificationCronJob",
+    "customer.cron.PaiementReconciliationCronJob",
+    "contact.cron.CampagneCronJob",
 ]
 
 
@@ -138,6 +153,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cooldeal.wsgi.application'
 
+# Versions asynchrones des vues JSON ; activé par cooldeal/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -148,6 +166,27 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# Réplicas en lecture : DB_REPLICAS liste des fichiers SQLite séparés par des
+# virgules (copies de la base principale). Pour un autre moteur, déclarer les
+# alias dans DATABASES et les ajouter à DATABASE_REPLICAS.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(','))):
+    alias = 'replica_%d' % (index + 1)
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['base.routers.PrimaryReplicaRouter']
+
+# Durée pendant laquelle une requête qui a écrit continue de lire sur la base principale
+REPLICA_PIN_SECONDS = 5
+# Applications toujours servies par la base principale (et dont les écritures n'épinglent pas)
+REPLICA_PRIMARY_ONLY_APPS = ['sessions', 'django_cron', 'base']
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.mysql',
@@ -206,8 +245,115 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Fichiers media servis par base.views.media_view (ETag, Range, Cache-Control).
+# Derrière un proxy, MEDIA_OFFLOAD lui délègue l'envoi des octets :
+# - « x-accel-redirect » (nginx) avec une location interne pointant sur MEDIA_ROOT :
+#       location /protected-media/ { internal; alias /chemin/vers/media/; }
+# - « x-sendfile » (Apache mod_xsendfile).
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 3600
+# Noms donnés par ContentHashStorage (16 caractères hexadécimaux, ex. 3f2a9c1b7d4e05a8.jpg) : cache immuable d'un an.
+# Au moins une lettre : un ancien nom horodaté (20230101123456.jpg) garde le cache ordinaire.
+MEDIA_VERSIONED_PATTERN = r'^(?=\d*[a-f])[0-9a-f]{16}\.\w+$'
+
+# Fichiers envoyés non publics (imports de catalogue), hors de MEDIA_ROOT : jamais servis
+PRIVATE_MEDIA_ROOT = BASE_DIR / "private"
+
+# Fichiers envoyés nommés par empreinte de contenu : un seul exemplaire par contenu
+DEFAULT_FILE_STORAGE = 'base.storage.ContentHashStorage'
+
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Bundles de la boutique, construits par `manage.py build_assets` dans static/bundles.
+# Avec ASSET_BUNDLES_SOURCES (DEBUG par défaut), {% bundle %} inclut les fichiers sources.
+ASSET_BUNDLES_DIR = BASE_DIR / "static"
+ASSET_BUNDLES_SOURCES = DEBUG
+ASSET_BUNDLES = {
+    'bundles/storefront.css': [
+        'css/bootstrap.min.css',
+        'css/core.css',
+        'style.css',
+        'css/responsive.css',
+        'css/style-customizer.css',
+    ],
+    'bundles/storefront.js': [
+        'js/bootstrap.min.js',
+        'js/jquery.nivo.slider.pack.js',
+        'js/owl.carousel.min.js',
+        'js/ajax-mail.js',
+        'js/jquery.magnific-popup.js',
+        'js/jquery.counterup.min.js',
+        'js/waypoints.min.js',
+        'js/style-customizer.js',
+        'js/plugins.js',
+        'js/main.js',
+    ],
+}
+
+# Imports de catalogue (shop.imports) : traitement dans un thread après l'envoi,
+# repris par ImportCatalogueCronJob s'il ne progresse plus depuis IMPORT_CATALOGUE_DELAI_REPRISE minutes
+IMPORT_CATALOGUE_ARRIERE_PLAN = True
+IMPORT_CATALOGUE_DELAI_REPRISE = 10
+IMPORT_IMAGE_MAX_OCTETS = 5 * 1024 * 1024
+IMPORT_IMAGE_TIMEOUT = 10
+IMPORT_IMAGE_THREADS = 4
+
+# CinetPay : vérification des notifications de paiement (customer.paiements)
+CINETPAY_API_KEY = os.environ.get('CINETPAY_API_KEY', '')
+CINETPAY_SITE_ID = os.environ.get('CINETPAY_SITE_ID', '')
+CINETPAY_SECRET_KEY = os.environ.get('CINETPAY_SECRET_KEY', '')
+CINETPAY_CHECK_URL = os.environ.get('CINETPAY_CHECK_URL', 'https://api-checkout.cinetpay.com/v2/payment/check')
+CINETPAY_TIMEOUT = 10
+PAIEMENT_NOTIFICATION_ARRIERE_PLAN = True
+PAIEMENT_NOTIFICATION_THREADS = 4
+PAIEMENT_NOTIFICATION_DELAI_REPRISE = 5
+# Réconciliation des commandes en attente sans notification (PaiementReconciliationCronJob) :
+# commandes de plus de AGE minutes et de moins de FENETRE jours, MAX par cycle
+PAIEMENT_RECONCILIATION_AGE = 10
+PAIEMENT_RECONCILIATION_FENETRE = 7
+PAIEMENT_RECONCILIATION_MAX = 500
+PAIEMENT_RECONCILIATION_THREADS = 8
+
+# Photos de profil (customer.photos) : réduites après l'inscription, hors de la requête
+CUSTOMER_PHOTO_ARRIERE_PLAN = True
+CUSTOMER_PHOTO_MAX = 512
+CUSTOMER_PHOTO_THREADS = 2
+
+# Campagnes de newsletter (contact.campagnes) : connexions SMTP simultanées,
+# plafond de débit global, messages par passage de CampagneCronJob
+NEWSLETTER_CONNEXIONS = 2
+NEWSLETTER_ENVOIS_PAR_SECONDE = 10
+NEWSLETTER_ENVOIS_PAR_CYCLE = 2500
+NEWSLETTER_DELAI_REPRISE = 15
+# Adresse publique du site, pour les liens absolus des emails (désabonnement)
+SITE_URL = os.environ.get('SITE_URL', 'https://www.cooldeal-ci.com')
+
+# Admin (base.admin.FastModelAdmin) : au-delà de ce nombre de lignes, le total
+# d'une liste non filtrée est estimé d'après les statistiques du SGBD
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Limitation de débit (base.ratelimit) par nom d'URL : {portée: (requêtes, secondes)},
+# portées « ip », « session » et « compte ». Refus en 429 avec Retry-After.
+RATELIMIT_ENABLED = True
+RATELIMIT_METHODS = ('POST',)
+_PANIER = {'ip': (120, 60), 'session': (60, 60)}
+RATELIMITS = {
+    'post_contact': {'ip': (5, 600), 'session': (3, 600)},
+    'post_newsletter': {'ip': (10, 3600)},
+    'post': {'ip': (30, 300), 'session': (10, 300)},
+    'inscription': {'ip': (10, 3600)},
+    'request_reset_password': {'ip': (5, 3600)},
+    'add_to_cart': _PANIER,
+    'add_coupon': {'ip': (20, 600), 'session': (10, 600)},
+    'delete_from_cart': _PANIER,
+    'update_cart': _PANIER,
+}
+
+# Nombre de proxys de confiance devant l'application (nginx, répartiteur) : l'IP du client
+# est lue dans X-Forwarded-For à cette profondeur (base.adresses). 0 : REMOTE_ADDR seule.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -218,7 +364,15 @@ SILENCED_SYSTEM_CHECKS = ["security.W019"]
 
 LOGIN_URL = 'login'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Connexion par nom d'utilisateur ou email, échecs limités par compte et par IP (customer.tentatives)
+AUTHENTICATION_BACKENDS = ['customer.backends.EmailOrUsernameBackend']
+LOGIN_THROTTLE_WINDOW = 15 * 60
+LOGIN_THROTTLE_ACCOUNT = 5
+LOGIN_THROTTLE_IP = 50
+
+# Envoi mesuré par base.mail (métriques Prometheus), délégué au backend SMTP
+EMAIL_BACKEND = 'base.mail.MetricsEmailBackend'
+METRICS_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -255,3 +409,38 @@ DAISY_SETTINGS = {
 CITIES_LIGHT_TRANSLATION_LANGUAGES = ['fr', 'en']
 CITIES_LIGHT_INCLUDE_COUNTRIES = ['CI']
 CITIES_LIGHT_INCLUDE_CITY_TYPES = ['PPL', 'PPLA', 'PPLA2', 'PPLA3', 'PPLA4', 'PPLC', 'PPLF', 'PPLG', 'PPLL', 'PPLR', 'PPLS', 'STLMT',]
+
+# Durée de vie maximale (secondes) de l'instantané du registre des slugs /deals/<slug>
+REGISTRE_SLUGS_TTL = 300
+
+# Profilage des requêtes (base.middleware.RequestProfilerMiddleware) : à la demande
+# pour le staff (en-tête X-Profile ou ?_profile), plus une fraction échantillonnée
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_MAX_REPORTS = 500
+PROFILER_RETENTION_DAYS = 7
+PROFILER_MAX_QUERIES = 500
+
+# Cache à deux niveaux (base.cache.TwoTierCache), instrumenté (succès / échecs dans /metrics) :
+# L1 en mémoire de chaque processus, L2 partagé entre les workers : Redis si CACHE_REDIS_URL,
+# fichiers si CACHE_DIR, sinon mémoire locale (développement, tests).
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHE_PARTAGE = {'BACKEND': 'base.cache.InstrumentedRedisCache', 'LOCATION': os.environ['CACHE_REDIS_URL']}
+elif os.environ.get('CACHE_DIR'):
+    CACHE_PARTAGE = {'BACKEND': 'base.cache.InstrumentedFileBasedCache', 'LOCATION': os.environ['CACHE_DIR']}
+else:
+    CACHE_PARTAGE = {'BACKEND': 'base.cache.InstrumentedLocMemCache', 'LOCATION': 'partage'}
+CACHE_PARTAGE['OPTIONS'] = {'METRICS_LABEL': 'partage'}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'base.cache.InstrumentedTwoTierCache',
+        'OPTIONS': {'L2': 'partage', 'L1_MAX_ENTRIES': 2000, 'L1_TIMEOUT': 5},
+    },
+    'partage': CACHE_PARTAGE,
+}
+
+# Métriques Prometheus (/metrics) : jeton Bearer obligatoire (vue refusée sans METRICS_TOKEN),
+# adresses clientes autorisées en plus si la liste est renseignée.
+# Sous gunicorn, gunicorn.conf.py positionne PROMETHEUS_MULTIPROC_DIR.
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
@@ -27,5 +27,5 @@ urlpatterns = [
     path('deals/', include('shop.urls')),
     path('contact/', include('contact.urls')),
     path('client/', include('client.urls')),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) \
- + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('', include('base.urls')),
+] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -1,10 +1,14 @@
 from django.contrib import admin
+from django.utils import timezone
 
 import customer.models as models
+from base.admin import FastModelAdmin
+from base.exports import export_response
+from shop import exports
 from .models import PasswordResetToken  
 
 
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -19,22 +23,14 @@ class CustomerAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'user',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'adresse',
-        'photo',
-        'contact_1',
-        'contact_2',
-        'ville',
-        'pays',
-    )
+    list_filter = ('status',)
+    search_fields = ('user__username', 'user__email', 'contact_1')
+    date_hierarchy = 'date_add'
+    list_select_related = ('user', 'ville')
+    autocomplete_fields = ('user', 'ville')
 
 
-class CodePromotionnelAdmin(admin.ModelAdmin):
+class CodePromotionnelAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -48,22 +44,13 @@ class CodePromotionnelAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'etat',
-        'date_fin',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'libelle',
-        'reduction',
-        'nombre_u',
-        'code_promo',
-    )
+    list_filter = ('etat', 'status', 'date_fin')
+    search_fields = ('code_promo', 'libelle')
+    date_hierarchy = 'date_add'
     raw_id_fields = ('forfait',)
 
 
-class PanierAdmin(admin.ModelAdmin):
+class PanierAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -74,17 +61,13 @@ class PanierAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'session_id',
-        'customer',
-        'date_add',
-        'coupon',
-        'date_update',
-        'status',
-    )
+    date_hierarchy = 'date_add'
+    list_select_related = ('customer__user', 'coupon')
+    autocomplete_fields = ('customer', 'coupon')
+    raw_id_fields = ('session_id',)
 
 
-class CommandeAdmin(admin.ModelAdmin):
+class CommandeAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -98,25 +81,31 @@ class CommandeAdmin(admin.ModelAdmin):
         'date_add',
         'date_update',
         'status',
+        'statut_paiement',
         'recu_paiement',
     )
-    list_filter = (
-        'customer',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'id_paiment',
-        'payment_token',
-        'payment_url',
-        'api_response_id',
-        'crypto',
-        'prix_total',
-        'recu_paiement',
-    )
+    list_filter = ('statut_paiement',)
+    search_fields = ('transaction_id', 'customer__user__username')
+    date_hierarchy = 'date_add'
+    list_select_related = ('customer__user',)
+    autocomplete_fields = ('customer',)
+    actions = ('exporter_csv', 'exporter_xlsx')
 
+    def exporter(self, request, queryset, format_):
+        nom = 'commandes-%s' % timezone.localdate().isoformat()
+        return export_response(format_, nom, exports.COLONNES_COMMANDES,
+                               exports.rangees_commandes(queryset.order_by('-date_add')), request)
 
-class ProduitPanierAdmin(admin.ModelAdmin):
+    @admin.action(description="Exporter en CSV")
+    def exporter_csv(self, request, queryset):
+        return self.exporter(request, queryset, 'csv')
+
+    @admin.action(description="Exporter en Excel")
+    def exporter_xlsx(self, request, queryset):
+        return self.exporter(request, queryset, 'xlsx')
+
+
+class ProduitPanierAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -128,28 +117,53 @@ class ProduitPanierAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'produit',
-        'commande',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'panier',
-        'quantite',
-    )
-    raw_id_fields = ('panier',)
+    date_hierarchy = 'date_add'
+    list_select_related = ('produit', 'panier', 'commande')
+    autocomplete_fields = ('produit',)
+    raw_id_fields = ('panier', 'commande')
+    actions = ('exporter_csv', 'exporter_xlsx')
 
+    def exporter(self, request, queryset, format_):
+        # Les lignes encore dans un panier n'appartiennent à aucune commande
+        lignes = queryset.filter(commande__isnull=False).order_by('-commande__date_add', 'pk')
+        nom = 'lignes-commandes-%s' % timezone.localdate().isoformat()
+        return export_response(format_, nom, exports.COLONNES_LIGNES, exports.rangees_lignes(lignes), request)
 
-class PasswordResetTokenAdmin(admin.ModelAdmin):
+    @admin.action(description="Exporter en CSV")
+    def exporter_csv(self, request, queryset):
+        return self.exporter(request, queryset, 'csv')
+
+    @admin.action(description="Exporter en Excel")
+    def exporter_xlsx(self, request, queryset):
+        return self.exporter(request, queryset, 'xlsx')
+
+
+class PasswordResetTokenAdmin(FastModelAdmin):
     list_display = ('id', 'user', 'token', 'created_at')  # Colonnes affichées dans la liste
-    list_filter = ('created_at',)  # Filtres par champ
+    date_hierarchy = 'created_at'  # Navigation par date
     search_fields = ('user__username', 'token')  # Champs de recherche
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
 
 # Enregistrez le modèle avec l'administration
 admin.site.register(PasswordResetToken, PasswordResetTokenAdmin)
 
 
+class NotificationPaiementAdmin(FastModelAdmin):
+    list_display = ('id', 'transaction_id', 'statut', 'resultat', 'tentatives', 'date_add', 'date_update')
+    list_filter = ('statut',)
+    search_fields = ('transaction_id',)
+    date_hierarchy = 'date_add'
+    readonly_fields = ('transaction_id', 'donnees', 'resultat', 'tentatives', 'erreur')
+
+
+class EmailRetireAdmin(FastModelAdmin):
+    list_display = ('id', 'email', 'user', 'conserve_par', 'date_add')
+    list_select_related = ('user', 'conserve_par')
+    search_fields = ('email', 'user__username')
+    readonly_fields = ('user', 'email', 'conserve_par')
+
+
 def _register(model, admin_class):
     admin.site.register(model, admin_class)
 
@@ -158,4 +172,6 @@ _register(models.Customer, CustomerAdmin)
 _register(models.CodePromotionnel, CodePromotionnelAdmin)
 _register(models.Panier, PanierAdmin)
 _register(models.Commande, CommandeAdmin)
-_register(models.ProduitPanier, ProduitPanierAdmin)
\ No newline at end of file
+_register(models.ProduitPanier, ProduitPanierAdmin)
+_register(models.NotificationPaiement, NotificationPaiementAdmin)
+_register(models.EmailRetire, EmailRetireAdmin)
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q, Value
+from django.db.models.functions import Lower, NullIf
+
+from . import tentatives
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Connexion par nom d'utilisateur ou par email en une requête indexée
+    (username unique, index unique sur NULLIF(LOWER(email), '')), avec limitation des échecs
+    par compte et par adresse IP (customer.tentatives).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        identifiant = (username or kwargs.get(UserModel.USERNAME_FIELD) or '').strip()
+        if not identifiant or password is None:
+            return None
+        if tentatives.bloque(request, identifiant):
+            # Interrompt aussi les backends suivants : pas de hachage pour une tentative refusée
+            raise PermissionDenied
+
+        user = self.get_user_by_identifiant(identifiant)
+        if user is None:
+            # Même coût qu'un mot de passe faux : l'existence du compte ne se devine pas au temps de réponse
+            UserModel().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            tentatives.reinitialiser(identifiant)
+            return user
+        tentatives.echec(request, identifiant)
+        return None
+
+    def get_user_by_identifiant(self, identifiant):
+        """Le compte de ce nom d'utilisateur, sinon l'unique compte de cet email (casse ignorée)."""
+        UserModel = get_user_model()
+        critere = Q(**{UserModel.USERNAME_FIELD: identifiant})
+        if '@' in identifiant:
+            critere |= Q(email_cle=identifiant.lower())
+        candidats = list(UserModel._default_manager.alias(
+            email_cle=NullIf(Lower('email'), Value(''))).filter(critere)[:3])
+        for candidat in candidats:
+            if candidat.get_username() == identifiant:
+                return candidat
+        # Un email partagé par plusieurs comptes ne désigne personne
+        return candidats[0] if len(candidats) == 1 else None
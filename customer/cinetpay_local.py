@@ -0,0 +1,91 @@
+"""
+CinetPay local pour les tests et les essais de charge.
+
+Serveur HTTP dans un thread qui répond à /v2/payment/check comme l'API
+CinetPay, d'après les transactions déclarées par le test, avec une latence
+réglable ; notification() construit le corps et l'en-tête x-token signés
+qu'enverrait CinetPay. Pointer CINETPAY_CHECK_URL vers check_url.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import paiements
+
+
+class CinetPayLocal:
+
+    def __init__(self, latence=0):
+        self.latence = latence
+        self.transactions = {}
+        self.requetes = []
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+
+    @property
+    def check_url(self):
+        return 'http://127.0.0.1:%d/v2/payment/check' % self.serveur.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+    def payer(self, transaction_id, montant, statut=paiements.ACCEPTE):
+        self.transactions[transaction_id] = {'status': statut, 'amount': str(montant), 'currency': 'XOF'}
+
+    def reponse(self, corps):
+        transaction_id = corps.get('transaction_id')
+        self.requetes.append(transaction_id)
+        if self.latence:
+            time.sleep(self.latence)
+        if transaction_id not in self.transactions:
+            return {'code': '627', 'message': 'TRANSACTION_NOT_FOUND', 'data': {'status': 'WAITING_CUSTOMER_PAYMENT'}}
+        return {'code': '00', 'message': 'SUCCES', 'data': self.transactions[transaction_id]}
+
+    def handler(self):
+        local = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                longueur = int(self.headers.get('Content-Length') or 0)
+                contenu = json.dumps(local.reponse(json.loads(self.rfile.read(longueur) or b'{}'))).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(contenu)))
+                self.end_headers()
+                self.wfile.write(contenu)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def notification(transaction_id, montant, site_id='local', secret=None):
+    """(données POST, en-têtes) d'une notification CinetPay signée."""
+    donnees = {
+        'cpm_site_id': site_id,
+        'cpm_trans_id': transaction_id,
+        'cpm_trans_date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'cpm_amount': str(montant),
+        'cpm_currency': 'XOF',
+        'signature': '',
+        'payment_method': 'OM',
+        'cel_phone_num': '0700000000',
+        'cpm_phone_prefixe': '225',
+        'cpm_language': 'fr',
+        'cpm_version': 'V4',
+        'cpm_payment_config': 'SINGLE',
+        'cpm_page_action': 'PAYMENT',
+        'cpm_custom': '',
+        'cpm_designation': '',
+        'cpm_error_message': 'SUCCES',
+    }
+    return donnees, {'HTTP_X_TOKEN': paiements.jeton(donnees, secret)}
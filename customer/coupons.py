@@ -0,0 +1,43 @@
+"""
+Recherche des codes promotionnels par code saisi, via base.cache.memoiser.
+
+Seule la clé primaire est gardée (None pour un code inconnu : les essais de
+codes au hasard ne touchent pas la base non plus). Toute modification d'un
+code promotionnel remplace la version incluse dans les clés (customer.signals).
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from base.cache import memoiser
+
+from .models import CodePromotionnel
+
+
+VERSION_KEY = 'customer:coupons:version'
+TIMEOUT = 60 * 10
+
+
+def version():
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        current = time.time()
+        cache.add(VERSION_KEY, current, None)
+        current = cache.get(VERSION_KEY, current)
+    return current
+
+
+def invalider():
+    cache.set(VERSION_KEY, time.time(), None)
+
+
+def pk_par_code(code):
+    """Clé primaire du code promotionnel `code`, ou None."""
+    empreinte = hashlib.sha256(str(code).encode()).hexdigest()[:32]
+    return memoiser(
+        'customer:coupon:%s:%s' % (version(), empreinte),
+        lambda: CodePromotionnel.objects.filter(code_promo=code).values_list('pk', flat=True).first(),
+        TIMEOUT,
+    )
@@ -1,5 +1,6 @@
 from django_cron import CronJobBase, Schedule
-from customer.models import PasswordResetToken
+from customer.models import NotificationPaiement, PasswordResetToken
+from customer.paiements import reconcilier, traiter
 from django.utils.timezone import now
 from datetime import timedelta
 
@@ -15,3 +16,37 @@ class CleanExpiredTokensCronJob(CronJobBase):
         count = expired_tokens.count()
         expired_tokens.delete()
         print(f"{count} tokens expirés supprimés.")
+
+
+class PaiementNotificationCronJob(CronJobBase):
+    RUN_EVERY_MINS = 5
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'customer.paiement_notifications'
+
+    def do(self):
+        # Notifications non traitées (processus arrêté, CinetPay injoignable) : reçues ou en cours
+        pks = NotificationPaiement.objects.filter(
+            statut__in=(NotificationPaiement.RECUE, NotificationPaiement.EN_COURS),
+            date_update__lt=now() - timedelta(minutes=1),
+        ).values_list('pk', flat=True)
+        count = 0
+        for pk in list(pks):
+            # traiter() ne reprend une notification en cours que si elle ne progresse plus
+            traiter(pk)
+            count += 1
+        print(f"{count} notifications de paiement examinées.")
+
+
+class PaiementReconciliationCronJob(CronJobBase):
+    RUN_EVERY_MINS = 15
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'customer.paiement_reconciliation'
+
+    def do(self):
+        bilan = reconcilier()
+        print(
+            f"{bilan['verifiees']} commandes vérifiées : {bilan['acceptees']} acceptées, "
+            f"{bilan['refusees']} refusées, {bilan['erreurs']} erreurs."
+        )
@@ -0,0 +1,107 @@
+"""
+Historique des commandes d'un client.
+
+La recherche n'emploie que des critères indexés : préfixe de transaction_id
+(index B-tree, « _like » sous PostgreSQL), plage de dates sur date_add
+(index customer, date_add) et nom de produit par sous-requête EXISTS, sans
+DISTINCT. Les lignes de la page sont chargées en une requête (Prefetch) et
+le total des pages est mis en cache par client : la clé inclut une version
+renouvelée à chaque commande créée ou modifiée (customer.signals).
+"""
+
+import datetime
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+
+from .models import Commande, ProduitPanier
+
+
+COUNT_TIMEOUT = 60 * 60
+FORMATS_DATE = ('%d/%m/%Y', '%Y-%m-%d')
+
+
+def version_key(customer_id):
+    return 'customer:%s:commandes:version' % customer_id
+
+
+def version(customer_id):
+    current = cache.get(version_key(customer_id))
+    if current is None:
+        current = time.time()
+        cache.add(version_key(customer_id), current, None)
+        current = cache.get(version_key(customer_id), current)
+    return current
+
+
+def invalider(customer_id):
+    cache.set(version_key(customer_id), time.time(), None)
+
+
+def date_recherche(query):
+    """Date saisie dans la recherche (JJ/MM/AAAA ou AAAA-MM-JJ), None sinon."""
+    for format_ in FORMATS_DATE:
+        try:
+            return datetime.datetime.strptime(query, format_).date()
+        except ValueError:
+            pass
+    return None
+
+
+def filtrer(customer, query=None, date_min=None, date_max=None):
+    """Commandes du client, les plus récentes d'abord, filtrées par la recherche et la période."""
+    commandes = Commande.objects.filter(customer=customer)
+
+    query = (query or '').strip()
+    if query:
+        jour = date_recherche(query)
+        if jour:
+            commandes = commandes.filter(date_add__gte=jour, date_add__lt=jour + datetime.timedelta(days=1))
+        else:
+            produits = ProduitPanier.objects.filter(commande=OuterRef('pk'), produit__nom__icontains=query)
+            commandes = commandes.filter(Q(transaction_id__startswith=query) | Exists(produits))
+
+    date_min = parse_date(date_min or '')
+    if date_min:
+        commandes = commandes.filter(date_add__gte=date_min)
+    date_max = parse_date(date_max or '')
+    if date_max:
+        commandes = commandes.filter(date_add__lt=date_max + datetime.timedelta(days=1))
+
+    return commandes.order_by('-date_add', '-pk').prefetch_related(
+        Prefetch('produit_commande', queryset=ProduitPanier.objects.select_related('produit').order_by('pk')),
+    )
+
+
+class HistoriquePaginator(Paginator):
+    """Paginator dont le nombre total de commandes est mis en cache par client et par critères."""
+
+    def __init__(self, object_list, per_page, customer_id, criteres, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.customer_id = customer_id
+        self.criteres = criteres
+
+    @cached_property
+    def count(self):
+        empreinte = hashlib.md5(repr(sorted(self.criteres.items())).encode()).hexdigest()
+        key = 'customer:%s:commandes:count:%s:%s' % (self.customer_id, version(self.customer_id), empreinte)
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+
+def paginer(customer, params, per_page=10):
+    criteres = {
+        'q': (params.get('q') or '').strip(),
+        'date_min': params.get('date_min') or '',
+        'date_max': params.get('date_max') or '',
+    }
+    commandes = filtrer(customer, criteres['q'], criteres['date_min'], criteres['date_max'])
+    return HistoriquePaginator(commandes, per_page, customer.pk, criteres).get_page(params.get('page'))
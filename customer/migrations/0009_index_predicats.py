@@ -0,0 +1,25 @@
+# Generated by Django 4.2.9 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0008_customer_ville'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='codepromotionnel',
+            index=models.Index(fields=['code_promo'], name='customer_co_code_pr_1d2d4b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['customer', 'date_add'], name='customer_co_custome_e5c139_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produitpanier',
+            index=models.Index(fields=['panier', 'produit'], name='customer_pr_panier__0fc3c5_idx'),
+        ),
+    ]
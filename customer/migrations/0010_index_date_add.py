@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0009_index_predicats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['date_add'], name='customer_co_date_ad_3490b6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produitpanier',
+            index=models.Index(fields=['date_add'], name='customer_pr_date_ad_508b9c_idx'),
+        ),
+    ]
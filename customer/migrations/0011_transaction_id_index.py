@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0010_index_date_add'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commande',
+            name='transaction_id',
+            field=models.CharField(db_index=True, max_length=100, null=True),
+        ),
+    ]
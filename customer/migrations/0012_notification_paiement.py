@@ -0,0 +1,51 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+def paiements_existants(apps, schema_editor):
+    # Les commandes déjà validées avant les notifications sont considérées payées
+    Commande = apps.get_model('customer', 'Commande')
+    Commande.objects.filter(status=True).update(statut_paiement='accepte')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0011_transaction_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPaiement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.CharField(db_index=True, max_length=100)),
+                ('donnees', models.JSONField(default=dict)),
+                ('statut', models.CharField(choices=[('recue', 'Reçue'), ('en_cours', 'En cours'), ('traitee', 'Traitée'), ('erreur', 'Erreur')], default='recue', max_length=20)),
+                ('resultat', models.CharField(blank=True, max_length=50)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_add', models.DateTimeField(auto_now_add=True)),
+                ('date_update', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Notification de paiement',
+                'verbose_name_plural': 'Notifications de paiement',
+            },
+        ),
+        migrations.AddField(
+            model_name='commande',
+            name='statut_paiement',
+            field=models.CharField(choices=[('en_attente', 'En attente'), ('accepte', 'Accepté'), ('refuse', 'Refusé')], default='en_attente', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['statut_paiement', 'date_add'], name='customer_co_statut__b18c56_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationpaiement',
+            index=models.Index(fields=['statut', 'date_update'], name='customer_no_statut_4d5c01_idx'),
+        ),
+        migrations.RunPython(paiements_existants, migrations.RunPython.noop),
+    ]
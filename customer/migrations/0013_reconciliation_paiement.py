@@ -0,0 +1,22 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0012_notification_paiement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='date_verification_paiement',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['statut_paiement', 'date_verification_paiement'], name='customer_co_statut__93a7dc_idx'),
+        ),
+    ]
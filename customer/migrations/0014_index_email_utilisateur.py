@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+# auth.User appartient à django.contrib.auth : l'index est posé par le schema editor
+# (syntaxe propre à chaque SGBD) plutôt que déclaré dans une Meta
+INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+
+
+def creer_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), INDEX)
+
+
+def supprimer_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('customer', '0013_reconciliation_paiement'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import NotSupportedError, migrations, models
+from django.db.models import Count, F, Value
+from django.db.models.functions import Lower, NullIf
+
+
+ANCIEN_INDEX = models.Index(Lower('email'), name='auth_user_email_lower_idx')
+# Index unique sur NULLIF(LOWER(email), '') : les comptes sans email (NULL) restent autorisés
+# en nombre, sans condition partielle (que MySQL ne sait pas poser). Il sert aussi la
+# recherche par email de EmailOrUsernameBackend.
+CONTRAINTE = models.UniqueConstraint(NullIf(Lower('email'), Value('')), name='auth_user_email_lower_uniq')
+
+
+def retirer_doublons(apps, schema_editor):
+    """
+    Pour chaque email porté par plusieurs comptes, le compte connecté le plus
+    récemment (puis le plus ancien) le garde ; il est retiré des autres et noté
+    dans EmailRetire, consultable dans l'admin.
+    """
+    User = apps.get_model('auth', 'User')
+    EmailRetire = apps.get_model('customer', 'EmailRetire')
+    doublons = (
+        User.objects.exclude(email='').values(email_lower=Lower('email'))
+        .annotate(comptes=Count('id')).filter(comptes__gt=1).values_list('email_lower', flat=True)
+    )
+    for email in list(doublons):
+        comptes = list(
+            User.objects.annotate(email_lower=Lower('email')).filter(email_lower=email)
+            .order_by(F('last_login').desc(nulls_last=True), 'pk').values_list('pk', 'email')
+        )
+        conserve = comptes[0][0]
+        EmailRetire.objects.bulk_create([
+            EmailRetire(user_id=pk, email=adresse, conserve_par_id=conserve) for pk, adresse in comptes[1:]
+        ])
+        User.objects.filter(pk__in=[pk for pk, adresse in comptes[1:]]).update(email='')
+
+
+def creer_contrainte(apps, schema_editor):
+    if not schema_editor.connection.features.supports_expression_indexes:
+        # Sans index fonctionnel (MariaDB, MySQL < 8.0.13), Django ignorerait la contrainte en silence
+        raise NotSupportedError(
+            "L'unicité des emails demande des index fonctionnels (PostgreSQL, SQLite, MySQL 8.0.13+)")
+    User = apps.get_model('auth', 'User')
+    schema_editor.remove_index(User, ANCIEN_INDEX)
+    schema_editor.add_constraint(User, CONTRAINTE)
+
+
+def supprimer_contrainte(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    schema_editor.remove_constraint(User, CONTRAINTE)
+    schema_editor.add_index(User, ANCIEN_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('customer', '0014_index_email_utilisateur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailRetire',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('date_add', models.DateTimeField(auto_now_add=True)),
+                ('conserve_par', models.ForeignKey(null=True, on_delete=models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=models.deletion.CASCADE, related_name='emails_retires', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Email retiré (doublon)',
+                'verbose_name_plural': 'Emails retirés (doublons)',
+            },
+        ),
+        migrations.RunPython(retirer_doublons, migrations.RunPython.noop),
+        migrations.RunPython(creer_contrainte, supprimer_contrainte),
+    ]
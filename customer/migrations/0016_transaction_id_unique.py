@@ -0,0 +1,39 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedoublonner(apps, schema_editor):
+    """
+    Identifiants vides remis à NULL ; pour un identifiant porté par plusieurs
+    commandes, seule la plus ancienne le garde. Les autres reçoivent
+    « <identifiant>-<pk> », qu'aucune transaction CinetPay ne porte : elles
+    restent en attente au lieu d'être validées par le paiement d'une autre.
+    """
+    Commande = apps.get_model('customer', 'Commande')
+    Commande.objects.filter(transaction_id='').update(transaction_id=None)
+    doublons = (
+        Commande.objects.exclude(transaction_id=None).values('transaction_id')
+        .annotate(nombre=Count('pk')).filter(nombre__gt=1).values_list('transaction_id', flat=True)
+    )
+    for transaction_id in list(doublons):
+        pks = Commande.objects.filter(transaction_id=transaction_id).order_by('pk').values_list('pk', flat=True)
+        for pk in list(pks)[1:]:
+            Commande.objects.filter(pk=pk).update(transaction_id=('%s-%s' % (transaction_id, pk))[-100:])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0015_email_utilisateur_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedoublonner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='commande',
+            name='transaction_id',
+            field=models.CharField(max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -1,7 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.sessions.models import Session
-from cinetpay_sdk.s_d_k import Cinetpay
 from shop import models as Produit
 from django.utils.timezone import now
 from datetime import timedelta
@@ -59,6 +58,9 @@ class CodePromotionnel(models.Model):
 
         verbose_name = 'Code promotionnel'
         verbose_name_plural = 'Codes Promotionnels'
+        indexes = [
+            models.Index(fields=['code_promo']),
+        ]
 
     def __str__(self):
         """Unicode representation of CodePromotionnel."""
@@ -111,19 +113,32 @@ class Panier(models.Model):
 
 class Commande(models.Model):
     """Model definition for UserRessource."""
+    PAIEMENT_EN_ATTENTE = 'en_attente'
+    PAIEMENT_ACCEPTE = 'accepte'
+    PAIEMENT_REFUSE = 'refuse'
+    STATUTS_PAIEMENT = (
+        (PAIEMENT_EN_ATTENTE, 'En attente'),
+        (PAIEMENT_ACCEPTE, 'Accepté'),
+        (PAIEMENT_REFUSE, 'Refusé'),
+    )
 
     # TODO: Define fields here
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="user_commande", null=True)
     id_paiment = models.CharField( max_length=50, null=True)
     payment_token = models.CharField(max_length=250, null=True)
     payment_url = models.TextField(null=True)
-    transaction_id = models.TextField(null=True)
+    # Généré par le serveur (customer.paiements.nouvel_identifiant) : une transaction CinetPay, une commande
+    transaction_id = models.CharField(max_length=100, null=True, unique=True)
     api_response_id = models.CharField(max_length=50, null=True)
     crypto = models.CharField(max_length=50, null=True)
     prix_total = models.FloatField()
     date_add = models.DateTimeField(auto_now_add=True)
     date_update = models.DateTimeField(auto_now=True)
     status = models.BooleanField(default=True)
+    # Confirmé par la notification CinetPay (customer.paiements), pas par le navigateur
+    statut_paiement = models.CharField(max_length=20, choices=STATUTS_PAIEMENT, default=PAIEMENT_EN_ATTENTE)
+    # Dernière interrogation de l'API CinetPay par la réconciliation
+    date_verification_paiement = models.DateTimeField(null=True, blank=True)
     recu_paiement = models.FileField(upload_to="fichiers/paiements", null=True)
 
     class Meta:
@@ -131,6 +146,12 @@ class Commande(models.Model):
 
         verbose_name = 'Commande'
         verbose_name_plural = 'Commandes'
+        indexes = [
+            models.Index(fields=['customer', 'date_add']),
+            models.Index(fields=['date_add']),
+            models.Index(fields=['statut_paiement', 'date_add']),
+            models.Index(fields=['statut_paiement', 'date_verification_paiement']),
+        ]
 
     def __str__(self):
         """Unicode representation of UserRessource."""
@@ -159,6 +180,10 @@ class ProduitPanier(models.Model):
 
         verbose_name = 'Produit Panier/Commande'
         verbose_name_plural = 'Produits Panier/Commande'
+        indexes = [
+            models.Index(fields=['panier', 'produit']),
+            models.Index(fields=['date_add']),
+        ]
 
     @property
     def total(self):
@@ -169,4 +194,55 @@ class ProduitPanier(models.Model):
         
 
 
+class NotificationPaiement(models.Model):
+    """
+    Notification de paiement CinetPay, enregistrée telle quelle à réception
+    (signature vérifiée) puis traitée hors requête par customer.paiements.
+    """
+    RECUE = 'recue'
+    EN_COURS = 'en_cours'
+    TRAITEE = 'traitee'
+    ERREUR = 'erreur'
+    STATUTS = (
+        (RECUE, 'Reçue'),
+        (EN_COURS, 'En cours'),
+        (TRAITEE, 'Traitée'),
+        (ERREUR, 'Erreur'),
+    )
+
+    transaction_id = models.CharField(max_length=100, db_index=True)
+    donnees = models.JSONField(default=dict)
+    statut = models.CharField(max_length=20, choices=STATUTS, default=RECUE)
+    resultat = models.CharField(max_length=50, blank=True)
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    date_add = models.DateTimeField(auto_now_add=True)
+    date_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Notification de paiement'
+        verbose_name_plural = 'Notifications de paiement'
+        indexes = [
+            models.Index(fields=['statut', 'date_update']),
+        ]
+
+    def __str__(self):
+        return "Notification %s (%s)" % (self.transaction_id, self.get_statut_display())
 
+
+class EmailRetire(models.Model):
+    """
+    Email retiré d'un compte parce qu'un autre compte le portait déjà
+    (migration 0015, avant l'index unique) : à vérifier avec le client.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='emails_retires')
+    email = models.EmailField(max_length=254)
+    conserve_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    date_add = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Email retiré (doublon)'
+        verbose_name_plural = 'Emails retirés (doublons)'
+
+    def __str__(self):
+        return self.email
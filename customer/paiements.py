@@ -0,0 +1,237 @@
+"""
+Notifications de paiement CinetPay.
+
+La vue de notification (shop.views.notification_paiement) vérifie le jeton
+HMAC x-token, enregistre la notification en un INSERT et répond aussitôt ;
+le traitement tourne ensuite dans un pool de threads borné : réservation
+de la notification, vérification du statut auprès de l'API /payment/check,
+puis mise à jour conditionnelle de la commande (seulement si elle est encore
+en attente). Une notification répétée ou rejouée ne change donc rien.
+PaiementNotificationCronJob reprend les notifications restées en suspens.
+
+reconcilier() interroge l'API pour les commandes restées en attente (aucune
+notification reçue) : au plus PAIEMENT_RECONCILIATION_MAX par cycle, les
+moins récemment vérifiées d'abord, par lots interrogés en parallèle puis
+appliqués en une requête UPDATE par statut.
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from base.metrics import ORDERS
+from .models import Commande, NotificationPaiement
+
+
+logger = logging.getLogger(__name__)
+
+# Ordre de concaténation des champs signés par CinetPay (en-tête x-token)
+CHAMPS_SIGNES = (
+    'cpm_site_id', 'cpm_trans_id', 'cpm_trans_date', 'cpm_amount', 'cpm_currency', 'signature',
+    'payment_method', 'cel_phone_num', 'cpm_phone_prefixe', 'cpm_language', 'cpm_version',
+    'cpm_payment_config', 'cpm_page_action', 'cpm_custom', 'cpm_designation', 'cpm_error_message',
+)
+ACCEPTE = 'ACCEPTED'
+REFUSE = 'REFUSED'
+MAX_TENTATIVES = 5
+LOT_RECONCILIATION = 100
+
+_executor = None
+
+
+class CinetPayErreur(Exception):
+    pass
+
+
+def nouvel_identifiant():
+    """Identifiant de transaction CinetPay d'une nouvelle commande, imprévisible (jamais choisi par le client)."""
+    return 'CD' + secrets.token_hex(12).upper()
+
+
+def jeton(donnees, secret=None):
+    """Jeton HMAC-SHA256 attendu dans l'en-tête x-token pour `donnees`."""
+    secret = settings.CINETPAY_SECRET_KEY if secret is None else secret
+    message = ''.join(str(donnees.get(champ, '')) for champ in CHAMPS_SIGNES)
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def jeton_valide(donnees, recu):
+    if not settings.CINETPAY_SECRET_KEY or not recu:
+        return False
+    return hmac.compare_digest(jeton(donnees), recu)
+
+
+def verifier_transaction(transaction_id):
+    """Données de la transaction selon l'API CinetPay (statut, montant…) ; CinetPayErreur si indisponible."""
+    try:
+        reponse = requests.post(settings.CINETPAY_CHECK_URL, json={
+            'apikey': settings.CINETPAY_API_KEY,
+            'site_id': settings.CINETPAY_SITE_ID,
+            'transaction_id': transaction_id,
+        }, timeout=settings.CINETPAY_TIMEOUT)
+        contenu = reponse.json()
+    except (requests.RequestException, ValueError) as e:
+        raise CinetPayErreur(str(e) or e.__class__.__name__)
+    if not isinstance(contenu, dict) or not isinstance(contenu.get('data'), dict):
+        raise CinetPayErreur("Réponse inattendue : %s" % str(contenu)[:200])
+    return contenu['data']
+
+
+def decision(donnees, prix_total):
+    """Statut de paiement de la commande d'après la réponse CinetPay, None s'il reste en attente."""
+    statut = donnees.get('status')
+    if statut == ACCEPTE:
+        try:
+            montant = float(donnees.get('amount'))
+        except (TypeError, ValueError):
+            return None
+        # Un paiement inférieur au total de la commande ne la valide pas
+        return Commande.PAIEMENT_ACCEPTE if montant >= prix_total else None
+    if statut == REFUSE:
+        return Commande.PAIEMENT_REFUSE
+    # Paiement pas encore abouti (WAITING_CUSTOMER_PAYMENT…)
+    return None
+
+
+def enregistrer(decisions):
+    """
+    Applique {pk: statut de paiement} en une requête UPDATE par statut, sur les
+    seules commandes encore en attente. Retourne (acceptées, refusées).
+    """
+    maintenant = timezone.now()
+    en_attente = Commande.objects.filter(statut_paiement=Commande.PAIEMENT_EN_ATTENTE)
+    acceptees = [pk for pk, statut in decisions.items() if statut == Commande.PAIEMENT_ACCEPTE]
+    refusees = [pk for pk, statut in decisions.items() if statut == Commande.PAIEMENT_REFUSE]
+    nombre_acceptees = en_attente.filter(pk__in=acceptees).update(
+        statut_paiement=Commande.PAIEMENT_ACCEPTE, status=True, date_update=maintenant) if acceptees else 0
+    nombre_refusees = en_attente.filter(pk__in=refusees).update(
+        statut_paiement=Commande.PAIEMENT_REFUSE, status=False, date_update=maintenant) if refusees else 0
+    if nombre_acceptees:
+        ORDERS.labels('paid').inc(nombre_acceptees)
+    if nombre_refusees:
+        ORDERS.labels('refused').inc(nombre_refusees)
+    return nombre_acceptees, nombre_refusees
+
+
+def appliquer(transaction_id, donnees):
+    """Passe la commande de `transaction_id` (unique), si elle est en attente, au statut confirmé par CinetPay."""
+    commande = Commande.objects.filter(
+        transaction_id=transaction_id, statut_paiement=Commande.PAIEMENT_EN_ATTENTE,
+    ).values_list('pk', 'prix_total').first()
+    if commande is None:
+        return 0
+    pk, prix_total = commande
+    return sum(enregistrer({pk: decision(donnees, prix_total)}))
+
+
+def reserver(pk):
+    """Réserve une notification reçue, ou en cours sans progrès depuis PAIEMENT_NOTIFICATION_DELAI_REPRISE."""
+    delai = timedelta(minutes=settings.PAIEMENT_NOTIFICATION_DELAI_REPRISE)
+    return NotificationPaiement.objects.filter(pk=pk).filter(
+        Q(statut=NotificationPaiement.RECUE)
+        | Q(statut=NotificationPaiement.EN_COURS, date_update__lt=timezone.now() - delai)
+    ).update(statut=NotificationPaiement.EN_COURS, tentatives=F('tentatives') + 1, date_update=timezone.now()) == 1
+
+
+def traiter(pk):
+    if not reserver(pk):
+        return
+    notification = NotificationPaiement.objects.get(pk=pk)
+    try:
+        donnees = verifier_transaction(notification.transaction_id)
+    except CinetPayErreur as e:
+        logger.warning("Vérification CinetPay impossible pour %s : %s", notification.transaction_id, e)
+        statut = NotificationPaiement.ERREUR if notification.tentatives >= MAX_TENTATIVES else NotificationPaiement.RECUE
+        NotificationPaiement.objects.filter(pk=pk).update(statut=statut, erreur=str(e), date_update=timezone.now())
+        return
+    with transaction.atomic():
+        appliquer(notification.transaction_id, donnees)
+        NotificationPaiement.objects.filter(pk=pk).update(
+            statut=NotificationPaiement.TRAITEE, resultat=str(donnees.get('status', ''))[:50], erreur='',
+            date_update=timezone.now())
+
+
+def traiter_en_arriere_plan(pk):
+    try:
+        traiter(pk)
+    except Exception:
+        logger.exception("Échec du traitement de la notification de paiement %s", pk)
+    finally:
+        connections.close_all()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PAIEMENT_NOTIFICATION_THREADS, thread_name_prefix='notification-paiement')
+    return _executor
+
+
+def lancer(notification):
+    """Planifie le traitement après validation de la transaction courante, sans attendre son résultat."""
+    if settings.PAIEMENT_NOTIFICATION_ARRIERE_PLAN:
+        cible = lambda: executor().submit(traiter_en_arriere_plan, notification.pk)
+    else:
+        cible = lambda: traiter(notification.pk)
+    transaction.on_commit(cible)
+
+
+# Réconciliation
+
+def verifier_sans_erreur(transaction_id):
+    try:
+        return verifier_transaction(transaction_id)
+    except CinetPayErreur as e:
+        logger.warning("Vérification CinetPay impossible pour %s : %s", transaction_id, e)
+        return None
+
+
+def commandes_a_verifier(limite):
+    """Commandes en attente assez anciennes pour qu'une notification ait dû arriver, dans la fenêtre de réconciliation."""
+    maintenant = timezone.now()
+    return Commande.objects.filter(
+        statut_paiement=Commande.PAIEMENT_EN_ATTENTE,
+        transaction_id__isnull=False,
+        date_add__lt=maintenant - timedelta(minutes=settings.PAIEMENT_RECONCILIATION_AGE),
+        date_add__gte=maintenant - timedelta(days=settings.PAIEMENT_RECONCILIATION_FENETRE),
+    ).order_by(F('date_verification_paiement').asc(nulls_first=True), 'pk').values_list(
+        'pk', 'transaction_id', 'prix_total')[:limite]
+
+
+def reconcilier(limite=None):
+    """Vérifie jusqu'à `limite` commandes en attente. Retourne {'verifiees', 'acceptees', 'refusees', 'erreurs'}."""
+    limite = settings.PAIEMENT_RECONCILIATION_MAX if limite is None else limite
+    bilan = dict.fromkeys(('verifiees', 'acceptees', 'refusees', 'erreurs'), 0)
+    commandes = list(commandes_a_verifier(limite))
+    if not commandes:
+        return bilan
+
+    with ThreadPoolExecutor(max_workers=settings.PAIEMENT_RECONCILIATION_THREADS) as pool:
+        for debut in range(0, len(commandes), LOT_RECONCILIATION):
+            lot = commandes[debut:debut + LOT_RECONCILIATION]
+            # Chaque appel est borné par CINETPAY_TIMEOUT ; les threads ne touchent pas à la base
+            reponses = pool.map(verifier_sans_erreur, [transaction_id for pk, transaction_id, prix_total in lot])
+            decisions = {}
+            for (pk, transaction_id, prix_total), donnees in zip(lot, reponses):
+                if donnees is None:
+                    bilan['erreurs'] += 1
+                    continue
+                decisions[pk] = decision(donnees, prix_total)
+            with transaction.atomic():
+                acceptees, refusees = enregistrer(decisions)
+                Commande.objects.filter(pk__in=[pk for pk, transaction_id, prix_total in lot]).update(
+                    date_verification_paiement=timezone.now())
+            bilan['verifiees'] += len(decisions)
+            bilan['acceptees'] += acceptees
+            bilan['refusees'] += refusees
+    return bilan
@@ -0,0 +1,90 @@
+"""
+Redimensionnement des photos de profil.
+
+L'inscription enregistre la photo telle qu'envoyée ; la réduction à
+CUSTOMER_PHOTO_MAX pixels de côté (JPEG) se fait après validation de la
+transaction, dans un pool de threads borné : le temps d'inscription ne
+dépend pas de la taille de l'image.
+"""
+
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from base.routers import PRIMARY
+
+from .models import Customer
+
+
+logger = logging.getLogger(__name__)
+
+QUALITE_JPEG = 85
+
+_executor = None
+
+
+def reduire(contenu, cote_max):
+    """Octets JPEG de l'image réduite, ou None si elle est déjà assez petite."""
+    with Image.open(contenu) as image:
+        if max(image.size) <= cote_max and image.format == 'JPEG':
+            return None
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((cote_max, cote_max))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        sortie = io.BytesIO()
+        image.save(sortie, 'JPEG', quality=QUALITE_JPEG, optimize=True)
+        return sortie.getvalue()
+
+
+def traiter(pk):
+    # Lancé juste après la validation : un réplica n'a peut-être pas encore la ligne
+    clients = Customer.objects.using(PRIMARY)
+    customer = clients.only('photo').get(pk=pk)
+    ancienne = customer.photo.name
+    if not ancienne:
+        return
+    stockage = customer.photo.storage
+    with stockage.open(ancienne) as contenu:
+        octets = reduire(contenu, settings.CUSTOMER_PHOTO_MAX)
+    if octets is None:
+        return
+    nom = stockage.save(posixpath.splitext(ancienne)[0] + '.jpg', ContentFile(octets))
+    # La photo a pu être changée entre-temps : seule celle de l'inscription est remplacée
+    if Customer.objects.filter(pk=pk, photo=ancienne).update(photo=nom) and nom != ancienne:
+        # Les noms par empreinte peuvent être partagés (ContentHashStorage)
+        if not clients.filter(photo=ancienne).exists():
+            stockage.delete(ancienne)
+
+
+def traiter_en_arriere_plan(pk):
+    try:
+        traiter(pk)
+    except Exception:
+        logger.exception("Échec du redimensionnement de la photo du client %s", pk)
+    finally:
+        connections.close_all()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.CUSTOMER_PHOTO_THREADS, thread_name_prefix='photo-profil')
+    return _executor
+
+
+def lancer(customer):
+    """Planifie le redimensionnement après validation de la transaction courante."""
+    if not customer.photo:
+        return
+    if settings.CUSTOMER_PHOTO_ARRIERE_PLAN:
+        cible = lambda: executor().submit(traiter_en_arriere_plan, customer.pk)
+    else:
+        cible = lambda: traiter(customer.pk)
+    transaction.on_commit(cible)
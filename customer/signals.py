@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+
+from . import coupons, historique, models
+
+
+def invalider_historique(sender, instance, **kwargs):
+    historique.invalider(instance.customer_id)
+
+
+def invalider_historique_ligne(sender, instance, **kwargs):
+    # Les lignes du panier sont rattachées à la commande après sa création
+    if instance.commande_id:
+        historique.invalider(instance.commande.customer_id)
+
+
+post_save.connect(invalider_historique, sender=models.Commande, dispatch_uid='historique_commande_save')
+post_delete.connect(invalider_historique, sender=models.Commande, dispatch_uid='historique_commande_delete')
+post_save.connect(invalider_historique_ligne, sender=models.ProduitPanier, dispatch_uid='historique_ligne_save')
+
+
+def invalider_coupons(sender, **kwargs):
+    coupons.invalider()
+
+
+post_save.connect(invalider_coupons, sender=models.CodePromotionnel, dispatch_uid='coupons_save')
+post_delete.connect(invalider_coupons, sender=models.CodePromotionnel, dispatch_uid='coupons_delete')
@@ -0,0 +1,54 @@
+"""
+Limitation des tentatives de connexion.
+
+Les échecs sont comptés dans le cache par compte (identifiant saisi, haché)
+et par adresse IP (base.adresses, proxys de confiance compris) sur une
+fenêtre de LOGIN_THROTTLE_WINDOW secondes. Au-delà des seuils, la connexion est refusée avant toute requête en base et tout
+calcul PBKDF2 : une rafale de credential stuffing ne coûte qu'une lecture de
+cache par tentative.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from base.adresses import ip_client
+
+
+def cle_compte(identifiant):
+    empreinte = hashlib.sha256((identifiant or '').strip().lower().encode()).hexdigest()[:32]
+    return 'connexion:echecs:compte:%s' % empreinte
+
+
+def cle_ip(request):
+    ip = ip_client(request) if request is not None else None
+    return 'connexion:echecs:ip:%s' % ip if ip else None
+
+
+def cles(request, identifiant):
+    return [cle for cle in (cle_compte(identifiant), cle_ip(request)) if cle]
+
+
+def bloque(request, identifiant):
+    """Vrai si le compte ou l'adresse IP a dépassé son seuil d'échecs."""
+    compteurs = cache.get_many(cles(request, identifiant))
+    if compteurs.get(cle_compte(identifiant), 0) >= settings.LOGIN_THROTTLE_ACCOUNT:
+        return True
+    return compteurs.get(cle_ip(request), 0) >= settings.LOGIN_THROTTLE_IP
+
+
+def echec(request, identifiant):
+    for cle in cles(request, identifiant):
+        # add() ne fait rien si le compteur existe : la fenêtre court depuis le premier échec
+        cache.add(cle, 0, settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(cle)
+        except ValueError:
+            # Expiré entre add() et incr()
+            cache.set(cle, 1, settings.LOGIN_THROTTLE_WINDOW)
+
+
+def reinitialiser(identifiant):
+    """Une connexion réussie efface les échecs du compte (pas ceux de l'adresse IP)."""
+    cache.delete(cle_compte(identifiant))
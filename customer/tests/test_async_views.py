@@ -0,0 +1,90 @@
+"""Tests des versions asynchrones des points d'entrée JSON du panier"""
+
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, RequestFactory
+
+from customer import views
+from customer.models import Panier, ProduitPanier
+
+
+pytestmark = pytest.mark.django_db
+
+
+def post_json(factory, payload):
+    return factory.post('/', data=json.dumps(payload), content_type='application/json')
+
+
+class TestAsyncCartViews:
+
+    @pytest.mark.integration
+    def test_add_to_cart_meme_reponse_que_la_vue_synchrone(self, panier, produit_sans_promo):
+        """
+        Arrange: Un panier vide et un produit
+        Act: Ajouter le produit via la vue synchrone puis via la vue asynchrone
+        Assert: Mêmes réponses JSON, une seule ligne de panier mise à jour
+        """
+        payload = {'panier': panier.pk, 'produit': produit_sans_promo.pk, 'quantite': 2}
+
+        sync_response = views.add_to_cart(post_json(RequestFactory(), payload))
+        payload['quantite'] = 5
+        async_response = async_to_sync(views.add_to_cart_async)(post_json(AsyncRequestFactory(), payload))
+
+        assert json.loads(async_response.content) == json.loads(sync_response.content)
+        ligne = ProduitPanier.objects.get(panier=panier, produit=produit_sans_promo)
+        assert ligne.quantite == 5
+
+    @pytest.mark.integration
+    def test_update_et_delete(self, panier, produit_panier):
+        payload = {'panier': panier.pk, 'produit': produit_panier.produit_id, 'quantite': 7}
+        response = async_to_sync(views.update_cart_async)(post_json(AsyncRequestFactory(), payload))
+
+        assert json.loads(response.content)['success'] is True
+        produit_panier.refresh_from_db()
+        assert produit_panier.quantite == 7
+
+        payload = {'panier': panier.pk, 'produit_panier': produit_panier.pk}
+        response = async_to_sync(views.delete_from_cart_async)(post_json(AsyncRequestFactory(), payload))
+
+        assert json.loads(response.content)['success'] is True
+        assert not ProduitPanier.objects.filter(pk=produit_panier.pk).exists()
+
+    @pytest.mark.integration
+    def test_coupon_invalide(self, panier):
+        payload = {'panier': panier.pk, 'coupon': 'INCONNU'}
+        response = async_to_sync(views.add_coupon_async)(post_json(AsyncRequestFactory(), payload))
+
+        assert json.loads(response.content) == {'message': "Code coupon invalide", 'success': False}
+
+    @pytest.mark.integration
+    def test_coupon_valide(self, panier, code_promotionnel):
+        payload = {'panier': panier.pk, 'coupon': code_promotionnel.code_promo}
+        response = async_to_sync(views.add_coupon_async)(post_json(AsyncRequestFactory(), payload))
+
+        assert json.loads(response.content)['success'] is True
+        assert Panier.objects.get(pk=panier.pk).coupon == code_promotionnel
+
+    @pytest.mark.integration
+    def test_code_inconnu_en_cache(self, panier, django_assert_num_queries):
+        """Un même code inconnu essayé en rafale ne touche la base qu'une fois"""
+        payload = {'panier': panier.pk, 'coupon': 'HASARD'}
+        views.add_coupon(post_json(RequestFactory(), payload))
+
+        with django_assert_num_queries(0):
+            response = views.add_coupon(post_json(RequestFactory(), payload))
+
+        assert json.loads(response.content)['success'] is False
+
+    @pytest.mark.integration
+    def test_code_modifie(self, panier, code_promotionnel):
+        """Un code renommé n'est plus accepté sous son ancien nom"""
+        ancien = code_promotionnel.code_promo
+        views.add_coupon(post_json(RequestFactory(), {'panier': panier.pk, 'coupon': ancien}))
+
+        code_promotionnel.code_promo = 'NOUVEAU'
+        code_promotionnel.save()
+        response = views.add_coupon(post_json(RequestFactory(), {'panier': panier.pk, 'coupon': ancien}))
+
+        assert json.loads(response.content)['success'] is False
@@ -0,0 +1,134 @@
+"""Tests de la connexion par nom d'utilisateur ou email et de la limitation des tentatives"""
+
+import json
+
+import pytest
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def compteurs_vides():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def requete(ip='198.51.100.1'):
+    return RequestFactory().post('/customer/post', REMOTE_ADDR=ip)
+
+
+def connexion(client, username, password, ip='198.51.100.1'):
+    return client.post(reverse('post'), json.dumps({'username': username, 'password': password}),
+                       content_type='application/json', REMOTE_ADDR=ip).json()
+
+
+class TestEmailOrUsernameBackend:
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('identifiant', ['testuser', 'test@example.com', 'TEST@Example.COM'])
+    def test_une_requete(self, user, user_data, identifiant, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            resultat = authenticate(requete(), username=identifiant, password=user_data['password'])
+
+        assert resultat == user
+
+    @pytest.mark.unit
+    def test_email_unique_sans_casse(self, user, user_data):
+        """Un email ne peut plus être porté par deux comptes, quelle que soit sa casse"""
+        with pytest.raises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='homonyme', email=user_data['email'].upper(), password='x')
+
+        User.objects.create_user(username='sans-email-1', email='')
+        User.objects.create_user(username='sans-email-2', email='')
+
+    @pytest.mark.unit
+    def test_compte_inactif(self, user, user_data):
+        User.objects.filter(pk=user.pk).update(is_active=False)
+
+        assert authenticate(requete(), username=user_data['username'], password=user_data['password']) is None
+
+
+class TestLimitation:
+
+    @pytest.mark.unit
+    def test_compte_bloque_sans_requete_ni_hachage(self, user, user_data, settings, django_assert_num_queries):
+        """
+        Arrange: LOGIN_THROTTLE_ACCOUNT mauvais mots de passe pour un compte
+        Act: Tenter à nouveau avec le bon mot de passe, depuis une autre adresse
+        Assert: Refus sans requête en base (donc sans vérification du mot de passe)
+        """
+        for n in range(settings.LOGIN_THROTTLE_ACCOUNT):
+            authenticate(requete('198.51.100.%d' % n), username=user_data['username'], password='faux')
+
+        with django_assert_num_queries(0):
+            resultat = authenticate(requete('203.0.113.9'), username=user_data['username'], password=user_data['password'])
+
+        assert resultat is None
+
+    @pytest.mark.unit
+    def test_ip_bloquee(self, user, user_data, settings):
+        settings.LOGIN_THROTTLE_IP = 3
+        for n in range(3):
+            authenticate(requete(), username='inconnu%d' % n, password='faux')
+
+        assert authenticate(requete(), username=user_data['username'], password=user_data['password']) is None
+        assert authenticate(requete('203.0.113.9'), username=user_data['username'], password=user_data['password']) == user
+
+    @pytest.mark.unit
+    def test_ip_derriere_un_proxy(self, user, user_data, settings):
+        """
+        Arrange: Un proxy de confiance, LOGIN_THROTTLE_IP échecs d'un client derrière lui
+        Act: Se connecter depuis un autre client passant par le même proxy
+        Assert: Seul le premier client est bloqué, même s'il falsifie la tête de X-Forwarded-For
+        """
+        settings.TRUSTED_PROXY_COUNT = 1
+        settings.LOGIN_THROTTLE_IP = 3
+
+        def derriere_proxy(xff):
+            return RequestFactory().post('/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR=xff)
+
+        for n in range(3):
+            authenticate(derriere_proxy('198.51.100.7'), username='inconnu%d' % n, password='faux')
+
+        assert authenticate(derriere_proxy('1.2.3.4, 198.51.100.7'),
+                            username=user_data['username'], password=user_data['password']) is None
+        assert authenticate(derriere_proxy('203.0.113.9'),
+                            username=user_data['username'], password=user_data['password']) == user
+
+    @pytest.mark.unit
+    def test_succes_efface_les_echecs_du_compte(self, user, user_data, settings):
+        for _ in range(settings.LOGIN_THROTTLE_ACCOUNT - 1):
+            authenticate(requete(), username=user_data['username'], password='faux')
+        assert authenticate(requete(), username=user_data['username'], password=user_data['password']) == user
+
+        for _ in range(settings.LOGIN_THROTTLE_ACCOUNT - 1):
+            authenticate(requete(), username=user_data['username'], password='faux')
+        assert authenticate(requete(), username=user_data['username'], password=user_data['password']) == user
+
+
+class TestVueConnexion:
+
+    @pytest.mark.integration
+    def test_connexion_par_email(self, client, user, user_data):
+        datas = connexion(client, user_data['email'].upper(), user_data['password'])
+
+        assert datas['success'] is True
+        assert client.session['_auth_user_id'] == str(user.pk)
+
+    @pytest.mark.integration
+    def test_message_trop_de_tentatives(self, client, user, user_data, settings):
+        for _ in range(settings.LOGIN_THROTTLE_ACCOUNT):
+            assert connexion(client, user_data['username'], 'faux')['message'] == 'Vos identifiants ne sont pas correcte'
+
+        datas = connexion(client, user_data['username'], user_data['password'])
+
+        assert datas['success'] is False
+        assert 'Trop de tentatives' in datas['message']
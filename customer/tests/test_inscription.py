@@ -0,0 +1,142 @@
+"""Tests de l'inscription (transaction unique, contraintes d'unicité) et du redimensionnement différé de la photo"""
+
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import router
+from django.urls import reverse
+from PIL import Image
+
+from customer import photos
+from customer.models import Customer
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def medias(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.CUSTOMER_PHOTO_ARRIERE_PLAN = False
+    settings.CUSTOMER_PHOTO_MAX = 64
+
+
+def image(taille=(300, 200), format_='PNG', nom='photo.png'):
+    sortie = io.BytesIO()
+    mode = 'RGBA' if format_ == 'PNG' else 'RGB'
+    Image.new(mode, taille, (200, 30, 30)).save(sortie, format_)
+    return SimpleUploadedFile(nom, sortie.getvalue(), content_type='image/png')
+
+
+def inscrire(client, city, **kwargs):
+    donnees = {
+        'nom': 'Kouassi', 'prenoms': 'Awa', 'username': 'awa', 'email': 'awa@example.com',
+        'phone': '+225 01 02 03 04', 'ville': city.pk, 'adresse': 'Cocody',
+        'password': 'Secret@2024', 'passwordconf': 'Secret@2024',
+    }
+    donnees.update(kwargs)
+    return client.post(reverse('inscription'), donnees).json()
+
+
+class TestInscription:
+
+    @pytest.mark.integration
+    def test_une_insertion_par_table(self, client, city, django_assert_max_num_queries):
+        """
+        Arrange: Un formulaire complet sans photo
+        Act: S'inscrire
+        Assert: Un INSERT utilisateur, un INSERT client, le visiteur est connecté
+        """
+        with django_assert_max_num_queries(15) as requetes:
+            datas = inscrire(client, city)
+
+        assert datas['success'] is True
+        inserts = [q['sql'] for q in requetes.captured_queries if q['sql'].startswith('INSERT')]
+        assert len([sql for sql in inserts if 'auth_user' in sql]) == 1
+        assert len([sql for sql in inserts if 'customer_customer' in sql]) == 1
+        assert not [q for q in requetes.captured_queries if q['sql'].startswith('UPDATE "auth_user"')
+                    and 'last_login' not in q['sql']]
+        user = User.objects.get(username='awa')
+        assert user.check_password('Secret@2024') and user.customer.contact_1 == '+225 01 02 03 04'
+        assert client.session['_auth_user_id'] == str(user.pk)
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('champs, message', [
+        ({'username': 'testuser'}, "nom d'utilisateur"),
+        ({'email': 'TEST@example.com'}, 'email'),
+    ])
+    def test_doublon(self, client, city, user, champs, message):
+        datas = inscrire(client, city, **champs)
+
+        assert datas['success'] is False
+        assert message in datas['message']
+        assert User.objects.count() == 1 and not Customer.objects.exists()
+
+    @pytest.mark.integration
+    def test_echec_client_annule_utilisateur(self, client, city, monkeypatch):
+        """Un échec à la création du client ne laisse pas d'utilisateur orphelin"""
+        def refuse(*args, **kwargs):
+            raise RuntimeError('panne')
+        monkeypatch.setattr(Customer.objects, 'create', refuse)
+
+        with pytest.raises(RuntimeError):
+            inscrire(client, city)
+
+        assert not User.objects.filter(username='awa').exists()
+
+
+class TestPhoto:
+
+    @pytest.mark.integration
+    def test_reduite_apres_validation(self, client, city, django_capture_on_commit_callbacks):
+        """
+        Arrange: Une photo PNG de 300x200
+        Act: S'inscrire avec cette photo
+        Assert: Enregistrée telle quelle pendant la requête, puis réduite en JPEG après validation
+        """
+        with django_capture_on_commit_callbacks() as callbacks:
+            datas = inscrire(client, city, file=image())
+
+        assert datas['success'] is True
+        customer = Customer.objects.get(user__username='awa')
+        assert customer.photo.name.endswith('.png')
+        originale = customer.photo.name
+
+        for callback in callbacks:
+            callback()
+
+        customer.refresh_from_db()
+        assert customer.photo.name.endswith('.jpg')
+        with Image.open(customer.photo.path) as photo:
+            assert (photo.format, photo.size) == ('JPEG', (64, 43))
+        assert not customer.photo.storage.exists(originale)
+
+    @pytest.mark.unit
+    def test_petite_photo_jpeg_intacte(self, customer):
+        customer.photo = image((40, 40), 'JPEG', 'petite.jpg')
+        customer.save()
+        nom = customer.photo.name
+
+        photos.traiter(customer.pk)
+
+        customer.refresh_from_db()
+        assert customer.photo.name == nom
+
+    @pytest.mark.unit
+    def test_lecture_sur_la_principale(self, customer, monkeypatch):
+        """
+        Arrange: Des lectures routées vers un réplica (pas encore à jour)
+        Act: Traiter la photo juste après l'inscription
+        Assert: Le client est lu sur la base principale et la photo réduite
+        """
+        customer.photo = image()
+        customer.save()
+        monkeypatch.setattr(router, 'db_for_read', lambda model, **hints: 'replica_1')
+
+        photos.traiter(customer.pk)
+
+        monkeypatch.undo()
+        customer.refresh_from_db()
+        assert customer.photo.name.endswith('.jpg')
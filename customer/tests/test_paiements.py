@@ -0,0 +1,233 @@
+"""Tests des notifications de paiement CinetPay (signature, enregistrement, traitement idempotent) et de la réconciliation"""
+
+import datetime
+import json
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from customer import paiements
+from customer.cinetpay_local import notification
+from customer.models import Commande, NotificationPaiement
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def commande_en_attente(customer):
+    return Commande.objects.create(
+        customer=customer, prix_total=10000, status=False, transaction_id='TX-42',
+        statut_paiement=Commande.PAIEMENT_EN_ATTENTE,
+    )
+
+
+def notifier(client, transaction_id='TX-42', montant=10000, **kwargs):
+    donnees, entetes = notification(transaction_id, montant)
+    return client.post(reverse('notification-paiement'), donnees, **{**entetes, **kwargs})
+
+
+class TestJeton:
+
+    @pytest.mark.unit
+    def test_jeton(self, settings):
+        settings.CINETPAY_SECRET_KEY = 'secret'
+        donnees, entetes = notification('TX-1', 100)
+
+        assert paiements.jeton_valide(donnees, entetes['HTTP_X_TOKEN'])
+        assert not paiements.jeton_valide({**donnees, 'cpm_amount': '1'}, entetes['HTTP_X_TOKEN'])
+        assert not paiements.jeton_valide(donnees, None)
+
+    @pytest.mark.unit
+    def test_sans_secret_configure(self, settings):
+        settings.CINETPAY_SECRET_KEY = ''
+
+        assert not paiements.jeton_valide({}, paiements.jeton({}, ''))
+
+
+class TestIdentifiantTransaction:
+
+    @pytest.mark.integration
+    def test_genere_par_le_serveur(self, client, user, user_data, produit_panier):
+        """
+        Arrange: Un panier et un identifiant de transaction déjà utilisé proposé par le navigateur
+        Act: Valider la commande
+        Assert: La commande reçoit un identifiant généré par le serveur, renvoyé au navigateur
+        """
+        client.login(username=user_data['username'], password=user_data['password'])
+
+        response = client.post(reverse('paiement_detail'), json.dumps({
+            'transaction_id': 'TX-42', 'notify_url': 'http://testserver/', 'return_url': 'http://testserver/',
+            'panier': produit_panier.panier_id,
+        }), content_type='application/json').json()
+
+        commande = Commande.objects.get()
+        assert response['success'] is True
+        assert commande.transaction_id == response['transaction_id'] != 'TX-42'
+        assert commande.statut_paiement == Commande.PAIEMENT_EN_ATTENTE
+
+    @pytest.mark.unit
+    def test_unique(self, commande_en_attente):
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Commande.objects.create(customer=commande_en_attente.customer, prix_total=10, transaction_id='TX-42')
+
+    @pytest.mark.unit
+    def test_identifiants_distincts(self):
+        assert len({paiements.nouvel_identifiant() for _ in range(1000)}) == 1000
+
+
+class TestNotification:
+
+    @pytest.mark.integration
+    def test_reponse_avant_traitement(self, client, cinetpay, commande_en_attente, django_capture_on_commit_callbacks,
+                                      django_assert_num_queries):
+        """
+        Arrange: Une commande en attente payée chez CinetPay
+        Act: Recevoir la notification signée
+        Assert: Réponse 200 après un seul INSERT, sans appel à CinetPay ; le traitement
+                planifié valide ensuite la commande
+        """
+        cinetpay.payer('TX-42', 10000)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with django_assert_num_queries(1):
+                response = notifier(client)
+
+        assert response.status_code == 200
+        assert cinetpay.requetes == []
+        assert NotificationPaiement.objects.get().statut == NotificationPaiement.RECUE
+
+        for callback in callbacks:
+            callback()
+
+        commande = Commande.objects.get(pk=commande_en_attente.pk)
+        assert commande.statut_paiement == Commande.PAIEMENT_ACCEPTE and commande.status
+        notification_ = NotificationPaiement.objects.get()
+        assert (notification_.statut, notification_.resultat) == (NotificationPaiement.TRAITEE, 'ACCEPTED')
+
+    @pytest.mark.integration
+    def test_jeton_invalide(self, client, cinetpay, commande_en_attente):
+        response = notifier(client, HTTP_X_TOKEN='faux')
+
+        assert response.status_code == 403
+        assert not NotificationPaiement.objects.exists()
+
+    @pytest.mark.integration
+    def test_ping_get(self, client):
+        assert client.get(reverse('notification-paiement')).status_code == 200
+
+    @pytest.mark.integration
+    def test_notifications_repetees_idempotentes(self, client, cinetpay, commande_en_attente,
+                                                 django_capture_on_commit_callbacks):
+        """
+        Arrange: Un paiement accepté
+        Act: Recevoir trois fois la même notification
+        Assert: Trois notifications traitées, la commande validée une seule fois
+        """
+        cinetpay.payer('TX-42', 10000)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(3):
+                notifier(client)
+
+        assert NotificationPaiement.objects.filter(statut=NotificationPaiement.TRAITEE).count() == 3
+        commande = Commande.objects.get(pk=commande_en_attente.pk)
+        assert commande.statut_paiement == Commande.PAIEMENT_ACCEPTE
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('statut, montant, attendu', [
+        (paiements.REFUSE, 10000, Commande.PAIEMENT_REFUSE),
+        (paiements.ACCEPTE, 500, Commande.PAIEMENT_EN_ATTENTE),
+        ('WAITING_CUSTOMER_PAYMENT', 10000, Commande.PAIEMENT_EN_ATTENTE),
+    ])
+    def test_statuts_cinetpay(self, client, cinetpay, commande_en_attente, django_capture_on_commit_callbacks,
+                              statut, montant, attendu):
+        """Refus, montant insuffisant et paiement inabouti ne valident pas la commande"""
+        cinetpay.payer('TX-42', montant, statut)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            notifier(client, montant=montant)
+
+        assert Commande.objects.get(pk=commande_en_attente.pk).statut_paiement == attendu
+
+    @pytest.mark.integration
+    def test_cinetpay_injoignable(self, client, cinetpay, commande_en_attente, settings,
+                                  django_capture_on_commit_callbacks):
+        """La notification reste à reprendre par le cron si l'API ne répond pas"""
+        settings.CINETPAY_CHECK_URL = 'http://127.0.0.1:1/v2/payment/check'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            notifier(client)
+
+        notification_ = NotificationPaiement.objects.get()
+        assert notification_.statut == NotificationPaiement.RECUE
+        assert notification_.tentatives == 1 and notification_.erreur
+        assert Commande.objects.get(pk=commande_en_attente.pk).statut_paiement == Commande.PAIEMENT_EN_ATTENTE
+
+
+class TestReconciliation:
+
+    @pytest.fixture
+    def en_attente(self, customer):
+        """Cinq commandes en attente passées depuis une heure, sans notification"""
+        commandes = [
+            Commande.objects.create(customer=customer, prix_total=1000, status=False, transaction_id='R%d' % n)
+            for n in range(5)
+        ]
+        Commande.objects.update(date_add=timezone.now() - datetime.timedelta(hours=1))
+        return commandes
+
+    @pytest.mark.integration
+    def test_lot_applique(self, cinetpay, en_attente, django_assert_max_num_queries):
+        """
+        Arrange: CinetPay connaît deux paiements acceptés, un refusé et un insuffisant
+        Act: Réconcilier
+        Assert: Statuts appliqués par requêtes groupées, les autres commandes restent en attente
+        """
+        cinetpay.payer('R0', 1000)
+        cinetpay.payer('R1', 1500)
+        cinetpay.payer('R2', 1000, paiements.REFUSE)
+        cinetpay.payer('R3', 10)
+
+        with django_assert_max_num_queries(6):
+            bilan = paiements.reconcilier()
+
+        assert bilan == {'verifiees': 5, 'acceptees': 2, 'refusees': 1, 'erreurs': 0}
+        assert sorted(cinetpay.requetes) == ['R0', 'R1', 'R2', 'R3', 'R4']
+        statuts = dict(Commande.objects.values_list('transaction_id', 'statut_paiement'))
+        assert statuts == {
+            'R0': Commande.PAIEMENT_ACCEPTE, 'R1': Commande.PAIEMENT_ACCEPTE, 'R2': Commande.PAIEMENT_REFUSE,
+            'R3': Commande.PAIEMENT_EN_ATTENTE, 'R4': Commande.PAIEMENT_EN_ATTENTE,
+        }
+        assert not Commande.objects.filter(date_verification_paiement__isnull=True).exists()
+
+    @pytest.mark.integration
+    def test_plafond_et_rotation(self, cinetpay, en_attente):
+        """Deux commandes par cycle, les moins récemment vérifiées d'abord"""
+        paiements.reconcilier(limite=2)
+        paiements.reconcilier(limite=2)
+        paiements.reconcilier(limite=2)
+
+        assert len(cinetpay.requetes) == 6
+        assert set(cinetpay.requetes) == {'R0', 'R1', 'R2', 'R3', 'R4'}
+
+    @pytest.mark.integration
+    def test_commandes_recentes_ignorees(self, cinetpay, customer):
+        """Une commande de moins de PAIEMENT_RECONCILIATION_AGE minutes attend encore sa notification"""
+        Commande.objects.create(customer=customer, prix_total=1000, status=False, transaction_id='NEUVE')
+
+        assert paiements.reconcilier()['verifiees'] == 0
+        assert cinetpay.requetes == []
+
+    @pytest.mark.integration
+    def test_api_lente(self, cinetpay, en_attente, settings):
+        """Un appel qui dépasse CINETPAY_TIMEOUT compte en erreur sans bloquer le cycle"""
+        settings.CINETPAY_TIMEOUT = 0.2
+        cinetpay.latence = 1
+
+        bilan = paiements.reconcilier()
+
+        assert bilan['erreurs'] == 5 and bilan['verifiees'] == 0
+        assert Commande.objects.filter(statut_paiement=Commande.PAIEMENT_EN_ATTENTE).count() == 5
@@ -7,6 +7,7 @@ from django.contrib.auth import authenticate, login as login_request, logout
 import json
 from django.http import JsonResponse
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from cities_light.models import City
 
 
@@ -18,8 +19,17 @@ from django.urls import reverse
 
 from django.contrib.auth.hashers import make_password
 from .models import PasswordResetToken
+from . import coupons, photos, tentatives
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now
+from asgiref.sync import sync_to_async
+from base.metrics import CART_OPERATIONS
+
+TROP_DE_TENTATIVES = {
+    'success': False,
+    'message': "Trop de tentatives de connexion, merci de réessayer dans quelques minutes",
+}
+
 
 # Create your views here.
 def login(request):
@@ -60,14 +70,12 @@ def islogin(request):
     password = postdata['password']
 
     isSuccess = False
+    if tentatives.bloque(request, username):
+        return JsonResponse(TROP_DE_TENTATIVES, safe=False)
     try:
 
-        if '@' in username:
-            utilisateur = User.objects.get(email=username)
-            user = authenticate(username=utilisateur.username, password=password)
-        else:
-            utilisateur = User.objects.get(username=username)
-            user = authenticate(username=utilisateur.username, password=password)
+        # Nom d'utilisateur ou email : une seule requête (customer.backends.EmailOrUsernameBackend)
+        user = authenticate(request, username=username, password=password)
         if user is not None and user.is_active:
 
             isSuccess = True
@@ -131,36 +139,30 @@ def inscription(request):
                 issuccess = False
             else:
                 try:
-                    user = User()
-                    user.username = username
-                    user.last_name = nom
-                    user.first_name = prenoms
-                    user.email = email
-                    user.save()
-                    user.password = password
-                    user.set_password(user.password)
-                    user.save()
-                    profile = models.Customer()
-                    profile.user = user
-                    profile.contact_1 = phone
-                    profile.ville = ville
-                    profile.adresse = adresse
-                    profile.save()
-                    if request.FILES['file']:
-
-                        image = request.FILES['file']
-                        profile.photo = image
-                        profile.save()
+                    # Un INSERT par table, annulés ensemble si l'un échoue
+                    with transaction.atomic():
+                        user = User(username=username, last_name=nom, first_name=prenoms, email=email)
+                        user.set_password(password)
+                        user.save()
+                        profile = models.Customer.objects.create(
+                            user=user,
+                            contact_1=phone,
+                            ville=ville,
+                            adresse=adresse,
+                            photo=request.FILES.get('file'),
+                        )
+                except IntegrityError:
+                    # Contraintes d'unicité : username, et email sans tenir compte de la casse
+                    if User.objects.filter(username=username).exists():
+                        message = "Un utilisateur avec le même nom d'utilisateur existe déjà"
+                    else:
+                        message = "Un utilisateur avec le même email existe déjà"
+                    issuccess = False
+                else:
+                    photos.lancer(profile)
+                    login_request(request, user)
                     message = "Votre Compte a été créé avec succès"
                     issuccess = True
-                    if user is not None and user.is_active:
-                        login_request(request, user)
-                        message = "Votre Compte a été créé avec succès"
-                        issuccess = True
-                except Exception as _:
-
-                    message = "Un utilisateur avec le même email ou username existe déjà"
-                    issuccess = False
         else:
 
             message = 'Merci de vérifier vos informations'
@@ -200,6 +202,7 @@ def add_to_cart(request):
         produit_panier.produit = produit
         produit_panier.quantite = quantite
         produit_panier.save()
+        CART_OPERATIONS.labels('add').inc()
         isSuccess = True
         message = "Produit ajouté au panier avec succès"
     else:
@@ -224,6 +227,7 @@ def delete_from_cart(request):
     if panier is not None and produit_panier is not None :
         produit_panier = models.ProduitPanier.objects.get(id=produit_panier)
         produit_panier.delete()
+        CART_OPERATIONS.labels('delete').inc()
         isSuccess = True
         message = "Produit supprimé avec succès"
     else:
@@ -247,10 +251,13 @@ def add_coupon(request):
     isSuccess = False
     if panier is not None and coupon is not None :
         try:
-            coupon = models.CodePromotionnel.objects.get(code_promo=coupon)
+            coupon_id = coupons.pk_par_code(coupon)
+            if coupon_id is None:
+                raise models.CodePromotionnel.DoesNotExist
             panier = models.Panier.objects.get(id=panier)
-            panier.coupon = coupon
+            panier.coupon_id = coupon_id
             panier.save()
+            CART_OPERATIONS.labels('coupon').inc()
             isSuccess = True
             message = "Félicitations, vous avez ajouté un code coupon"
         except:
@@ -282,6 +289,138 @@ def update_cart(request):
         produit_panier = models.ProduitPanier.objects.get(panier=panier, produit=produit)
         produit_panier.quantite = quantite
         produit_panier.save()
+        CART_OPERATIONS.labels('update').inc()
+        isSuccess = True
+        message = "Panier modifié avec succès"
+    else:
+        isSuccess = False
+        message = "Une erreur s'est produite"
+    data = {
+        'message': message,
+        'success': isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
+# Versions asynchrones des points d'entrée JSON, servies sous ASGI (ASYNC_VIEWS)
+async def islogin_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    username = postdata['username']
+    password = postdata['password']
+
+    if await sync_to_async(tentatives.bloque)(request, username):
+        return JsonResponse(TROP_DE_TENTATIVES, safe=False)
+    try:
+        user = await sync_to_async(authenticate)(request, username=username, password=password)
+        if user is not None and user.is_active:
+            await sync_to_async(login_request)(request, user)
+            datas = {
+                'success': True,
+                'message': 'Vous êtes connectés!!!',
+            }
+        else:
+            datas = {
+                'success': False,
+                'message': 'Vos identifiants ne sont pas correcte',
+            }
+    except Exception:
+        datas = {
+            'success': False,
+            'message': "Merci de vérifier vos informations",
+        }
+    return JsonResponse(datas, safe=False)
+
+
+async def add_to_cart_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    panier = postdata['panier']
+    produit = postdata['produit']
+    quantite = postdata['quantite']
+    if panier is not None and produit is not None and quantite is not None:
+        panier = await models.Panier.objects.aget(id=panier)
+        produit = await shop_models.Produit.objects.aget(id=produit)
+        await models.ProduitPanier.objects.aupdate_or_create(
+            panier=panier, produit=produit, defaults={'quantite': quantite},
+        )
+        CART_OPERATIONS.labels('add').inc()
+        isSuccess = True
+        message = "Produit ajouté au panier avec succès"
+    else:
+        isSuccess = False
+        message = "Une erreur s'est produite"
+    data = {
+        'message': message,
+        'success': isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
+async def delete_from_cart_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    panier = postdata['panier']
+    produit_panier = postdata['produit_panier']
+
+    if panier is not None and produit_panier is not None:
+        produit_panier = await models.ProduitPanier.objects.aget(id=produit_panier)
+        await produit_panier.adelete()
+        CART_OPERATIONS.labels('delete').inc()
+        isSuccess = True
+        message = "Produit supprimé avec succès"
+    else:
+        isSuccess = False
+        message = "Une erreur s'est produite"
+    data = {
+        'message': message,
+        'success': isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
+async def add_coupon_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    panier = postdata['panier']
+    coupon = postdata['coupon']
+
+    if panier is not None and coupon is not None:
+        try:
+            coupon_id = await sync_to_async(coupons.pk_par_code)(coupon)
+            if coupon_id is None:
+                raise models.CodePromotionnel.DoesNotExist
+            panier = await models.Panier.objects.aget(id=panier)
+            panier.coupon_id = coupon_id
+            await panier.asave()
+            CART_OPERATIONS.labels('coupon').inc()
+            isSuccess = True
+            message = "Félicitations, vous avez ajouté un code coupon"
+        except Exception:
+            isSuccess = False
+            message = "Code coupon invalide"
+    else:
+        isSuccess = False
+        message = "Une erreur s'est produite"
+    data = {
+        'message': message,
+        'success': isSuccess
+    }
+    return JsonResponse(data, safe=False)
+
+
+async def update_cart_async(request):
+    postdata = json.loads(request.body.decode('utf-8'))
+
+    panier = postdata['panier']
+    produit = postdata['produit']
+    quantite = postdata['quantite']
+
+    if panier is not None and produit is not None:
+        produit_panier = await models.ProduitPanier.objects.aget(panier_id=panier, produit_id=produit)
+        produit_panier.quantite = quantite
+        await produit_panier.asave()
+        CART_OPERATIONS.labels('update').inc()
         isSuccess = True
         message = "Panier modifié avec succès"
     else:
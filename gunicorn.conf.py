@@ -0,0 +1,23 @@
+"""Configuration gunicorn, chargée automatiquement depuis la racine du projet."""
+
+import os
+import shutil
+import tempfile
+
+
+# Métriques Prometheus partagées entre workers : le répertoire doit être
+# connu avant que l'application (et prometheus_client) ne soit importée.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'cooldeal-metrics'))
+
+
+def on_starting(server):
+    # Les fichiers d'un arbitre précédent fausseraient les compteurs
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -55,4 +55,9 @@ echo -e "${BLUE}10. Tests en parallèle (plus rapide):${NC}"
 echo "    pytest -n auto"
 echo ""
 
+echo -e "${BLUE}11. Benchmarks (référence: benchmarks/baseline.json):${NC}"
+echo "    pytest benchmarks --no-cov"
+echo "    BENCH_UPDATE_BASELINE=1 pytest benchmarks --no-cov   # Mettre à jour la référence"
+echo ""
+
 echo -e "${YELLOW}💡 TIP: Consulter TESTING_GUIDE.py pour plus d'options${NC}"
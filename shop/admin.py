@@ -1,10 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
 import shop.models as models
+from base.admin import FastModelAdmin
+from shop.forms import PromotionForm
 from shop.models import Favorite
 
 
-class CategorieEtablissementAdmin(admin.ModelAdmin):
+class CategorieEtablissementAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -16,20 +20,12 @@ class CategorieEtablissementAdmin(admin.ModelAdmin):
         'status',
         'slug',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'description',
-        'couverture',
-        'slug',
-    )
-    search_fields = ('slug',)
+    list_filter = ('status',)
+    search_fields = ('nom', 'slug')
+    date_hierarchy = 'date_add'
 
 
-class CategorieProduitAdmin(admin.ModelAdmin):
+class CategorieProduitAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -42,21 +38,14 @@ class CategorieProduitAdmin(admin.ModelAdmin):
         'status',
         'slug',
     )
-    list_filter = (
-        'categorie',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'description',
-        'couverture',
-        'slug',
-    )
-    search_fields = ('slug',)
+    list_filter = ('status', 'categorie')
+    search_fields = ('nom', 'slug')
+    date_hierarchy = 'date_add'
+    list_select_related = ('categorie',)
+    autocomplete_fields = ('categorie',)
 
 
-class EtablissementAdmin(admin.ModelAdmin):
+class EtablissementAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -77,29 +66,14 @@ class EtablissementAdmin(admin.ModelAdmin):
         'status',
         'slug',
     )
-    list_filter = (
-        'categorie',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'description',
-        'logo',
-        'couverture',
-        'ville',
-        'adresse',
-        'pays',
-        'site_web',
-        'contact_1',
-        'contact_2',
-        'email',
-        'slug',
-    )
-    search_fields = ('slug',)
+    list_filter = ('status', 'categorie')
+    search_fields = ('nom', 'slug')
+    date_hierarchy = 'date_add'
+    list_select_related = ('categorie', 'ville')
+    autocomplete_fields = ('user', 'categorie', 'ville')
 
 
-class ProduitAdmin(admin.ModelAdmin):
+class ProduitAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -122,37 +96,97 @@ class ProduitAdmin(admin.ModelAdmin):
         'status',
         'slug',
     )
-    list_filter = (
-        'date_debut_promo',
-        'date_fin_promo',
-        'categorie_etab',
-        'categorie',
-        'etablissement',
-        'super_deal',
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'description',
-        'description_deal',
-        'prix',
-        'prix_promotionnel',
-        'image',
-        'image_2',
-        'image_3',
-        'slug',
+    list_filter = ('status', 'super_deal', 'categorie_etab')
+    search_fields = ('nom', 'slug', 'sku')
+    date_hierarchy = 'date_add'
+    list_select_related = ('categorie_etab', 'categorie', 'etablissement')
+    autocomplete_fields = ('categorie', 'etablissement')
+    actions = (
+        'mettre_en_promotion',
+        'retirer_promotion',
+        'activer_super_deal',
+        'retirer_super_deal',
+        'activer',
+        'desactiver',
     )
-    search_fields = ('slug',)
 
-class FavoriteAdmin(admin.ModelAdmin):
+    # Actions groupées : une requête UPDATE sur toute la sélection (ou tout le
+    # filtre avec « sélectionner tous »), voir ProduitQuerySet.
+
+    @admin.action(description="Mettre en promotion (pourcentage et dates)")
+    def mettre_en_promotion(self, request, queryset):
+        form = PromotionForm(request.POST if 'appliquer' in request.POST else None)
+        if form.is_valid():
+            nombre = form.appliquer(queryset)
+            self.message_user(request, "%d produit(s) mis en promotion" % nombre, messages.SUCCESS)
+            return None
+        return TemplateResponse(request, 'admin/shop/produit/promotion.html', {
+            **self.admin_site.each_context(request),
+            'title': "Mettre en promotion",
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'nombre': queryset.count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
+    @admin.action(description="Retirer la promotion")
+    def retirer_promotion(self, request, queryset):
+        self.message_user(request, "%d promotion(s) retirée(s)" % queryset.retirer_promotion(), messages.SUCCESS)
+
+    @admin.action(description="Marquer super deal")
+    def activer_super_deal(self, request, queryset):
+        self.message_user(request, "%d produit(s) marqué(s) super deal" % queryset.definir_super_deal(True), messages.SUCCESS)
+
+    @admin.action(description="Retirer des super deals")
+    def retirer_super_deal(self, request, queryset):
+        self.message_user(request, "%d produit(s) retiré(s) des super deals" % queryset.definir_super_deal(False), messages.SUCCESS)
+
+    @admin.action(description="Activer")
+    def activer(self, request, queryset):
+        self.message_user(request, "%d produit(s) activé(s)" % queryset.definir_statut(True), messages.SUCCESS)
+
+    @admin.action(description="Désactiver")
+    def desactiver(self, request, queryset):
+        self.message_user(request, "%d produit(s) désactivé(s)" % queryset.definir_statut(False), messages.SUCCESS)
+
+class FavoriteAdmin(FastModelAdmin):
     list_display = ('id', 'user', 'produit', 'added_at')  # Colonnes affichées dans la liste
-    list_filter = ('user', 'produit', 'added_at')  # Filtres dans l'interface admin
+    date_hierarchy = 'added_at'  # Navigation par date, sans DISTINCT sur les utilisateurs et produits
     search_fields = ('user__username', 'produit__nom')  # Recherche par utilisateur ou produit
+    list_select_related = ('user', 'produit')
+    autocomplete_fields = ('user', 'produit')
 
 admin.site.register(Favorite, FavoriteAdmin)
 
 
+class ImportCatalogueAdmin(FastModelAdmin):
+
+    list_display = (
+        'id',
+        'etablissement',
+        'statut',
+        'lignes_traitees',
+        'lignes_total',
+        'crees',
+        'mis_a_jour',
+        'images_traitees',
+        'images_total',
+        'date_add',
+        'date_update',
+    )
+    list_filter = ('statut',)
+    search_fields = ('etablissement__nom',)
+    date_hierarchy = 'date_add'
+    list_select_related = ('etablissement',)
+    autocomplete_fields = ('etablissement',)
+    readonly_fields = (
+        'statut', 'lignes_total', 'lignes_traitees', 'crees', 'mis_a_jour',
+        'images_total', 'images_traitees', 'erreurs', 'message',
+    )
+
+
 def _register(model, admin_class):
     admin.site.register(model, admin_class)
 
@@ -160,3 +194,4 @@ _register(models.CategorieEtablissement, CategorieEtablissementAdmin)
 _register(models.CategorieProduit, CategorieProduitAdmin)
 _register(models.Etablissement, EtablissementAdmin)
 _register(models.Produit, ProduitAdmin)
+_register(models.ImportCatalogue, ImportCatalogueAdmin)
@@ -0,0 +1,28 @@
+"""
+Version du catalogue produits.
+
+Toute modification de produits (enregistrement, suppression, mise à jour
+groupée de ProduitQuerySet) remplace la version stockée dans le cache Django.
+Les caches dérivés du catalogue incluent cette version dans leur clé : une
+seule écriture les invalide tous, quel que soit le nombre de produits touchés.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'shop:catalogue:version'
+
+
+def version():
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        current = time.time()
+        cache.add(VERSION_KEY, current, None)
+        current = cache.get(VERSION_KEY, current)
+    return current
+
+
+def invalider():
+    cache.set(VERSION_KEY, time.time(), None)
@@ -0,0 +1,27 @@
+from django_cron import CronJobBase, Schedule
+from django.db.models import Q
+from django.utils.timezone import now
+from datetime import timedelta
+
+from shop.imports import executer
+from shop.models import ImportCatalogue
+
+
+class ImportCatalogueCronJob(CronJobBase):
+    RUN_EVERY_MINS = 5
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'shop.import_catalogue'
+
+    def do(self):
+        # En attente depuis plus d'une minute (thread non démarré) ou interrompus
+        pks = ImportCatalogue.objects.filter(
+            Q(statut=ImportCatalogue.EN_ATTENTE, date_add__lt=now() - timedelta(minutes=1))
+            | Q(statut__in=(ImportCatalogue.LIGNES, ImportCatalogue.IMAGES))
+        ).values_list('pk', flat=True)
+        count = 0
+        for pk in list(pks):
+            # executer() ne reprend un import en cours que s'il ne progresse plus
+            executer(pk)
+            count += 1
+        print(f"{count} imports de catalogue examinés.")
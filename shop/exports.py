@@ -0,0 +1,112 @@
+"""
+Exports des commandes et des lignes de commande (comptabilité marchands et opérateurs).
+
+filtrer_commandes applique les filtres de la page « Commandes reçues » ; les
+générateurs de rangées parcourent le QuerySet par lots (iterator) avec les
+jointures nécessaires, sans charger l'export en mémoire ni faire une requête
+par ligne. base.exports produit la réponse CSV ou XLSX.
+"""
+
+import datetime
+
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+
+from customer.models import Commande, ProduitPanier
+
+
+CHUNK_SIZE = 2000
+
+COLONNES_COMMANDES = ['Référence', 'Date', 'Client', 'Email', 'Contact', 'Statut', 'Montant total', 'Transaction']
+COLONNES_LIGNES = [
+    'Commande', 'Date', 'Client', 'Email', 'Statut', 'Article', 'SKU', 'Prix unitaire', 'Quantité', 'Total',
+]
+
+
+def filtrer_commandes(etablissement, params):
+    """
+    Commandes contenant au moins un article de `etablissement`, filtrées par les
+    paramètres GET client, produit, status (payée / attente), date_min et date_max.
+    """
+    lignes = ProduitPanier.objects.filter(commande=OuterRef('pk'), produit__etablissement=etablissement)
+    produit = params.get('produit')
+    if produit:
+        lignes = lignes.filter(produit__nom__icontains=produit)
+    # EXISTS plutôt qu'une jointure : pas de DISTINCT, une ligne par commande
+    commandes = Commande.objects.filter(Exists(lignes))
+
+    client = params.get('client')
+    if client:
+        commandes = commandes.filter(customer__user__first_name__icontains=client)
+
+    status = params.get('status')
+    if status == 'payée':
+        commandes = commandes.filter(status=True)
+    elif status == 'attente':
+        commandes = commandes.filter(status=False)
+
+    date_min = parse_date(params.get('date_min') or '')
+    if date_min:
+        commandes = commandes.filter(date_add__gte=date_min)
+    date_max = parse_date(params.get('date_max') or '')
+    if date_max:
+        # Journée de date_max incluse
+        commandes = commandes.filter(date_add__lt=date_max + datetime.timedelta(days=1))
+
+    return commandes.order_by('-date_add')
+
+
+def filtrer_lignes(etablissement, params):
+    """Lignes de `etablissement` dans les commandes retenues par filtrer_commandes."""
+    lignes = ProduitPanier.objects.filter(
+        produit__etablissement=etablissement, commande__in=filtrer_commandes(etablissement, params).values('pk'),
+    )
+    produit = params.get('produit')
+    if produit:
+        lignes = lignes.filter(produit__nom__icontains=produit)
+    return lignes.order_by('-commande__date_add', 'pk')
+
+
+def statut(commande):
+    return 'Payée' if commande.status else 'En attente'
+
+
+def client(commande):
+    if commande.customer is None:
+        return '', ''
+    user = commande.customer.user
+    return ' '.join(filter(None, (user.first_name, user.last_name))) or user.username, user.email
+
+
+def rangees_commandes(commandes):
+    for commande in commandes.select_related('customer__user').iterator(chunk_size=CHUNK_SIZE):
+        nom, email = client(commande)
+        yield [
+            commande.pk,
+            commande.date_add,
+            nom,
+            email,
+            commande.customer.contact_1 if commande.customer else '',
+            statut(commande),
+            commande.prix_total,
+            commande.transaction_id or '',
+        ]
+
+
+def rangees_lignes(lignes):
+    for ligne in lignes.select_related('commande__customer__user', 'produit').iterator(chunk_size=CHUNK_SIZE):
+        commande = ligne.commande
+        nom, email = client(commande)
+        total = ligne.total
+        yield [
+            commande.pk,
+            commande.date_add,
+            nom,
+            email,
+            statut(commande),
+            ligne.produit.nom,
+            ligne.produit.sku or '',
+            total / ligne.quantite if ligne.quantite else total,
+            ligne.quantite,
+            total,
+        ]
@@ -0,0 +1,51 @@
+from django import forms
+
+
+# Clés BigAutoField : au-delà, la base refuserait la valeur (erreur 500 plutôt qu'un message)
+MAX_PK = 2 ** 63 - 1
+
+
+class PromotionForm(forms.Form):
+    pourcentage = forms.IntegerField(label="Réduction (%)", min_value=1, max_value=99)
+    date_debut = forms.DateField(label="Début", widget=forms.DateInput(attrs={'type': 'date'}))
+    date_fin = forms.DateField(label="Fin", widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_debut, date_fin = cleaned_data.get('date_debut'), cleaned_data.get('date_fin')
+        if date_debut and date_fin and date_fin < date_debut:
+            raise forms.ValidationError("La fin de la promotion précède son début")
+        return cleaned_data
+
+    def appliquer(self, produits):
+        return produits.mettre_en_promotion(**self.cleaned_data)
+
+
+class ListeClesField(forms.Field):
+    """Liste de clés primaires (cases à cocher de même nom)."""
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {'invalid': "Sélection d'articles invalide"}
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            cles = [int(v) for v in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+        if any(not 1 <= cle <= MAX_PK for cle in cles):
+            raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+        return cles
+
+
+class SelectionArticlesForm(forms.Form):
+    """Articles visés par une action groupée : toute une catégorie, ou les articles cochés."""
+    categorie = forms.IntegerField(required=False, min_value=1, max_value=MAX_PK,
+                                   error_messages={'invalid': "Catégorie invalide"})
+    articles = ListeClesField(required=False)
+
+    def filtrer(self, produits):
+        categorie = self.cleaned_data['categorie']
+        if categorie:
+            return produits.filter(categorie_id=categorie)
+        return produits.filter(id__in=self.cleaned_data['articles'])
@@ -0,0 +1,542 @@
+"""
+Import de catalogue CSV/XLSX d'un établissement (ImportCatalogue).
+
+Le fichier est lu ligne à ligne (module csv sur un flux texte, openpyxl en
+lecture seule pour XLSX) : la mémoire dépend de la taille d'un lot, pas de
+celle du fichier. Chaque lot de lignes valides est écrit en deux requêtes
+groupées indexées par le SKU du marchand : bulk_create des nouveaux produits,
+bulk_update des existants (colonnes présentes dans le fichier uniquement).
+
+Les images (URL http(s) ou nom d'un fichier de l'archive zip jointe) sont
+notées dans ImportImage pendant la lecture, puis téléchargées / extraites
+après les lignes. Le traitement tourne dans un thread lancé après l'envoi ;
+ImportCatalogueCronJob reprend les imports en attente ou interrompus.
+"""
+
+import csv
+import datetime
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.text import slugify
+from PIL import Image
+
+from . import catalogue
+from .models import CategorieProduit, ImportCatalogue, ImportImage, Produit
+from .slugs import registry as slug_registry
+
+
+logger = logging.getLogger(__name__)
+
+LOT = 1000
+LOT_IMAGES = 50
+MAX_ERREURS = 500
+MAX_REDIRECTIONS = 3
+
+COLONNES_OBLIGATOIRES = ('sku', 'nom', 'prix', 'categorie')
+COLONNES_PRODUIT = (
+    'nom', 'description', 'description_deal', 'prix', 'prix_promotionnel', 'quantite', 'categorie',
+    'date_debut_promo', 'date_fin_promo', 'super_deal', 'status',
+)
+COLONNES_IMAGES = ('image', 'image_2', 'image_3')
+VRAI = {'1', 'oui', 'o', 'vrai', 'true', 'yes', 'x'}
+FAUX = {'0', 'non', 'n', 'faux', 'false', 'no', ''}
+
+
+class ImportErreur(Exception):
+    pass
+
+
+class ImageRefusee(ValueError):
+    """Refus dont le message peut être montré au marchand."""
+
+
+# Lecture
+
+def normaliser(entetes):
+    return [slugify(str(entete or '')).replace('-', '_') for entete in entetes]
+
+
+def ouvrir(fichier, nom):
+    """(entêtes normalisées, itérateur de (numéro de ligne, dict)) pour un fichier binaire ouvert."""
+    extension = os.path.splitext(nom)[1].lower()
+    if extension == '.xlsx':
+        return ouvrir_xlsx(fichier)
+    if extension in ('.csv', '.txt'):
+        return ouvrir_csv(fichier)
+    raise ImportErreur("Format non pris en charge : %s (CSV ou XLSX attendu)" % extension)
+
+
+def ouvrir_csv(fichier):
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    echantillon = texte.read(8192)
+    texte.seek(0)
+    try:
+        dialecte = csv.Sniffer().sniff(echantillon, delimiters=';,\t')
+    except csv.Error:
+        dialecte = csv.excel
+    lecteur = csv.reader(texte, dialecte)
+    entetes = normaliser(next(lecteur, []))
+
+    def lignes():
+        for valeurs in lecteur:
+            if any(valeur.strip() for valeur in valeurs):
+                yield lecteur.line_num, dict(zip(entetes, valeurs))
+
+    return entetes, lignes()
+
+
+def ouvrir_xlsx(fichier):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportErreur("L'import XLSX nécessite openpyxl")
+    classeur = load_workbook(fichier, read_only=True, data_only=True)
+    rangees = classeur.worksheets[0].iter_rows(values_only=True)
+    entetes = normaliser(next(rangees, ()))
+
+    def lignes():
+        try:
+            for numero, valeurs in enumerate(rangees, start=2):
+                if any(valeur is not None and str(valeur).strip() for valeur in valeurs):
+                    yield numero, dict(zip(entetes, valeurs))
+        finally:
+            classeur.close()
+
+    return entetes, lignes()
+
+
+def compter_lignes(fichier, nom):
+    """Nombre de lignes de données, pour la progression (approché pour un CSV à champs multilignes)."""
+    if os.path.splitext(nom)[1].lower() == '.xlsx':
+        from openpyxl import load_workbook
+
+        classeur = load_workbook(fichier, read_only=True)
+        total = max((classeur.worksheets[0].max_row or 1) - 1, 0)
+        classeur.close()
+        return total
+    total, dernier = 0, b'\n'
+    for bloc in iter(lambda: fichier.read(1 << 20), b''):
+        total += bloc.count(b'\n')
+        dernier = bloc[-1:]
+    return max(total - (dernier == b'\n'), 0)
+
+
+# Validation
+
+def texte(valeur):
+    return '' if valeur is None else str(valeur).strip()
+
+
+def nombre(valeur, colonne, entier=False):
+    if isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+        resultat = valeur
+    else:
+        brut = texte(valeur).replace(' ', '').replace('\u00a0', '').replace(',', '.')
+        try:
+            resultat = float(brut)
+        except ValueError:
+            raise ValueError("%s invalide : %r" % (colonne, texte(valeur)))
+    if resultat < 0:
+        raise ValueError("%s négatif" % colonne)
+    if entier:
+        if resultat != int(resultat):
+            raise ValueError("%s doit être entier" % colonne)
+        return int(resultat)
+    return float(resultat)
+
+
+def date(valeur, colonne):
+    if isinstance(valeur, datetime.datetime):
+        return valeur.date()
+    if isinstance(valeur, datetime.date):
+        return valeur
+    for format_ in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(texte(valeur), format_).date()
+        except ValueError:
+            pass
+    raise ValueError("%s invalide : %r (AAAA-MM-JJ ou JJ/MM/AAAA)" % (colonne, texte(valeur)))
+
+
+def booleen(valeur, colonne):
+    brut = texte(valeur).lower()
+    if brut in VRAI:
+        return True
+    if brut in FAUX:
+        return False
+    raise ValueError("%s invalide : %r (oui/non)" % (colonne, brut))
+
+
+def charger_categories():
+    """Catégories de produits par identifiant, slug et nom (table de référence, peu de lignes)."""
+    categories = {}
+    for categorie in CategorieProduit.objects.only('pk', 'nom', 'slug'):
+        categories[str(categorie.pk)] = categorie
+        categories[(categorie.slug or '').lower()] = categorie
+        categories[categorie.nom.strip().lower()] = categorie
+    return categories
+
+
+def valider(ligne, colonnes, categories):
+    """(sku, valeurs du produit, images {champ: source}) d'une ligne ; ValueError si elle est invalide."""
+    sku = texte(ligne.get('sku'))
+    if not sku:
+        raise ValueError("sku manquant")
+    if len(sku) > Produit._meta.get_field('sku').max_length:
+        raise ValueError("sku trop long")
+    valeurs = {}
+    if 'nom' in colonnes:
+        valeurs['nom'] = texte(ligne.get('nom'))
+        if not valeurs['nom']:
+            raise ValueError("nom manquant")
+        valeurs['nom'] = valeurs['nom'][:Produit._meta.get_field('nom').max_length]
+    for colonne in ('description', 'description_deal'):
+        if colonne in colonnes:
+            valeurs[colonne] = texte(ligne.get(colonne))
+    if 'prix' in colonnes:
+        valeurs['prix'] = nombre(ligne.get('prix'), 'prix')
+    if 'prix_promotionnel' in colonnes:
+        valeurs['prix_promotionnel'] = nombre(ligne.get('prix_promotionnel') or 0, 'prix_promotionnel')
+    if 'quantite' in colonnes:
+        valeurs['quantite'] = nombre(ligne.get('quantite'), 'quantite', entier=True) if texte(ligne.get('quantite')) else None
+    for colonne in ('date_debut_promo', 'date_fin_promo'):
+        if colonne in colonnes:
+            valeurs[colonne] = date(ligne.get(colonne), colonne) if texte(ligne.get(colonne)) else None
+    for colonne in ('super_deal', 'status'):
+        if colonne in colonnes:
+            valeurs[colonne] = booleen(ligne.get(colonne), colonne)
+    if 'categorie' in colonnes:
+        valeurs['categorie'] = categories.get(texte(ligne.get('categorie')).lower())
+        if valeurs['categorie'] is None:
+            raise ValueError("catégorie inconnue : %r" % texte(ligne.get('categorie')))
+
+    images = {}
+    for champ in COLONNES_IMAGES:
+        source = texte(ligne.get(champ))
+        if source:
+            if len(source) > ImportImage._meta.get_field('source').max_length:
+                raise ValueError("%s : source trop longue" % champ)
+            images[champ] = source
+    return sku, valeurs, images
+
+
+# Écriture
+
+def slug_import(etablissement, sku, nom):
+    """Slug stable et unique d'un produit importé (SlugField de 50 caractères)."""
+    empreinte = hashlib.sha1(('%s:%s' % (etablissement.pk, sku)).encode()).hexdigest()[:12]
+    return '%s-%s' % (slugify(nom)[:36].strip('-') or 'produit', empreinte)
+
+
+def ecrire_lot(import_, lot, champs):
+    """Écrit un lot {sku: (valeurs, images)}. Retourne (créés, mis à jour)."""
+    etablissement = import_.etablissement
+    with transaction.atomic():
+        existants = {
+            produit.sku: produit
+            for produit in Produit.objects.filter(etablissement=etablissement, sku__in=list(lot)).only('pk', 'sku')
+        }
+        maintenant = timezone.now()
+        nouveaux, modifies = [], []
+        for sku, (valeurs, images) in lot.items():
+            produit = existants.get(sku)
+            if produit is None:
+                nouveaux.append(Produit(
+                    etablissement=etablissement, categorie_etab=etablissement.categorie, sku=sku,
+                    slug=slug_import(etablissement, sku, valeurs['nom']), **valeurs,
+                ))
+            else:
+                for champ, valeur in valeurs.items():
+                    setattr(produit, champ, valeur)
+                produit.categorie_etab = etablissement.categorie
+                produit.date_update = maintenant
+                modifies.append(produit)
+        Produit.objects.bulk_create(nouveaux, batch_size=LOT)
+        if modifies:
+            Produit.objects.bulk_update(modifies, champs + ['categorie_etab', 'date_update'], batch_size=LOT)
+
+        if any(images for valeurs, images in lot.values()):
+            # bulk_create ne renvoie pas les clés sur tous les SGBD : relecture par SKU
+            pks = dict(Produit.objects.filter(etablissement=etablissement, sku__in=list(lot)).values_list('sku', 'pk'))
+            ImportImage.objects.bulk_create([
+                ImportImage(import_catalogue=import_, produit_id=pks[sku], champ=champ, source=source)
+                for sku, (valeurs, images) in lot.items() if sku in pks
+                for champ, source in images.items()
+            ], batch_size=LOT)
+    return len(nouveaux), len(modifies)
+
+
+def importer_lignes(import_):
+    with import_.fichier.open('rb') as fichier:
+        total = compter_lignes(fichier, import_.fichier.name)
+    ImportCatalogue.objects.filter(pk=import_.pk).update(statut=ImportCatalogue.LIGNES, lignes_total=total)
+    # Reprise après interruption : les lignes sont réécrites (idempotent par SKU), les images renotées
+    import_.images.filter(traitee=False).delete()
+
+    categories = charger_categories()
+    traitees = crees = mis_a_jour = 0
+    erreurs = []
+    with import_.fichier.open('rb') as fichier:
+        entetes, lignes = ouvrir(fichier, import_.fichier.name)
+        manquantes = [colonne for colonne in COLONNES_OBLIGATOIRES if colonne not in entetes]
+        if manquantes:
+            raise ImportErreur("Colonnes obligatoires manquantes : %s" % ', '.join(manquantes))
+        colonnes = set(entetes)
+        champs = [colonne for colonne in COLONNES_PRODUIT if colonne in colonnes]
+
+        lot = {}
+        for numero, ligne in lignes:
+            traitees += 1
+            try:
+                sku, valeurs, images = valider(ligne, colonnes, categories)
+            except ValueError as e:
+                if len(erreurs) < MAX_ERREURS:
+                    erreurs.append({'ligne': numero, 'message': str(e)})
+                continue
+            lot[sku] = (valeurs, images)
+            if len(lot) >= LOT:
+                c, m = ecrire_lot(import_, lot, champs)
+                crees, mis_a_jour, lot = crees + c, mis_a_jour + m, {}
+                ImportCatalogue.objects.filter(pk=import_.pk).update(
+                    lignes_traitees=traitees, crees=crees, mis_a_jour=mis_a_jour, erreurs=erreurs, date_update=timezone.now())
+        if lot:
+            c, m = ecrire_lot(import_, lot, champs)
+            crees, mis_a_jour = crees + c, mis_a_jour + m
+
+    ImportCatalogue.objects.filter(pk=import_.pk).update(
+        lignes_total=traitees, lignes_traitees=traitees, crees=crees, mis_a_jour=mis_a_jour, erreurs=erreurs,
+        date_update=timezone.now())
+    # Les nouveaux produits n'ont pas émis de post_save
+    slug_registry.bump_version()
+    catalogue.invalider()
+
+
+# Images
+
+def verifier_adresse(url):
+    """
+    Refuse une URL qui n'est pas en http(s) ou dont l'hôte résout vers une
+    adresse non publique (privée, boucle locale, lien local : métadonnées du
+    cloud, services internes…). Retourne l'adresse vérifiée, la seule à
+    laquelle se connecter ensuite.
+    """
+    parties = urlsplit(url)
+    if parties.scheme not in ('http', 'https') or not parties.hostname:
+        raise ImageRefusee("URL non autorisée")
+    try:
+        adresses = socket.getaddrinfo(parties.hostname, parties.port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise ImageRefusee("hôte introuvable")
+    ips = [ipaddress.ip_address(sockaddr[0].split('%')[0]) for *_, sockaddr in adresses]
+    if not ips or any(not ip.is_global or ip.is_multicast for ip in ips):
+        raise ImageRefusee("adresse non autorisée")
+    return str(ips[0])
+
+
+class AdapteurEpingle(requests.adapters.HTTPAdapter):
+    """HTTPS vers une adresse IP : SNI et vérification du certificat se font pour le nom d'origine."""
+
+    def __init__(self, hote):
+        self.hote = hote
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.update(server_hostname=self.hote, assert_hostname=self.hote)
+        super().init_poolmanager(*args, **kwargs)
+
+
+@contextmanager
+def requete_epinglee(url, adresse):
+    """
+    GET de `url` en se connectant à `adresse`, sans résoudre le nom une
+    seconde fois : une réponse DNS différente entre la vérification et la
+    connexion (DNS rebinding) ne peut pas viser une adresse interne.
+    """
+    parties = urlsplit(url)
+    hote = '[%s]' % adresse if ':' in adresse else adresse
+    cible = urlunsplit(parties._replace(netloc=hote if parties.port is None else '%s:%d' % (hote, parties.port)))
+    with requests.Session() as session:
+        # Un proxy d'environnement résoudrait le nom lui-même
+        session.trust_env = False
+        session.mount('https://', AdapteurEpingle(parties.hostname))
+        with session.get(cible, headers={'Host': parties.netloc.rpartition('@')[2]}, stream=True,
+                         allow_redirects=False, timeout=getattr(settings, 'IMPORT_IMAGE_TIMEOUT', 10)) as reponse:
+            yield reponse
+
+
+def telecharger(url):
+    """
+    Contenu d'une image distante, borné à IMPORT_IMAGE_MAX_OCTETS. Les
+    redirections sont suivies à la main pour vérifier chaque adresse.
+    """
+    limite = getattr(settings, 'IMPORT_IMAGE_MAX_OCTETS', 5 * 1024 * 1024)
+    for _ in range(MAX_REDIRECTIONS + 1):
+        adresse = verifier_adresse(url)
+        with requete_epinglee(url, adresse) as reponse:
+            if reponse.is_redirect:
+                url = urljoin(url, reponse.headers['location'])
+                continue
+            reponse.raise_for_status()
+            contenu = bytearray()
+            for bloc in reponse.iter_content(64 * 1024):
+                contenu += bloc
+                if len(contenu) > limite:
+                    raise ImageRefusee("image trop volumineuse")
+            return bytes(contenu)
+    raise ImageRefusee("trop de redirections")
+
+
+def extraire(archive, membres, nom):
+    membre = membres.get(os.path.basename(nom))
+    if membre is None:
+        raise ImageRefusee("absente de l'archive")
+    if membre.file_size > getattr(settings, 'IMPORT_IMAGE_MAX_OCTETS', 5 * 1024 * 1024):
+        raise ImageRefusee("image trop volumineuse")
+    return archive.read(membre)
+
+
+def charger_image(image, archive, membres):
+    """(image, contenu vérifié ou None, erreur)."""
+    try:
+        if image.source.startswith(('http://', 'https://')):
+            contenu = telecharger(image.source)
+        elif archive is not None:
+            contenu = extraire(archive, membres, image.source)
+        else:
+            raise ImageRefusee("ni URL ni archive d'images")
+    except ImageRefusee as e:
+        return image, None, str(e)
+    except Exception:
+        # Le détail (connexion refusée, délai…) renseignerait sur le réseau interne : journal seulement
+        logger.info("Image %s inaccessible", image.source, exc_info=True)
+        return image, None, "image inaccessible"
+    try:
+        Image.open(io.BytesIO(contenu)).verify()
+    except Exception:
+        return image, None, "fichier image invalide"
+    return image, contenu, None
+
+
+def importer_images(import_):
+    restantes = import_.images.filter(traitee=False)
+    ImportCatalogue.objects.filter(pk=import_.pk).update(
+        statut=ImportCatalogue.IMAGES, images_total=import_.images.count(),
+        images_traitees=import_.images.filter(traitee=True).count(), date_update=timezone.now())
+    if not restantes.exists():
+        return
+
+    archive = membres = None
+    fichier_archive = import_.archive_images.open('rb') if import_.archive_images else None
+    try:
+        if fichier_archive is not None:
+            archive = zipfile.ZipFile(fichier_archive)
+            membres = {os.path.basename(info.filename): info for info in archive.infolist() if not info.is_dir()}
+        erreurs = list(ImportCatalogue.objects.values_list('erreurs', flat=True).get(pk=import_.pk))
+        with ThreadPoolExecutor(max_workers=getattr(settings, 'IMPORT_IMAGE_THREADS', 4)) as pool:
+            while True:
+                lot = list(restantes.order_by('pk')[:LOT_IMAGES])
+                if not lot:
+                    break
+                # ZipFile n'est pas sûr entre threads : extraction dans ce thread, téléchargements en parallèle
+                if archive is not None:
+                    resultats = [charger_image(image, archive, membres) for image in lot if not image.source.startswith(('http://', 'https://'))]
+                    resultats += pool.map(lambda image: charger_image(image, None, None), [
+                        image for image in lot if image.source.startswith(('http://', 'https://'))])
+                else:
+                    resultats = list(pool.map(lambda image: charger_image(image, None, None), lot))
+
+                par_champ = {}
+                for image, contenu, erreur in resultats:
+                    if erreur:
+                        if len(erreurs) < MAX_ERREURS:
+                            erreurs.append({'ligne': None, 'message': "Image %s : %s" % (image.source, erreur)})
+                        continue
+                    champ = Produit._meta.get_field(image.champ)
+                    nom = champ.storage.save(
+                        champ.generate_filename(None, os.path.basename(image.source.split('?')[0]) or 'image'),
+                        ContentFile(contenu))
+                    par_champ.setdefault(image.champ, []).append(Produit(pk=image.produit_id, **{image.champ: nom}))
+                with transaction.atomic():
+                    for champ, produits in par_champ.items():
+                        Produit.objects.bulk_update(produits, [champ])
+                    ImportImage.objects.filter(pk__in=[image.pk for image in lot]).update(traitee=True)
+                    ImportCatalogue.objects.filter(pk=import_.pk).update(
+                        images_traitees=F('images_traitees') + len(lot), erreurs=erreurs, date_update=timezone.now())
+    finally:
+        if archive is not None:
+            archive.close()
+        if fichier_archive is not None:
+            fichier_archive.close()
+    catalogue.invalider()
+
+
+# Exécution
+
+def reserver(pk):
+    """
+    Réserve un import pour ce processus : en attente, ou en cours mais sans
+    progrès depuis IMPORT_CATALOGUE_DELAI_REPRISE (thread ou worker disparu).
+    """
+    delai = timedelta(minutes=getattr(settings, 'IMPORT_CATALOGUE_DELAI_REPRISE', 10))
+    return ImportCatalogue.objects.filter(pk=pk).filter(
+        Q(statut=ImportCatalogue.EN_ATTENTE)
+        | Q(statut__in=(ImportCatalogue.LIGNES, ImportCatalogue.IMAGES), date_update__lt=timezone.now() - delai)
+    ).update(
+        statut=Case(
+            When(statut=ImportCatalogue.EN_ATTENTE, then=Value(ImportCatalogue.LIGNES)),
+            default=F('statut'),
+        ),
+        date_update=timezone.now(),
+    ) == 1
+
+
+def traiter_import(pk):
+    """Traite un import réservé : lignes puis images. Les erreurs fatales passent l'import en échec."""
+    import_ = ImportCatalogue.objects.select_related('etablissement__categorie').get(pk=pk)
+    try:
+        if import_.statut == ImportCatalogue.LIGNES:
+            importer_lignes(import_)
+        importer_images(import_)
+    except Exception as e:
+        logger.exception("Échec de l'import de catalogue %s", pk)
+        ImportCatalogue.objects.filter(pk=pk).update(statut=ImportCatalogue.ECHEC, message=str(e))
+        return
+    ImportCatalogue.objects.filter(pk=pk).update(statut=ImportCatalogue.TERMINE, date_update=timezone.now())
+
+
+def executer(pk):
+    if reserver(pk):
+        traiter_import(pk)
+
+
+def executer_en_arriere_plan(pk):
+    try:
+        executer(pk)
+    finally:
+        connections.close_all()
+
+
+def lancer(import_):
+    """Démarre le traitement après validation de la transaction courante."""
+    if getattr(settings, 'IMPORT_CATALOGUE_ARRIERE_PLAN', True):
+        cible = lambda: threading.Thread(target=executer_en_arriere_plan, args=(import_.pk,), daemon=True).start()
+    else:
+        cible = lambda: executer(import_.pk)
+    transaction.on_commit(cible)
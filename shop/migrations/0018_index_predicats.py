@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0017_produit_quantite'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['status'], name='shop_produi_status_808539_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['super_deal'], name='shop_produi_super_d_258fd0_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0018_index_predicats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(fields=['date_add'], name='shop_produi_date_ad_7f2ec9_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_index_date_add'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCatalogue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fichier', models.FileField(upload_to='imports/catalogues')),
+                ('archive_images', models.FileField(blank=True, null=True, upload_to='imports/images')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('lignes', 'Lecture des lignes'), ('images', 'Traitement des images'), ('termine', 'Terminé'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('lignes_total', models.PositiveIntegerField(default=0)),
+                ('lignes_traitees', models.PositiveIntegerField(default=0)),
+                ('crees', models.PositiveIntegerField(default=0)),
+                ('mis_a_jour', models.PositiveIntegerField(default=0)),
+                ('images_total', models.PositiveIntegerField(default=0)),
+                ('images_traitees', models.PositiveIntegerField(default=0)),
+                ('erreurs', models.JSONField(blank=True, default=list)),
+                ('message', models.TextField(blank=True)),
+                ('date_add', models.DateTimeField(auto_now_add=True)),
+                ('date_update', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Import de catalogue',
+                'verbose_name_plural': 'Imports de catalogue',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('champ', models.CharField(max_length=20)),
+                ('source', models.CharField(max_length=500)),
+                ('traitee', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='produit',
+            constraint=models.UniqueConstraint(condition=models.Q(('sku__isnull', False)), fields=('etablissement', 'sku'), name='produit_sku_unique'),
+        ),
+        migrations.AddField(
+            model_name='importimage',
+            name='import_catalogue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='shop.importcatalogue'),
+        ),
+        migrations.AddField(
+            model_name='importimage',
+            name='produit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.produit'),
+        ),
+        migrations.AddField(
+            model_name='importcatalogue',
+            name='etablissement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='shop.etablissement'),
+        ),
+        migrations.AddIndex(
+            model_name='importimage',
+            index=models.Index(fields=['import_catalogue', 'traitee'], name='shop_import_import__5c97c1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='importcatalogue',
+            index=models.Index(fields=['statut', 'date_update'], name='shop_import_statut_33c9b0_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:59
+
+import base.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0020_import_catalogue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importcatalogue',
+            name='archive_images',
+            field=models.FileField(blank=True, null=True, storage=base.storage.PrivateStorage(), upload_to='imports/images'),
+        ),
+        migrations.AlterField(
+            model_name='importcatalogue',
+            name='fichier',
+            field=models.FileField(storage=base.storage.PrivateStorage(), upload_to='imports/catalogues'),
+        ),
+    ]
@@ -1,10 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
 from django.utils.text import slugify
 import datetime
 from django.contrib.sessions.models import Session
 from django.contrib.auth.models import User
 from cities_light.models import City
 
+from base.storage import PrivateStorage
+
 
 # Create your models here.
 class CategorieEtablissement(models.Model):
@@ -89,6 +94,44 @@ class Etablissement(models.Model):
         return self.nom
 
 
+class ProduitQuerySet(models.QuerySet):
+    """
+    Mises à jour groupées du catalogue : une requête UPDATE par appel, sans
+    passer par Produit.save ni les signaux, puis une seule invalidation de
+    la version du catalogue (shop.catalogue) après validation.
+    """
+
+    def _mise_a_jour(self, **valeurs):
+        from . import catalogue
+
+        # update() ne renseigne pas les champs auto_now
+        nombre = self.update(date_update=timezone.now(), **valeurs)
+        if nombre:
+            transaction.on_commit(catalogue.invalider, using=self.db)
+        return nombre
+
+    def mettre_en_promotion(self, pourcentage, date_debut, date_fin):
+        """Prix promotionnel = prix diminué de `pourcentage` %, arrondi à l'unité."""
+        if not 0 < pourcentage < 100:
+            raise ValueError("Le pourcentage de réduction doit être compris entre 0 et 100 exclus")
+        if date_fin < date_debut:
+            raise ValueError("La fin de la promotion précède son début")
+        return self._mise_a_jour(
+            prix_promotionnel=Round(F('prix') * (100 - pourcentage) / 100),
+            date_debut_promo=date_debut,
+            date_fin_promo=date_fin,
+        )
+
+    def retirer_promotion(self):
+        return self._mise_a_jour(prix_promotionnel=0, date_debut_promo=None, date_fin_promo=None)
+
+    def definir_super_deal(self, valeur):
+        return self._mise_a_jour(super_deal=valeur)
+
+    def definir_statut(self, valeur):
+        return self._mise_a_jour(status=valeur)
+
+
 class Produit(models.Model):
     nom = models.CharField(max_length=254)
     description = models.TextField()
@@ -101,6 +144,8 @@ class Produit(models.Model):
     categorie_etab = models.ForeignKey(CategorieEtablissement, related_name="produit_etab", on_delete=models.CASCADE, null=True, blank=True)
     categorie = models.ForeignKey(CategorieProduit, related_name="produit", on_delete=models.CASCADE)
     etablissement = models.ForeignKey(Etablissement, related_name="produits", on_delete=models.CASCADE)
+    # Référence article du marchand, clé des imports de catalogue
+    sku = models.CharField(max_length=64, null=True, blank=True)
     image = models.ImageField(upload_to='produis/images', default="b-1.jpg")
     image_2 = models.ImageField(upload_to='produis/images', default="b-1.jpg")
     image_3 = models.ImageField(upload_to='produis/images', default="b-1.jpg")
@@ -111,6 +156,20 @@ class Produit(models.Model):
     status = models.BooleanField(default=True)
     slug = models.SlugField(unique=True, editable=False, null=True,  blank=True)
 
+    objects = ProduitQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['super_deal']),
+            models.Index(fields=['date_add']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['etablissement', 'sku'], condition=models.Q(sku__isnull=False), name='produit_sku_unique',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug or self.slug is None:
             self.slug = '-'.join((slugify(self.nom), slugify(datetime.datetime.now().microsecond)))
@@ -151,3 +210,70 @@ class Favorite(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.produit.nom}"
 
+
+
+class ImportCatalogue(models.Model):
+    """Import d'un fichier CSV/XLSX de produits pour un établissement, traité en arrière-plan."""
+    EN_ATTENTE = 'en_attente'
+    LIGNES = 'lignes'
+    IMAGES = 'images'
+    TERMINE = 'termine'
+    ECHEC = 'echec'
+    STATUTS = (
+        (EN_ATTENTE, 'En attente'),
+        (LIGNES, 'Lecture des lignes'),
+        (IMAGES, 'Traitement des images'),
+        (TERMINE, 'Terminé'),
+        (ECHEC, 'Échec'),
+    )
+
+    etablissement = models.ForeignKey(Etablissement, related_name="imports", on_delete=models.CASCADE)
+    # Hors de MEDIA_ROOT : les catalogues d'un marchand ne sont pas publics
+    fichier = models.FileField(upload_to="imports/catalogues", storage=PrivateStorage())
+    archive_images = models.FileField(upload_to="imports/images", storage=PrivateStorage(), null=True, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUTS, default=EN_ATTENTE)
+    lignes_total = models.PositiveIntegerField(default=0)
+    lignes_traitees = models.PositiveIntegerField(default=0)
+    crees = models.PositiveIntegerField(default=0)
+    mis_a_jour = models.PositiveIntegerField(default=0)
+    images_total = models.PositiveIntegerField(default=0)
+    images_traitees = models.PositiveIntegerField(default=0)
+    erreurs = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    date_add = models.DateTimeField(auto_now_add=True)
+    date_update = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Import de catalogue'
+        verbose_name_plural = 'Imports de catalogue'
+        indexes = [
+            models.Index(fields=['statut', 'date_update']),
+        ]
+
+    def __str__(self):
+        return "Import %s du %s" % (self.etablissement, self.date_add)
+
+    @property
+    def progression(self):
+        """Avancement en pourcentage : lignes puis images, à parts égales quand il y a des images."""
+        if self.statut == self.TERMINE:
+            return 100
+        lignes = self.lignes_traitees / self.lignes_total if self.lignes_total else 0
+        if not self.images_total:
+            return int(lignes * 100)
+        return int((lignes + self.images_traitees / self.images_total) * 50)
+
+
+class ImportImage(models.Model):
+    """Image à rattacher à un produit importé : URL à télécharger ou fichier de l'archive zip."""
+    import_catalogue = models.ForeignKey(ImportCatalogue, related_name="images", on_delete=models.CASCADE)
+    produit = models.ForeignKey(Produit, related_name="+", on_delete=models.CASCADE)
+    champ = models.CharField(max_length=20)
+    source = models.CharField(max_length=500)
+    traitee = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['import_catalogue', 'traitee']),
+        ]
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+
+from . import catalogue, models
+from .slugs import kind_for_model, registry
+
+
+def enregistrer_slug(sender, instance, created, **kwargs):
+    registry.register(kind_for_model(sender), instance.pk, instance.slug)
+    if created:
+        registry.bump_version()
+
+
+def retirer_slug(sender, instance, **kwargs):
+    registry.unregister(kind_for_model(sender), instance.pk, instance.slug)
+    registry.bump_version()
+
+
+for model in (models.CategorieProduit, models.CategorieEtablissement, models.Etablissement, models.Produit):
+    post_save.connect(enregistrer_slug, sender=model, dispatch_uid='slug_save_%s' % model.__name__)
+    post_delete.connect(retirer_slug, sender=model, dispatch_uid='slug_delete_%s' % model.__name__)
+
+
+def invalider_catalogue(sender, **kwargs):
+    catalogue.invalider()
+
+
+post_save.connect(invalider_catalogue, sender=models.Produit, dispatch_uid='catalogue_save')
+post_delete.connect(invalider_catalogue, sender=models.Produit, dispatch_uid='catalogue_delete')
@@ -0,0 +1,107 @@
+"""
+Registre des slugs servis sous /deals/<slug>.
+
+Un seul dictionnaire en mémoire associe chaque slug de catégorie, de produit
+et d'établissement à son type et à sa clé primaire. La résolution d'un slug
+est une lecture de dictionnaire : un slug inconnu (sonde de robot comprise)
+ne coûte aucune requête, la réponse négative venant de l'instantané complet.
+
+Le registre est tenu à jour dans le processus par les signaux de
+shop.signals ; une création ou une suppression incrémente aussi une version
+dans le cache Django pour que les autres workers rechargent leur instantané.
+Sans cache partagé, REGISTRE_SLUGS_TTL borne la durée de désynchronisation.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CATEGORIE_PRODUIT = 'categorie_produit'
+CATEGORIE_ETABLISSEMENT = 'categorie_etablissement'
+ETABLISSEMENT = 'etablissement'
+PRODUIT = 'produit'
+
+# Ordre de priorité quand deux objets partagent un slug (le premier gagne)
+PRIORITE = (CATEGORIE_PRODUIT, CATEGORIE_ETABLISSEMENT, ETABLISSEMENT, PRODUIT)
+
+VERSION_KEY = 'shop:slugs:version'
+
+
+def _models():
+    from . import models
+
+    return {
+        CATEGORIE_PRODUIT: models.CategorieProduit,
+        CATEGORIE_ETABLISSEMENT: models.CategorieEtablissement,
+        ETABLISSEMENT: models.Etablissement,
+        PRODUIT: models.Produit,
+    }
+
+
+def kind_for_model(model):
+    for kind, klass in _models().items():
+        if issubclass(model, klass):
+            return kind
+    return None
+
+
+class SlugRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._slugs = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _ttl(self):
+        return getattr(settings, 'REGISTRE_SLUGS_TTL', 300)
+
+    def _load(self):
+        slugs = {}
+        # Du moins prioritaire au plus prioritaire : le dernier écrit gagne
+        for kind in reversed(PRIORITE):
+            queryset = _models()[kind].objects.exclude(slug__isnull=True).exclude(slug='')
+            for pk, slug in queryset.values_list('pk', 'slug').iterator(chunk_size=5000):
+                slugs[slug] = (kind, pk)
+        return slugs
+
+    def _snapshot(self):
+        version = cache.get(VERSION_KEY)
+        if self._slugs is None or version != self._version or time.monotonic() - self._loaded_at > self._ttl():
+            with self._lock:
+                if self._slugs is None or version != self._version or time.monotonic() - self._loaded_at > self._ttl():
+                    self._slugs = self._load()
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._slugs
+
+    def resolve(self, slug):
+        """Retourne (type, pk) pour un slug, ou None s'il est inconnu."""
+        return self._snapshot().get(slug)
+
+    def register(self, kind, pk, slug):
+        if self._slugs is None or not slug:
+            return
+        current = self._slugs.get(slug)
+        if current is None or PRIORITE.index(kind) <= PRIORITE.index(current[0]):
+            self._slugs[slug] = (kind, pk)
+
+    def unregister(self, kind, pk, slug):
+        if self._slugs is not None and self._slugs.get(slug) == (kind, pk):
+            del self._slugs[slug]
+
+    def bump_version(self):
+        """Signale aux autres workers que l'ensemble des slugs a changé."""
+        version = time.time()
+        cache.set(VERSION_KEY, version, None)
+        # Ce processus est déjà à jour : pas de rechargement pour lui
+        self._version = version
+
+
+registry = SlugRegistry()
@@ -0,0 +1,160 @@
+"""Tests des actions groupées sur les produits (prix, promotions, super deals, statut)"""
+
+import datetime
+
+import pytest
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.messages import get_messages
+from django.urls import reverse
+
+from shop import catalogue
+from shop.models import Produit
+
+
+pytestmark = pytest.mark.django_db
+
+DEBUT = datetime.date.today()
+FIN = DEBUT + datetime.timedelta(days=7)
+
+
+@pytest.fixture
+def produits(produit_sans_promo, produit_avec_promo_active, produit_super_deal):
+    return [produit_sans_promo, produit_avec_promo_active, produit_super_deal]
+
+
+class TestProduitQuerySet:
+
+    @pytest.mark.unit
+    def test_promotion_en_une_requete(self, produits, django_assert_num_queries, django_capture_on_commit_callbacks):
+        """
+        Arrange: Trois produits à 5000, 6000 et 8000
+        Act: Appliquer 20 % de réduction sur tout le catalogue
+        Assert: Une seule requête UPDATE, prix promotionnels calculés, version du catalogue changée une fois
+        """
+        version = catalogue.version()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with django_assert_num_queries(1):
+                nombre = Produit.objects.all().mettre_en_promotion(20, DEBUT, FIN)
+
+        assert nombre == 3
+        assert len(callbacks) == 1
+        assert catalogue.version() != version
+        for produit in Produit.objects.all():
+            assert produit.prix_promotionnel == round(produit.prix * 0.8)
+            assert produit.check_promotion
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('pourcentage, debut, fin', [(0, DEBUT, FIN), (100, DEBUT, FIN), (10, FIN, DEBUT)])
+    def test_promotion_invalide(self, produits, pourcentage, debut, fin):
+        with pytest.raises(ValueError):
+            Produit.objects.mettre_en_promotion(pourcentage, debut, fin)
+
+    @pytest.mark.unit
+    def test_retirer_promotion_et_statut(self, produits):
+        Produit.objects.all().retirer_promotion()
+        Produit.objects.filter(pk=produits[0].pk).definir_statut(False)
+
+        assert not any(p.check_promotion for p in Produit.objects.all())
+        assert list(Produit.objects.filter(status=False)) == [produits[0]]
+
+    @pytest.mark.unit
+    def test_selection_vide_sans_invalidation(self, produits, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            assert Produit.objects.none().definir_super_deal(True) == 0
+
+        assert callbacks == []
+
+
+class TestActionsMarchand:
+
+    @pytest.mark.integration
+    def test_promotion_articles_coches(self, client, user, produits):
+        client.force_login(user)
+
+        response = client.post(reverse('actions-articles'), {
+            'action': 'promotion', 'articles': [produits[0].pk],
+            'pourcentage': 10, 'date_debut': DEBUT.isoformat(), 'date_fin': FIN.isoformat(),
+        })
+
+        assert response.status_code == 302
+        produit = Produit.objects.get(pk=produits[0].pk)
+        assert produit.prix_promotionnel == 4500
+        assert produit.date_fin_promo == FIN
+        assert Produit.objects.get(pk=produits[1].pk).prix_promotionnel == produits[1].prix_promotionnel
+
+    @pytest.mark.integration
+    def test_categorie_entiere(self, client, user, produits, categorie_produit):
+        """
+        Arrange: Un marchand dont tous les produits sont dans une catégorie
+        Act: Marquer super deal toute la catégorie
+        Assert: Tous ses produits de la catégorie sont super deals
+        """
+        client.force_login(user)
+
+        client.post(reverse('actions-articles'), {'action': 'super_deal', 'categorie': categorie_produit.pk})
+
+        assert Produit.objects.filter(super_deal=True).count() == 3
+
+    @pytest.mark.integration
+    def test_formulaire_promotion_invalide(self, client, user, produits):
+        client.force_login(user)
+
+        client.post(reverse('actions-articles'), {'action': 'promotion', 'articles': [produits[0].pk], 'pourcentage': 150})
+
+        assert Produit.objects.get(pk=produits[0].pk).prix_promotionnel == 0
+
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize('selection', [
+        {'categorie': 'abc'},
+        {'categorie': '1 OR 1=1'},
+        {'categorie': str(2 ** 70)},
+        {'articles': ['1', 'x']},
+        {'articles': ['-3']},
+        {'articles': [str(2 ** 70)]},
+    ])
+    def test_selection_invalide(self, client, user, produits, selection):
+        """
+        Arrange: Une catégorie ou des articles qui ne sont pas des clés entières
+        Act: Lancer une action groupée
+        Assert: Redirection avec un message d'erreur, aucun article modifié (pas d'erreur 500)
+        """
+        client.force_login(user)
+
+        response = client.post(reverse('actions-articles'), {'action': 'super_deal', **selection})
+
+        assert response.status_code == 302
+        assert [m.level_tag for m in get_messages(response.wsgi_request)] == ['error']
+        assert Produit.objects.filter(super_deal=True).count() == 1
+
+
+class TestActionsAdmin:
+
+    URL = reverse('admin:shop_produit_changelist')
+
+    @pytest.mark.integration
+    def test_desactiver(self, admin_client, produits):
+        admin_client.post(self.URL, {'action': 'desactiver', ACTION_CHECKBOX_NAME: [produits[0].pk, produits[1].pk]})
+
+        assert Produit.objects.filter(status=False).count() == 2
+
+    @pytest.mark.integration
+    def test_promotion_page_intermediaire(self, admin_client, produits):
+        """
+        Arrange: Deux produits cochés dans la liste
+        Act: Choisir l'action de promotion, puis valider le formulaire intermédiaire
+        Assert: Le formulaire s'affiche d'abord, la promotion est appliquée ensuite
+        """
+        selection = {'action': 'mettre_en_promotion', ACTION_CHECKBOX_NAME: [produits[0].pk, produits[1].pk]}
+
+        formulaire = admin_client.post(self.URL, selection)
+        assert formulaire.status_code == 200
+        assert 'pourcentage' in formulaire.content.decode()
+
+        admin_client.post(self.URL, {
+            **selection, 'appliquer': '1',
+            'pourcentage': 50, 'date_debut': DEBUT.isoformat(), 'date_fin': FIN.isoformat(),
+        })
+        assert Produit.objects.get(pk=produits[0].pk).prix_promotionnel == 2500
+        assert Produit.objects.get(pk=produits[2].pk).prix_promotionnel == produits[2].prix_promotionnel
@@ -0,0 +1,193 @@
+"""Tests des exports CSV/XLSX des commandes et des lignes de commande"""
+
+import csv
+import datetime
+import io
+import itertools
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+
+from base.exports import FluxAsynchrone
+
+from customer.models import Commande, ProduitPanier
+from shop import exports, views
+
+
+pytestmark = pytest.mark.django_db
+
+
+async def contenu_asynchrone(response):
+    return b''.join([part async for part in response])
+
+
+def lire_csv(response, contenu=None):
+    contenu = (contenu or b''.join(response.streaming_content)).decode('utf-8')
+    assert contenu.startswith('\ufeff')
+    return list(csv.reader(io.StringIO(contenu[1:]), delimiter=';'))
+
+
+@pytest.fixture
+def commandes(customer, produit_sans_promo, produit_super_deal):
+    """Une commande payée de deux articles, une en attente d'un article"""
+    payee = Commande.objects.create(customer=customer, prix_total=18000, status=True, transaction_id='TX-1')
+    attente = Commande.objects.create(customer=customer, prix_total=5000, status=False)
+    ProduitPanier.objects.create(commande=payee, produit=produit_sans_promo, quantite=2)
+    ProduitPanier.objects.create(commande=payee, produit=produit_super_deal, quantite=1)
+    ProduitPanier.objects.create(commande=attente, produit=produit_sans_promo, quantite=1)
+    return payee, attente
+
+
+class TestFiltrerCommandes:
+
+    @pytest.mark.unit
+    def test_filtres(self, etablissement, commandes):
+        payee, attente = commandes
+
+        assert list(exports.filtrer_commandes(etablissement, {})) == [attente, payee]
+        assert list(exports.filtrer_commandes(etablissement, {'status': 'payée'})) == [payee]
+        assert list(exports.filtrer_commandes(etablissement, {'produit': 'inexistant'})) == []
+        aujourd_hui = datetime.date.today().isoformat()
+        assert len(exports.filtrer_commandes(etablissement, {'date_min': aujourd_hui, 'date_max': aujourd_hui})) == 2
+
+    @pytest.mark.unit
+    def test_date_invalide_ignoree(self, etablissement, commandes):
+        assert len(exports.filtrer_commandes(etablissement, {'date_max': 'hier'})) == 2
+
+
+class TestExportMarchand:
+
+    @pytest.mark.integration
+    def test_csv_commandes_filtre(self, client, user, commandes):
+        """
+        Arrange: Un marchand connecté avec une commande payée et une en attente
+        Act: Exporter en CSV les commandes payées
+        Assert: Réponse en flux, une ligne d'en-tête et la seule commande payée
+        """
+        client.force_login(user)
+
+        response = client.get(reverse('export-commandes'), {'status': 'payée'})
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert 'attachment; filename="commandes-' in response['Content-Disposition']
+        rangees = lire_csv(response)
+        assert rangees[0] == exports.COLONNES_COMMANDES
+        assert len(rangees) == 2
+        assert rangees[1][0] == str(commandes[0].pk)
+        assert rangees[1][5:] == ['Payée', '18000.0', 'TX-1']
+
+    @pytest.mark.integration
+    def test_csv_lignes(self, client, user, commandes):
+        client.force_login(user)
+
+        response = client.get(reverse('export-commandes'), {'contenu': 'lignes'})
+
+        rangees = lire_csv(response)
+        assert len(rangees) == 4
+        assert sorted(rangee[5] for rangee in rangees[1:]).count('Attiéké Poisson') == 2
+        assert ['2', '10000.0'] in [rangee[8:] for rangee in rangees[1:]]
+
+    @pytest.mark.integration
+    def test_requetes_constantes(self, client, user, commandes, django_assert_max_num_queries):
+        """Les jointures évitent une requête par ligne exportée"""
+        client.force_login(user)
+
+        with django_assert_max_num_queries(6):
+            lire_csv(client.get(reverse('export-commandes'), {'contenu': 'lignes'}))
+
+    @pytest.mark.integration
+    def test_xlsx(self, client, user, commandes):
+        openpyxl = pytest.importorskip('openpyxl')
+        client.force_login(user)
+
+        response = client.get(reverse('export-commandes'), {'format': 'xlsx'})
+
+        feuille = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rangees = list(feuille.iter_rows(values_only=True))
+        assert list(rangees[0]) == exports.COLONNES_COMMANDES
+        assert len(rangees) == 3
+        assert isinstance(rangees[1][1], datetime.datetime)
+
+    @pytest.mark.integration
+    def test_format_inconnu(self, client, user, etablissement):
+        client.force_login(user)
+
+        assert client.get(reverse('export-commandes'), {'format': 'pdf'}).status_code == 404
+
+
+def requete_asgi(user, **parametres):
+    request = AsyncRequestFactory().get(reverse('export-commandes'), parametres)
+    request.user = user
+    return request
+
+
+class TestExportAsgi:
+
+    @pytest.mark.integration
+    def test_csv_en_flux_asynchrone(self, user, commandes):
+        """
+        Arrange: Un marchand connecté, requête servie par ASGI
+        Act: Exporter les lignes de commande en CSV
+        Assert: La réponse est un flux asynchrone (pas de lecture d'un seul tenant) au contenu complet
+        """
+        response = views.export_commandes(requete_asgi(user, contenu='lignes'))
+
+        assert response.status_code == 200
+        assert response.is_async
+        rangees = lire_csv(response, async_to_sync(contenu_asynchrone)(response))
+        response.close()
+        assert rangees[0] == exports.COLONNES_LIGNES
+        assert len(rangees) == 4
+
+    @pytest.mark.integration
+    def test_xlsx_en_flux_asynchrone(self, user, commandes):
+        openpyxl = pytest.importorskip('openpyxl')
+
+        response = views.export_commandes(requete_asgi(user, format='xlsx'))
+
+        assert response.is_async
+        contenu = async_to_sync(contenu_asynchrone)(response)
+        response.close()
+        assert int(response['Content-Length']) == len(contenu)
+        assert len(list(openpyxl.load_workbook(io.BytesIO(contenu)).active.iter_rows())) == 3
+
+    @pytest.mark.unit
+    def test_lecture_par_blocs(self):
+        """Un itérateur sans fin est servi bloc par bloc, et fermé avec la réponse"""
+        lignes = ('%d\n' % n for n in itertools.count())
+        flux = FluxAsynchrone(lignes, taille=3)
+
+        async def premier_bloc():
+            async for bloc in flux:
+                return bloc
+
+        assert async_to_sync(premier_bloc)() == '0\n1\n2\n'
+        flux.close()
+        assert next(lignes, None) is None
+
+
+class TestExportAdmin:
+
+    @pytest.mark.integration
+    def test_action_export_csv(self, admin_client, commandes):
+        response = admin_client.post(reverse('admin:customer_commande_changelist'), {
+            'action': 'exporter_csv',
+            ACTION_CHECKBOX_NAME: [commande.pk for commande in commandes],
+        })
+
+        assert response.status_code == 200
+        assert len(lire_csv(response)) == 3
+
+    @pytest.mark.integration
+    def test_action_export_lignes_sans_paniers(self, admin_client, commandes, produit_panier):
+        """Les lignes encore dans un panier ne figurent pas dans l'export"""
+        response = admin_client.post(reverse('admin:customer_produitpanier_changelist'), {
+            'action': 'exporter_csv',
+            ACTION_CHECKBOX_NAME: list(ProduitPanier.objects.values_list('pk', flat=True)),
+        })
+
+        assert len(lire_csv(response)) == 4
@@ -0,0 +1,346 @@
+"""Tests de l'import de catalogue CSV/XLSX (création et mise à jour par SKU, erreurs, images, progression)"""
+
+import io
+import socket
+import zipfile
+from contextlib import contextmanager
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from urllib3.util import connection as urllib3_connection
+
+from shop import imports
+from shop.models import Etablissement, ImportCatalogue, Produit
+
+
+pytestmark = pytest.mark.django_db
+
+
+def fichier_csv(*lignes, separateur=';'):
+    return '\n'.join(separateur.join(ligne) for ligne in lignes).encode('utf-8')
+
+
+def image_png():
+    tampon = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(tampon, 'PNG')
+    return tampon.getvalue()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / 'media'
+    settings.PRIVATE_MEDIA_ROOT = tmp_path / 'private'
+    return settings.MEDIA_ROOT
+
+
+@pytest.fixture
+def creer_import(etablissement, media_root):
+    def creer(contenu, nom='catalogue.csv', archive=None):
+        import_ = ImportCatalogue(etablissement=etablissement)
+        import_.fichier.save(nom, ContentFile(contenu), save=False)
+        if archive is not None:
+            import_.archive_images.save('images.zip', ContentFile(archive), save=False)
+        import_.save()
+        return import_
+    return creer
+
+
+class TestImportLignes:
+
+    @pytest.mark.integration
+    def test_creation_et_mise_a_jour_par_sku(self, creer_import, produit_sans_promo, categorie_produit):
+        """
+        Arrange: Un produit existant de SKU A1 et un CSV qui le modifie et en ajoute deux autres
+        Act: Exécuter l'import
+        Assert: A1 mis à jour sans changer de slug, deux produits créés, import terminé
+        """
+        Produit.objects.filter(pk=produit_sans_promo.pk).update(sku='A1')
+        slug = produit_sans_promo.slug
+        import_ = creer_import(fichier_csv(
+            ('SKU', 'Nom', 'Prix', 'Catégorie', 'Quantité', 'Super deal'),
+            ('A1', 'Attiéké Poisson XL', '5 500', categorie_produit.nom, '10', 'oui'),
+            ('B2', 'Garba', '1500,50', categorie_produit.slug, '', 'non'),
+            ('C3', 'Alloco', '1000', str(categorie_produit.pk), '3', ''),
+        ))
+
+        imports.executer(import_.pk)
+
+        import_.refresh_from_db()
+        assert import_.statut == ImportCatalogue.TERMINE
+        assert (import_.crees, import_.mis_a_jour, import_.lignes_traitees) == (2, 1, 3)
+        assert import_.erreurs == []
+        assert import_.progression == 100
+        existant = Produit.objects.get(pk=produit_sans_promo.pk)
+        assert (existant.nom, existant.prix, existant.quantite, existant.super_deal) == ('Attiéké Poisson XL', 5500, 10, True)
+        assert existant.slug == slug
+        garba = Produit.objects.get(etablissement=import_.etablissement, sku='B2')
+        assert garba.prix == 1500.5 and garba.quantite is None
+        assert garba.slug and garba.categorie_etab == import_.etablissement.categorie
+
+    @pytest.mark.integration
+    def test_reimport_idempotent(self, creer_import, categorie_produit):
+        contenu = fichier_csv(('sku', 'nom', 'prix', 'categorie'), ('A1', 'Garba', '1500', categorie_produit.nom))
+
+        imports.executer(creer_import(contenu).pk)
+        second = creer_import(contenu)
+        imports.executer(second.pk)
+
+        second.refresh_from_db()
+        assert (second.crees, second.mis_a_jour) == (0, 1)
+        assert Produit.objects.filter(sku='A1').count() == 1
+
+    @pytest.mark.integration
+    def test_lignes_invalides(self, creer_import, categorie_produit):
+        """
+        Arrange: Un CSV à virgules dont trois lignes sont invalides
+        Act: Exécuter l'import
+        Assert: Les lignes valides sont importées, chaque erreur porte son numéro de ligne
+        """
+        import_ = creer_import(fichier_csv(
+            ('sku', 'nom', 'prix', 'categorie'),
+            ('A1', 'Garba', '1500', categorie_produit.nom),
+            ('', 'Sans sku', '100', categorie_produit.nom),
+            ('B2', 'Alloco', 'gratuit', categorie_produit.nom),
+            ('C3', 'Placali', '900', 'inconnue'),
+            separateur=',',
+        ))
+
+        imports.executer(import_.pk)
+
+        import_.refresh_from_db()
+        assert import_.statut == ImportCatalogue.TERMINE
+        assert import_.crees == 1
+        assert [erreur['ligne'] for erreur in import_.erreurs] == [3, 4, 5]
+        assert list(Produit.objects.filter(sku__isnull=False).values_list('sku', flat=True)) == ['A1']
+
+    @pytest.mark.integration
+    def test_colonnes_manquantes(self, creer_import):
+        import_ = creer_import(fichier_csv(('sku', 'nom'), ('A1', 'Garba')))
+
+        imports.executer(import_.pk)
+
+        import_.refresh_from_db()
+        assert import_.statut == ImportCatalogue.ECHEC
+        assert 'prix' in import_.message and 'categorie' in import_.message
+
+    @pytest.mark.integration
+    def test_xlsx(self, creer_import, categorie_produit):
+        openpyxl = pytest.importorskip('openpyxl')
+        classeur = openpyxl.Workbook()
+        feuille = classeur.active
+        feuille.append(['sku', 'nom', 'prix', 'categorie', 'quantite'])
+        feuille.append(['X1', 'Kedjenou', 4500, categorie_produit.nom, 7])
+        tampon = io.BytesIO()
+        classeur.save(tampon)
+
+        import_ = creer_import(tampon.getvalue(), nom='catalogue.xlsx')
+        imports.executer(import_.pk)
+
+        produit = Produit.objects.get(sku='X1')
+        assert (produit.nom, produit.prix, produit.quantite) == ('Kedjenou', 4500, 7)
+
+    @pytest.mark.integration
+    def test_import_deja_reserve(self, creer_import, categorie_produit):
+        """Un import en cours et récent n'est pas repris par un second processus"""
+        import_ = creer_import(fichier_csv(('sku', 'nom', 'prix', 'categorie'), ('A1', 'Garba', '1500', categorie_produit.nom)))
+
+        assert imports.reserver(import_.pk)
+        assert not imports.reserver(import_.pk)
+
+
+class TestImportImages:
+
+    @pytest.mark.integration
+    def test_images_de_l_archive(self, creer_import, categorie_produit, media_root):
+        """
+        Arrange: Un CSV référençant une image présente dans l'archive zip et une absente
+        Act: Exécuter l'import
+        Assert: L'image présente est stockée et rattachée, l'absente est signalée
+        """
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_:
+            zip_.writestr('photos/garba.png', image_png())
+        import_ = creer_import(fichier_csv(
+            ('sku', 'nom', 'prix', 'categorie', 'image', 'image_2'),
+            ('A1', 'Garba', '1500', categorie_produit.nom, 'garba.png', 'absente.png'),
+        ), archive=archive.getvalue())
+
+        imports.executer(import_.pk)
+
+        import_.refresh_from_db()
+        produit = Produit.objects.get(sku='A1')
+        assert import_.statut == ImportCatalogue.TERMINE
+        assert (import_.images_total, import_.images_traitees) == (2, 2)
+        assert produit.image.name.startswith('produis/images/') and produit.image.name.endswith('.png')
+        assert produit.image.read() == image_png()
+        assert produit.image_2.name == 'b-1.jpg'
+        assert len(import_.erreurs) == 1 and 'absente.png' in import_.erreurs[0]['message']
+
+
+class TestVuesImport:
+
+    @pytest.mark.integration
+    def test_envoi_et_progression(self, client, user, etablissement, categorie_produit, media_root, settings, django_capture_on_commit_callbacks):
+        """
+        Arrange: Un marchand connecté, traitement synchrone
+        Act: Envoyer un CSV puis interroger la progression
+        Assert: Redirection vers le détail, import terminé, JSON de progression complet
+        """
+        settings.IMPORT_CATALOGUE_ARRIERE_PLAN = False
+        client.force_login(user)
+        fichier = SimpleUploadedFile('catalogue.csv', fichier_csv(
+            ('sku', 'nom', 'prix', 'categorie'), ('A1', 'Garba', '1500', categorie_produit.nom)))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(reverse('import-catalogue'), {'fichier': fichier})
+
+        import_ = ImportCatalogue.objects.get()
+        assert response.status_code == 302
+        assert response.url == reverse('import-catalogue-detail', args=[import_.id])
+        data = client.get(reverse('import-catalogue-statut', args=[import_.id])).json()
+        assert data['statut'] == ImportCatalogue.TERMINE
+        assert data['termine'] and data['progression'] == 100
+        assert data['crees'] == 1 and data['erreurs'] == []
+        assert client.get(response.url).status_code == 200
+
+    @pytest.mark.integration
+    def test_fichier_envoye_non_public(self, client, user, etablissement, media_root, settings):
+        """
+        Arrange: Un marchand connecté
+        Act: Envoyer un catalogue puis le demander sous /media/
+        Assert: Le fichier est rangé hors de MEDIA_ROOT et n'est pas servi
+        """
+        client.force_login(user)
+        fichier = SimpleUploadedFile('catalogue.csv', b'sku;nom;prix;categorie\n')
+
+        client.post(reverse('import-catalogue'), {'fichier': fichier})
+
+        import_ = ImportCatalogue.objects.get()
+        assert (settings.PRIVATE_MEDIA_ROOT / import_.fichier.name).is_file()
+        assert not (media_root / import_.fichier.name).exists()
+        assert client.get('/media/' + import_.fichier.name).status_code == 404
+
+    @pytest.mark.integration
+    def test_extension_refusee(self, client, user, etablissement, media_root):
+        client.force_login(user)
+
+        response = client.post(reverse('import-catalogue'), {'fichier': SimpleUploadedFile('catalogue.pdf', b'%PDF')})
+
+        assert response.status_code == 302
+        assert not ImportCatalogue.objects.exists()
+
+    @pytest.mark.integration
+    def test_import_d_un_autre_etablissement(self, client, another_user, creer_import, categorie_etablissement):
+        Etablissement.objects.create(
+            user=another_user, nom="Autre", description="", nom_du_responsable="Kone", prenoms_duresponsable="Awa", logo="l.jpg", couverture="c.jpg",
+            categorie=categorie_etablissement, adresse="", pays="", contact_1="", email="autre@example.com")
+        import_ = creer_import(b'sku;nom;prix;categorie\n')
+        client.force_login(another_user)
+
+        assert client.get(reverse('import-catalogue-statut', args=[import_.id])).status_code == 404
+
+
+class TestTelechargement:
+
+    @pytest.fixture
+    def resolution(self, monkeypatch):
+        """public.example résout vers une adresse publique, le reste normalement"""
+        getaddrinfo = imports.socket.getaddrinfo
+
+        def resoudre(hote, *args, **kwargs):
+            if hote == 'public.example':
+                return [(imports.socket.AF_INET, imports.socket.SOCK_STREAM, 6, '', ('93.184.216.34', 80))]
+            return getaddrinfo(hote, *args, **kwargs)
+        monkeypatch.setattr(imports.socket, 'getaddrinfo', resoudre)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('url', [
+        'http://127.0.0.1:8000/admin/', 'http://localhost/', 'http://169.254.169.254/latest/meta-data/',
+        'http://10.0.0.5/', 'http://[::1]/', 'file:///etc/passwd',
+    ])
+    def test_adresses_internes_refusees(self, url, monkeypatch):
+        monkeypatch.setattr(imports, 'requete_epinglee', lambda *a, **k: pytest.fail("requête émise"))
+
+        with pytest.raises(imports.ImageRefusee):
+            imports.telecharger(url)
+
+    @pytest.mark.unit
+    def test_redirection_vers_une_adresse_interne(self, resolution, monkeypatch):
+        """
+        Arrange: Un hôte public qui redirige vers les métadonnées du cloud
+        Act: Télécharger l'image
+        Assert: La redirection n'est pas suivie
+        """
+        demandees = []
+
+        class Redirection:
+            is_redirect = True
+            headers = {'location': 'http://169.254.169.254/latest/meta-data/'}
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+        def requete_epinglee(url, adresse):
+            demandees.append((url, adresse))
+            return Redirection()
+        monkeypatch.setattr(imports, 'requete_epinglee', requete_epinglee)
+
+        with pytest.raises(imports.ImageRefusee):
+            imports.telecharger('http://public.example/image.png')
+
+        assert demandees == [('http://public.example/image.png', '93.184.216.34')]
+
+    @pytest.mark.unit
+    def test_message_generique(self, resolution, monkeypatch):
+        """Le détail d'une erreur réseau n'est pas renvoyé au marchand"""
+        @contextmanager
+        def requete_epinglee(url, adresse):
+            raise imports.requests.ConnectionError("Connection refused: 10.0.0.5:6379")
+            yield
+        monkeypatch.setattr(imports, 'requete_epinglee', requete_epinglee)
+        image = imports.ImportImage(source='http://public.example/image.png')
+
+        assert imports.charger_image(image, None, None) == (image, None, "image inaccessible")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('url, hote', [
+        ('http://rebind.example/image.png', 'rebind.example'),
+        ('https://rebind.example:8443/image.png', 'rebind.example:8443'),
+    ])
+    def test_dns_rebinding(self, monkeypatch, url, hote):
+        """
+        Arrange: Un nom qui résout d'abord vers une adresse publique, puis vers la boucle locale
+        Act: Télécharger l'image
+        Assert: La connexion vise l'adresse vérifiée, sans seconde résolution du nom,
+                avec l'en-tête Host d'origine
+        """
+        reponses = iter(['93.184.216.34', '127.0.0.1', '127.0.0.1'])
+        getaddrinfo = socket.getaddrinfo
+
+        def resoudre(nom, *args, **kwargs):
+            if nom == 'rebind.example':
+                return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (next(reponses), 80))]
+            return getaddrinfo(nom, *args, **kwargs)
+        monkeypatch.setattr(socket, 'getaddrinfo', resoudre)
+        connexions, entetes = [], []
+
+        def create_connection(adresse, *args, **kwargs):
+            connexions.append(adresse[0])
+            raise ConnectionRefusedError("pas de réseau dans les tests")
+        monkeypatch.setattr(urllib3_connection, 'create_connection', create_connection)
+        envoyer = imports.requests.Session.send
+        monkeypatch.setattr(imports.requests.Session, 'send',
+                            lambda session, requete, **kw: entetes.append(requete.headers['Host']) or envoyer(
+                                session, requete, **kw))
+
+        with pytest.raises(imports.requests.ConnectionError):
+            imports.telecharger(url)
+
+        assert connexions == ['93.184.216.34']
+        assert entetes == [hote]
@@ -0,0 +1,94 @@
+"""Tests du registre de slugs et de la vue /deals/<slug>"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop import slugs
+from shop.slugs import registry
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def registre_vide():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+class TestSlugRegistry:
+
+    @pytest.mark.unit
+    def test_resolution_des_quatre_types(self, categorie_produit, etablissement, produit_sans_promo):
+        """Catégories, établissements et produits sont résolus depuis le même registre"""
+        assert registry.resolve(categorie_produit.slug) == (slugs.CATEGORIE_PRODUIT, categorie_produit.pk)
+        categorie_etab = categorie_produit.categorie
+        assert registry.resolve(categorie_etab.slug) == (slugs.CATEGORIE_ETABLISSEMENT, categorie_etab.pk)
+        assert registry.resolve(etablissement.slug) == (slugs.ETABLISSEMENT, etablissement.pk)
+        assert registry.resolve(produit_sans_promo.slug) == (slugs.PRODUIT, produit_sans_promo.pk)
+
+    @pytest.mark.unit
+    def test_slug_inconnu_sans_requete(self, categorie_produit):
+        """
+        Arrange: Un registre déjà chargé
+        Act: Résoudre un slug inconnu
+        Assert: Aucune requête SQL n'est émise
+        """
+        registry.resolve(categorie_produit.slug)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = registry.resolve('wp-login.php')
+
+        assert result is None
+        assert len(ctx.captured_queries) == 0
+
+    @pytest.mark.unit
+    def test_creation_et_suppression_synchronisees(self, produit_sans_promo, categorie_produit, etablissement):
+        """Le registre suit les signaux post_save / post_delete"""
+        registry.resolve(produit_sans_promo.slug)
+        produit = produit_sans_promo.__class__.objects.create(
+            nom="Alloco", description="Alloco", description_deal="Deal", prix=1500,
+            categorie=categorie_produit, etablissement=etablissement,
+        )
+
+        assert registry.resolve(produit.slug) == (slugs.PRODUIT, produit.pk)
+
+        slug = produit.slug
+        produit.delete()
+
+        assert registry.resolve(slug) is None
+
+
+class TestSingleView:
+
+    @pytest.mark.integration
+    def test_categorie_produit(self, client, categorie_produit, produit_sans_promo):
+        response = client.get(reverse('categorie', args=[categorie_produit.slug]))
+
+        assert response.status_code == 200
+        assert response.context['categorie'] == categorie_produit
+        assert list(response.context['produits']) == [produit_sans_promo]
+
+    @pytest.mark.integration
+    def test_etablissement(self, client, etablissement, produit_sans_promo):
+        response = client.get(reverse('categorie', args=[etablissement.slug]))
+
+        assert response.status_code == 200
+        assert list(response.context['produits']) == [produit_sans_promo]
+
+    @pytest.mark.integration
+    def test_produit_redirige_vers_la_fiche(self, client, produit_sans_promo):
+        response = client.get(reverse('categorie', args=[produit_sans_promo.slug]))
+
+        assert response.status_code == 302
+        assert response.url == reverse('product_detail', args=[produit_sans_promo.slug])
+
+    @pytest.mark.integration
+    def test_slug_inconnu_redirige(self, client, db):
+        response = client.get(reverse('categorie', args=['inconnu']))
+
+        assert response.status_code == 302
+        assert response.url == reverse('shop')
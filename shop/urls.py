@@ -10,13 +10,19 @@ urlpatterns = [
     path('<str:slug>', views.single, name="categorie"),
     path('paiement/success', views.paiement_success, name="paiement_success"),
     path('paiement/details', views.post_paiement_details, name="paiement_detail"),
+    path('paiement/notification', views.notification_paiement, name="notification-paiement"),
     path('toggle_favorite/<int:produit_id>/', views.toggle_favorite, name='toggle_favorite'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('ajout-article/', views.ajout_article, name='ajout-article'),
     path('article-detail/', views.article_detail, name='article-detail'),
+    path('articles/actions/', views.actions_articles, name='actions-articles'),
+    path('import-catalogue/', views.import_catalogue, name='import-catalogue'),
+    path('import-catalogue/<int:import_id>/', views.import_catalogue_detail, name='import-catalogue-detail'),
+    path('import-catalogue/<int:import_id>/statut', views.import_catalogue_statut, name='import-catalogue-statut'),
     path('modifier-article/<int:article_id>/', views.modifier_article, name='modifier'),
     path('supprimer-article/<int:article_id>/', views.supprimer_article, name='supprimer-article'),
     path('commande-reçu/', views.commande_reçu, name='commande-reçu'),
+    path('commande-reçu/export/', views.export_commandes, name='export-commandes'),
     path('commande-reçu-detail/<int:commande_id>/', views.commande_reçu_detail, name='commande-reçu-detail'),
     path('etablissement-parametre/', views.etablissement_parametre, name='etablissement-parametre'),
 ]
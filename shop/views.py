@@ -1,16 +1,25 @@
 from django.shortcuts import redirect, render,  get_object_or_404
+from django.urls import reverse
 from . import models
+from . import slugs
+from .slugs import registry as slug_registry
 from customer import models as customer_models
 from django.contrib.auth.decorators import login_required
 import json
-from django.http import JsonResponse
+import os
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from cinetpay_sdk.s_d_k import Cinetpay
 from cities_light.models import City
 
 from django.contrib import messages
-from .models import Produit, Favorite, Etablissement, CategorieProduit
+from .models import Produit, Favorite, Etablissement, CategorieProduit, ImportCatalogue
+from .forms import PromotionForm, SelectionArticlesForm
+from . import imports
+from . import exports
+from base import exports as base_exports
 from customer.models import Commande
+from customer import paiements
+from base.metrics import ORDERS
 
 from django.core.paginator import Paginator
 from django.utils import timezone
@@ -84,14 +93,23 @@ def paiement_success(request):
 
 
 def single(request, slug):
-    try:
-        try:
-            categorie = models.CategorieProduit.objects.get(slug=slug)
-            produits = categorie.produit.all()
-        except:
-            categorie = models.CategorieEtablissement.objects.get(slug=slug)
-            produits = categorie.produit_etab.all()
-    except:
+    entry = slug_registry.resolve(slug)
+    if entry is None:
+        return redirect('shop')
+
+    kind, pk = entry
+    if kind == slugs.PRODUIT:
+        return redirect('product_detail', slug=slug)
+    if kind == slugs.CATEGORIE_PRODUIT:
+        categorie = models.CategorieProduit.objects.filter(pk=pk).first()
+        produits = categorie.produit.all() if categorie else None
+    elif kind == slugs.CATEGORIE_ETABLISSEMENT:
+        categorie = models.CategorieEtablissement.objects.filter(pk=pk).first()
+        produits = categorie.produit_etab.all() if categorie else None
+    else:
+        categorie = models.Etablissement.objects.filter(pk=pk).first()
+        produits = categorie.produits.all() if categorie else None
+    if categorie is None:
         return redirect('shop')
 
     datas = {
@@ -104,7 +122,8 @@ def single(request, slug):
 def post_paiement_details(request):
 
     postdata = json.loads(request.body.decode('utf-8'))
-    transaction_id = postdata['transaction_id']
+    # Jamais l'identifiant proposé par le navigateur : il désigne la commande payée
+    transaction_id = paiements.nouvel_identifiant()
     notify_url = postdata['notify_url']
     return_url = postdata['return_url']
     panier = postdata['panier']
@@ -114,7 +133,7 @@ def post_paiement_details(request):
     isSuccess = False
 
     _ = isSuccess
-    if user and panier is not None and transaction_id is not None and notify_url is not None and return_url is not None :
+    if user and panier is not None and notify_url is not None and return_url is not None :
         try:
             panier = customer_models.Panier.objects.get(id=panier, customer=user.customer)
         except:
@@ -122,12 +141,13 @@ def post_paiement_details(request):
 
         if panier:
             data = {
-                'amount': 100,
+                'amount': round(panier.total_with_coupon),
                 'currency': "XOF",
                 'transaction_id': transaction_id,
                 'description': "TRANSACTION DESCRIPTION",
-                'return_url': notify_url,
-                'notify_url': return_url,
+                'return_url': return_url,
+                # Le statut du paiement n'est connu que par la notification serveur à serveur
+                'notify_url': request.build_absolute_uri(reverse('notification-paiement')),
                 'customer_name': user.first_name,
                 'customer_surname': user.last_name,
             }
@@ -142,6 +162,9 @@ def post_paiement_details(request):
                 commande.api_response_id = 'api_response_id'
                 commande.payment_token = 'payment_token'
                 commande.prix_total = panier.total_with_coupon
+                # Validée à la réception de la notification CinetPay (customer.paiements)
+                commande.status = False
+                commande.statut_paiement = customer_models.Commande.PAIEMENT_EN_ATTENTE
                 commande.save()
 
                 for i in customer_models.ProduitPanier.objects.filter(panier=panier):
@@ -151,8 +174,10 @@ def post_paiement_details(request):
                 isSuccess = True
                 message = "Commande validée"
                 panier.delete()
+                ORDERS.labels('created').inc()
 
             except Exception as _:
+                ORDERS.labels('failed').inc()
                 isSuccess = False
                 message = "Une erreur s'est produite, merci de rééssayer"
         else:
@@ -164,11 +189,33 @@ def post_paiement_details(request):
     data = {
         'message': message,
         'success': isSuccess,
-        'payment_url' : url
+        'payment_url' : url,
+        'transaction_id': transaction_id if isSuccess else None,
     }
     return JsonResponse(data, safe=False)
 
 
+@csrf_exempt
+def notification_paiement(request):
+    """
+    Notification serveur à serveur de CinetPay : jeton x-token vérifié, un INSERT,
+    réponse immédiate ; la commande est mise à jour hors requête (customer.paiements).
+    """
+    if request.method != "POST":
+        # CinetPay vérifie la disponibilité de l'URL par un GET
+        return HttpResponse(status=200)
+
+    donnees = request.POST.dict()
+    transaction_id = donnees.get('cpm_trans_id', '')
+    if not transaction_id or not paiements.jeton_valide(donnees, request.headers.get('x-token')):
+        return HttpResponse(status=403)
+
+    notification = customer_models.NotificationPaiement.objects.create(
+        transaction_id=transaction_id[:100], donnees=donnees)
+    paiements.lancer(notification)
+    return HttpResponse(status=200)
+
+
 @login_required
 def dashboard(request):
     
@@ -270,6 +317,100 @@ def article_detail(request):
     })
 
 
+@login_required
+def actions_articles(request):
+    """
+    Actions groupées du marchand sur ses articles cochés, ou sur toute une catégorie :
+    une requête UPDATE par action (voir ProduitQuerySet).
+    """
+    etablissement = get_object_or_404(Etablissement, user=request.user)
+    if request.method != "POST":
+        return redirect("article-detail")
+
+    selection = SelectionArticlesForm(request.POST)
+    if not selection.is_valid():
+        for erreurs in selection.errors.values():
+            messages.error(request, " ".join(erreurs))
+        return redirect("article-detail")
+    articles = selection.filtrer(Produit.objects.filter(etablissement=etablissement))
+
+    action = request.POST.get("action")
+    if action == "promotion":
+        form = PromotionForm(request.POST)
+        if not form.is_valid():
+            for erreurs in form.errors.values():
+                messages.error(request, " ".join(erreurs))
+            return redirect("article-detail")
+        nombre = form.appliquer(articles)
+    elif action == "retirer_promotion":
+        nombre = articles.retirer_promotion()
+    elif action in ("super_deal", "retirer_super_deal"):
+        nombre = articles.definir_super_deal(action == "super_deal")
+    elif action in ("activer", "desactiver"):
+        nombre = articles.definir_statut(action == "activer")
+    else:
+        messages.error(request, "Action inconnue")
+        return redirect("article-detail")
+
+    messages.success(request, "%d article(s) mis à jour" % nombre)
+    return redirect("article-detail")
+
+
+@login_required
+def import_catalogue(request):
+    """Envoi d'un fichier CSV/XLSX de produits (et d'une archive zip d'images) ; traitement en arrière-plan."""
+    etablissement = get_object_or_404(Etablissement, user=request.user)
+
+    if request.method == "POST":
+        fichier = request.FILES.get("fichier")
+        archive = request.FILES.get("archive_images")
+        if not fichier or os.path.splitext(fichier.name)[1].lower() not in ('.csv', '.xlsx'):
+            messages.error(request, "Merci de choisir un fichier CSV ou XLSX.")
+            return redirect("import-catalogue")
+        if archive and os.path.splitext(archive.name)[1].lower() != '.zip':
+            messages.error(request, "Les images doivent être envoyées dans une archive zip.")
+            return redirect("import-catalogue")
+
+        import_ = ImportCatalogue.objects.create(etablissement=etablissement, fichier=fichier, archive_images=archive)
+        imports.lancer(import_)
+        return redirect("import-catalogue-detail", import_id=import_.id)
+
+    return render(request, "import-catalogue.html", {
+        "etablissement": etablissement,
+        "imports": etablissement.imports.order_by("-date_add")[:10],
+    })
+
+
+@login_required
+def import_catalogue_detail(request, import_id):
+    etablissement = get_object_or_404(Etablissement, user=request.user)
+    import_ = get_object_or_404(ImportCatalogue, id=import_id, etablissement=etablissement)
+    return render(request, "import-catalogue-detail.html", {"import": import_, "etablissement": etablissement})
+
+
+@login_required
+def import_catalogue_statut(request, import_id):
+    """Progression d'un import, interrogée périodiquement par la page de détail."""
+    etablissement = get_object_or_404(Etablissement, user=request.user)
+    import_ = get_object_or_404(ImportCatalogue, id=import_id, etablissement=etablissement)
+    data = {
+        'statut': import_.statut,
+        'libelle': import_.get_statut_display(),
+        'progression': import_.progression,
+        'lignes_total': import_.lignes_total,
+        'lignes_traitees': import_.lignes_traitees,
+        'crees': import_.crees,
+        'mis_a_jour': import_.mis_a_jour,
+        'images_total': import_.images_total,
+        'images_traitees': import_.images_traitees,
+        'erreurs': import_.erreurs[:50],
+        'nombre_erreurs': len(import_.erreurs),
+        'message': import_.message,
+        'termine': import_.statut in (ImportCatalogue.TERMINE, ImportCatalogue.ECHEC),
+    }
+    return JsonResponse(data, safe=False)
+
+
 @login_required
 def modifier_article(request, article_id):
     etablissement = get_object_or_404(Etablissement, user=request.user)
@@ -321,32 +462,7 @@ def supprimer_article(request, article_id):
 @login_required
 def commande_reçu(request):
     etablissement = get_object_or_404(Etablissement, user=request.user)
-    commandes_list = Commande.objects.filter(produit_commande__produit__etablissement=etablissement).distinct().order_by('-date_add')
-
-    # 📌 Filtrage par client
-    client = request.GET.get("client")
-    if client:
-        commandes_list = commandes_list.filter(customer__user__first_name__icontains=client).order_by('-date_add')
-
-    # 📌 Filtrage par produit
-    produit = request.GET.get("produit")
-    if produit:
-        commandes_list = commandes_list.filter(produit_commande__produit__nom__icontains=produit).order_by('-date_add')
-
-    # 📌 Filtrage par statut
-    status = request.GET.get("status")
-    if status == "payée":
-        commandes_list = commandes_list.filter(status=True).order_by('-date_add')
-    elif status == "attente":
-        commandes_list = commandes_list.filter(status=False).order_by('-date_add')
-
-    # 📌 Filtrage par date
-    date_min = request.GET.get("date_min")
-    date_max = request.GET.get("date_max")
-    if date_min:
-        commandes_list = commandes_list.filter(date_add__gte=date_min).order_by('-date_add')
-    if date_max:
-        commandes_list = commandes_list.filter(date_add__lte=date_max).order_by('-date_add')
+    commandes_list = exports.filtrer_commandes(etablissement, request.GET)
 
     paginator = Paginator(commandes_list, 25)
     page_number = request.GET.get("page")
@@ -355,6 +471,24 @@ def commande_reçu(request):
     return render(request, "commande-reçu.html", {"commandes": commandes, "etablissement": etablissement})
 
 
+@login_required
+def export_commandes(request):
+    """Export CSV/XLSX des commandes (ou de leurs lignes, contenu=lignes) avec les filtres de commande_reçu."""
+    etablissement = get_object_or_404(Etablissement, user=request.user)
+    format_ = request.GET.get("format", "csv")
+    if format_ not in base_exports.FORMATS:
+        raise Http404("Format d'export inconnu")
+
+    if request.GET.get("contenu") == "lignes":
+        entetes, rangees = exports.COLONNES_LIGNES, exports.rangees_lignes(exports.filtrer_lignes(etablissement, request.GET))
+        nom = "lignes-commandes"
+    else:
+        entetes, rangees = exports.COLONNES_COMMANDES, exports.rangees_commandes(exports.filtrer_commandes(etablissement, request.GET))
+        nom = "commandes"
+    return base_exports.export_response(
+        format_, "%s-%s" % (nom, timezone.localdate().isoformat()), entetes, rangees, request)
+
+
 @login_required
 def commande_reçu_detail(request, commande_id):
     etablissement = get_object_or_404(Etablissement, user=request.user)
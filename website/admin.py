@@ -1,9 +1,10 @@
 from django.contrib import admin
 
 import website.models as models
+from base.admin import FastModelAdmin
 
 
-class SiteInfoAdmin(admin.ModelAdmin):
+class SiteInfoAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -38,42 +39,11 @@ class SiteInfoAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'slogan',
-        'description',
-        'horaire_description',
-        'text_pourquoi_nous_choisir',
-        'logo',
-        'icon',
-        'arriere_plan_appreciation',
-        'arriere_plan_appreciation_2',
-        'image_session_pourquoi_nous_choisir',
-        'image_page_contact',
-        'image_pied_de_page',
-        'couverture_page_contact',
-        'couverture_page_panier',
-        'couverture_page_paiement',
-        'couverture_page_shop',
-        'couverture_page_about',
-        'contact_1',
-        'contact_2',
-        'email',
-        'email_2',
-        'adresse',
-        'map_url',
-        'facebook_url',
-        'instagram_url',
-        'twitter_url',
-        'whatsapp',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class BanniereAdmin(admin.ModelAdmin):
+class BanniereAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -84,18 +54,11 @@ class BanniereAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'description',
-        'couverture',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class AppreciationAdmin(admin.ModelAdmin):
+class AppreciationAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -107,19 +70,11 @@ class AppreciationAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'description',
-        'auteur',
-        'role',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class AboutAdmin(admin.ModelAdmin):
+class AboutAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -131,19 +86,11 @@ class AboutAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'sous_titre',
-        'description',
-        'image',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class WhyChooseUsAdmin(admin.ModelAdmin):
+class WhyChooseUsAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -154,18 +101,11 @@ class WhyChooseUsAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'description',
-        'icon',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class GalerieAdmin(admin.ModelAdmin):
+class GalerieAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -176,18 +116,11 @@ class GalerieAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'description',
-        'image',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class HoraireAdmin(admin.ModelAdmin):
+class HoraireAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -197,17 +130,11 @@ class HoraireAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'titre',
-        'description',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
-class PartenaireAdmin(admin.ModelAdmin):
+class PartenaireAdmin(FastModelAdmin):
 
     list_display = (
         'id',
@@ -218,15 +145,8 @@ class PartenaireAdmin(admin.ModelAdmin):
         'date_update',
         'status',
     )
-    list_filter = (
-        'date_add',
-        'date_update',
-        'status',
-        'id',
-        'nom',
-        'description',
-        'image',
-    )
+    list_filter = ('status',)
+    date_hierarchy = 'date_add'
 
 
 def _register(model, admin_class):
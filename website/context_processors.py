@@ -1,41 +1,30 @@
-from shop import models
-from . import models as config_models
+from django.utils.functional import SimpleLazyObject
+
+from . import vitrine
 from customer import models as customer_models
 from django.contrib.sessions.models import Session
-from cities_light.models import City
 
 
+# Données communes à toutes les pages, mises en cache par website.vitrine ;
+# évaluées seulement si le gabarit les utilise
 def categories(request):
-    cat = models.CategorieEtablissement.objects.filter(status=True)
-
-    return {'cat':cat}
+    return {'cat': SimpleLazyObject(vitrine.categories)}
 
 
 def site_infos(request):
-    try:
-        infos = config_models.SiteInfo.objects.latest('date_add')
-    except:
-        infos = None
-    return {'infos':infos}
+    return {'infos': SimpleLazyObject(vitrine.site_infos)}
 
 
 def cities(request):
-
-    cities = City.objects.all()
-
-    return {'cities': cities}
+    return {'cities': SimpleLazyObject(vitrine.villes)}
 
 
 def galeries(request):
-    galerie = config_models.Galerie.objects.filter(status=True)[:6]
-
-    return {'galeries':galerie}
+    return {'galeries': SimpleLazyObject(vitrine.galeries)}
 
 
 def horaires(request):
-    horaire = config_models.Horaire.objects.filter(status=True)
-
-    return {'horaires':horaire}
+    return {'horaires': SimpleLazyObject(vitrine.horaires)}
 
 
 def cart(request):
@@ -0,0 +1,16 @@
+from cities_light.models import City
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from shop.models import CategorieEtablissement
+
+from . import vitrine
+
+
+def invalider_vitrine(sender, **kwargs):
+    vitrine.invalider()
+
+
+for model in (*apps.get_app_config('website').get_models(), CategorieEtablissement, City):
+    post_save.connect(invalider_vitrine, sender=model, dispatch_uid='vitrine_save_%s' % model.__name__)
+    post_delete.connect(invalider_vitrine, sender=model, dispatch_uid='vitrine_delete_%s' % model.__name__)
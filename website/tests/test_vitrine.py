@@ -0,0 +1,44 @@
+"""Tests de la mise en cache des données de la vitrine (website.vitrine)"""
+
+import pytest
+from django.test import RequestFactory
+
+from shop.models import CategorieEtablissement
+from website import context_processors, vitrine
+
+
+pytestmark = pytest.mark.django_db
+
+
+class TestVitrine:
+
+    @pytest.mark.unit
+    def test_categories_en_cache(self, categorie_etablissement, django_assert_num_queries):
+        """
+        Arrange: Une catégorie d'établissement active
+        Act: Lire deux fois les catégories
+        Assert: Une seule requête SQL
+        """
+        with django_assert_num_queries(1):
+            vitrine.categories()
+        with django_assert_num_queries(0):
+            categories = vitrine.categories()
+
+        assert [c.nom for c in categories] == [categorie_etablissement.nom]
+
+    @pytest.mark.unit
+    def test_invalidation(self, categorie_etablissement):
+        vitrine.categories()
+
+        CategorieEtablissement.objects.create(nom='Boulangerie', description='Pain')
+
+        assert len(vitrine.categories()) == 2
+
+    @pytest.mark.unit
+    def test_processeur_paresseux(self, categorie_etablissement, django_assert_num_queries):
+        """Une page qui n'affiche pas les catégories ne les calcule pas"""
+        with django_assert_num_queries(0):
+            contexte = context_processors.categories(RequestFactory().get('/'))
+
+        with django_assert_num_queries(1):
+            assert len(contexte['cat']) == 1
@@ -1,22 +1,10 @@
 from django.shortcuts import render
-from . import models
-from shop import models as shop_models
+from . import models, vitrine
 
 
 # Create your views here.
 def index(request):
-    about = models.About.objects.filter(status=True)[:1]
-    partenaires = models.Partenaire.objects.filter(status=True)[:5]
-    bannieres = models.Banniere.objects.filter(status=True)[:4]
-    appreciations = models.Appreciation.objects.filter(status=True)
-    produits = shop_models.Produit.objects.filter(super_deal=True)[:3]
-    datas = {
-        'about': about,
-        'partenaires': partenaires,
-        'appreciations': appreciations,
-        'produits': produits,
-        'bannieres': bannieres,
-    }
+    datas = vitrine.accueil()
 
     return render(request, 'index.html', datas)
 
@@ -0,0 +1,75 @@
+"""
+Données de la vitrine servies par base.cache.memoiser : celles des
+processeurs de contexte (affichées sur toutes les pages) et celles de la page
+d'accueil.
+
+Toute modification d'un modèle de website, d'une catégorie d'établissement ou
+d'une ville remplace la version stockée dans le cache (website.signals) ; les
+produits de l'accueil incluent aussi shop.catalogue.version() dans leur clé.
+Sous une rafale, une clé expirée n'est recalculée que par un seul worker.
+"""
+
+import time
+
+from cities_light.models import City
+from django.core.cache import cache
+
+from base.cache import memoiser
+from shop import catalogue
+from shop import models as shop_models
+
+from . import models
+
+
+VERSION_KEY = 'website:vitrine:version'
+TIMEOUT = 60 * 10
+
+
+def version():
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        current = time.time()
+        cache.add(VERSION_KEY, current, None)
+        current = cache.get(VERSION_KEY, current)
+    return current
+
+
+def invalider():
+    cache.set(VERSION_KEY, time.time(), None)
+
+
+def memo(nom, fonction, *versions):
+    return memoiser('website:%s:%s' % (nom, ':'.join(str(v) for v in versions)), fonction, TIMEOUT)
+
+
+def categories():
+    return memo('categories', lambda: list(shop_models.CategorieEtablissement.objects.filter(status=True)), version())
+
+
+def site_infos():
+    return memo('infos', lambda: models.SiteInfo.objects.order_by('-date_add').first(), version())
+
+
+def villes():
+    return memo('villes', lambda: list(City.objects.only('id', 'name').order_by('name')), version())
+
+
+def galeries():
+    return memo('galeries', lambda: list(models.Galerie.objects.filter(status=True)[:6]), version())
+
+
+def horaires():
+    return memo('horaires', lambda: list(models.Horaire.objects.filter(status=True)), version())
+
+
+def accueil():
+    def calcul():
+        return {
+            'about': list(models.About.objects.filter(status=True)[:1]),
+            'partenaires': list(models.Partenaire.objects.filter(status=True)[:5]),
+            'appreciations': list(models.Appreciation.objects.filter(status=True)),
+            'produits': list(shop_models.Produit.objects.filter(super_deal=True)[:3]),
+            'bannieres': list(models.Banniere.objects.filter(status=True)[:4]),
+        }
+    return memo('accueil', calcul, version(), catalogue.version())
+